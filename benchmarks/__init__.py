@@ -0,0 +1,9 @@
+"""Benchmarks for the Vee graph that run without network access.
+
+- `fake_llm`: deterministic stand-in for ChatGroq/ChatOpenAI with configurable latency.
+- `canned`: schema-valid canned outputs for every prompt the graph renders.
+- `conversations`: scripted bestie and assistant conversations.
+- `bench_graph`: end-to-end harness for the compiled main graph.
+
+Run with `python -m benchmarks.bench_graph --help`.
+"""
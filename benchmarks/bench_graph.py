@@ -0,0 +1,334 @@
+"""End-to-end latency benchmark for the compiled main graph.
+
+Drives `graph.build_graph.build_graph` with scripted conversations against the
+fake LLM backend and reports, per concurrency level:
+
+- turn latency and throughput (turns/s) for N concurrent chats,
+- overhead outside LLM calls per turn (turn wall time minus simulated LLM time),
+- per-node self time (wall time excluding LLM waits and nested nodes) and,
+  for sync nodes, thread CPU time,
+- checkpointer cost (calls, time and bytes for reads/writes, bytes written per turn,
+  and DB growth for SQLite).
+
+Example:
+    python -m benchmarks.bench_graph --concurrency 1 10 100 --turns 4 --latency zero
+    python -m benchmarks.bench_graph --latency prod --conversation mixed --json bench.json
+
+Graph feature flags (FUSED_FRONT_END, SENSING_MODE, ...) are read from the
+environment as usual, so the same harness compares pipeline variants.
+"""
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import functools
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import fake_llm
+from benchmarks.conversations import CONVERSATIONS, script
+
+from langchain_core.messages import HumanMessage
+
+import graph.build_graph as build_graph_module
+import graph.vee_ir as vee_ir_module
+from graph.serde import get_serializer
+from config.settings import settings
+from utils import deadline
+
+# Open node record for nested-node accounting: {"children": [(start, end), ...]}
+_node: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("bench_node", default=None)
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class NodeProfiler:
+    """Wraps graph node functions to record wall, self and CPU time per call."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[Dict[str, float]]] = defaultdict(list)
+
+    def reset(self) -> None:
+        self.samples.clear()
+
+    def _finish(self, name: str, started: float, cpu: Optional[float], acc: Dict[str, Any], record: Dict[str, Any], parent) -> None:
+        ended = time.perf_counter()
+        # Self time excludes any moment an LLM call or a nested node was running, counting overlaps once
+        busy = fake_llm.busy_time(acc["intervals"] + record["children"])
+        self.samples[name].append({
+            "wall": ended - started,
+            "llm": acc["llm"],
+            "self": ended - started - busy,
+            "cpu": cpu if cpu is not None else float("nan"),
+        })
+        if parent is not None:
+            parent["children"].append((started, ended))
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        """Returns a timed wrapper around a sync or async node function."""
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(state, *args, **kwargs):
+                parent, record = _node.get(), {"children": []}
+                token = _node.set(record)
+                started = time.perf_counter()
+                try:
+                    with fake_llm.span() as acc:
+                        return await fn(state, *args, **kwargs)
+                finally:
+                    _node.reset(token)
+                    self._finish(name, started, None, acc, record, parent)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(state, *args, **kwargs):
+            parent, record = _node.get(), {"children": []}
+            token = _node.set(record)
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            try:
+                with fake_llm.span() as acc:
+                    return fn(state, *args, **kwargs)
+            finally:
+                _node.reset(token)
+                self._finish(name, started, time.thread_time() - cpu_started, acc, record, parent)
+        return wrapper
+
+    def install(self) -> None:
+        """Wraps every node the main graph and the IR subgraph are built from."""
+        for attr, value in vars(build_graph_module).copy().items():
+            if callable(value) and getattr(value, "__module__", "") == "graph.nodes":
+                setattr(build_graph_module, attr, self.wrap(attr, value))
+        for attr, value in vars(vee_ir_module).copy().items():
+            if attr.startswith("node_") and callable(value):
+                setattr(vee_ir_module, attr, self.wrap(f"ir.{attr}", value))
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for name, samples in sorted(self.samples.items()):
+            selfs = [s["self"] * 1000 for s in samples]
+            cpus = [s["cpu"] * 1000 for s in samples if s["cpu"] == s["cpu"]]
+            report[name] = {
+                "calls": len(samples),
+                "self_ms_p50": round(percentile(selfs, 0.5), 3),
+                "self_ms_p95": round(percentile(selfs, 0.95), 3),
+                "cpu_ms_mean": round(statistics.fmean(cpus), 3) if cpus else None,
+                "llm_ms_mean": round(statistics.fmean(s["llm"] * 1000 for s in samples), 1),
+            }
+        return report
+
+
+class CheckpointProfiler:
+    """Times the checkpointer's read and write calls and sizes what they write.
+
+    Bytes are the serialized checkpoints (`aput`) and pending writes
+    (`aput_writes`), as the saver's serializer encodes them.
+    """
+
+    METHODS = ("aget_tuple", "aput", "aput_writes")
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.bytes: Dict[str, int] = defaultdict(int)
+
+    def reset(self) -> None:
+        self.samples.clear()
+        self.bytes.clear()
+
+    def _size(self, saver: Any, method: str, args: tuple) -> int:
+        if method == "aput":
+            return len(saver.serde.dumps_typed(args[1])[1])
+        if method == "aput_writes":
+            return sum(len(saver.serde.dumps_typed(value)[1]) for _, value in args[1])
+        return 0
+
+    def install(self, saver: Any) -> None:
+        for method in self.METHODS:
+            original = getattr(saver, method)
+
+            async def timed(*args, _original=original, _method=method, **kwargs):
+                self.bytes[_method] += self._size(saver, _method, args)
+                started = time.perf_counter()
+                try:
+                    return await _original(*args, **kwargs)
+                finally:
+                    self.samples[_method].append(time.perf_counter() - started)
+
+            setattr(saver, method, timed)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {
+            method: {
+                "calls": len(samples),
+                "bytes": self.bytes.get(method, 0),
+                "total_ms": round(sum(samples) * 1000, 2),
+                "p50_ms": round(percentile(samples, 0.5) * 1000, 3),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 3),
+            }
+            for method, samples in sorted(self.samples.items())
+        }
+
+
+def new_chat_state(chat_id: str) -> Dict[str, Any]:
+    """Initial state for a new chat, as built by the Telegram handler."""
+    now = datetime.now().isoformat()
+    return {
+        "messages": [],
+        "sensing": {"current": {}, "history": []},
+        "planning": {"current": {}, "history": []},
+        "acting": {},
+        "session": {"start_time": now, "last_update": now, "context": {}},
+        "user": {"name": None, "phone_number": None, "chat_id": chat_id},
+    }
+
+
+async def run_turn(app: Any, chat_id: str, text: str) -> Dict[str, float]:
+    """Runs one turn the way the Telegram handler does and returns its timings."""
+    config = {"configurable": {"thread_id": chat_id}}
+    with fake_llm.span() as acc:
+        started = time.perf_counter()
+        current = await app.aget_state(config)
+        data = {} if current and current.values else new_chat_state(chat_id)
+        data["messages"] = [HumanMessage(content=text)]
+        data["deadline"] = deadline.start_turn()
+        async for _ in app.astream(data, config=config, stream_mode=["custom", "values"]):
+            pass
+        wall = time.perf_counter() - started
+    return {"wall": wall, "llm": acc["llm"], "overhead": wall - acc["llm"]}
+
+
+async def run_chat(app: Any, chat_id: str, messages: List[str], turns: List[Dict[str, float]]) -> None:
+    for text in messages:
+        turns.append(await run_turn(app, chat_id, text))
+
+
+async def run_level(app: Any, concurrency: int, messages: List[str], run_id: str) -> Dict[str, Any]:
+    """Runs `concurrency` chats in parallel, each through the scripted messages."""
+    turns: List[Dict[str, float]] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_chat(app, f"bench-{run_id}-{concurrency}-{i}", messages, turns) for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    walls = [t["wall"] * 1000 for t in turns]
+    overheads = [t["overhead"] * 1000 for t in turns]
+    return {
+        "concurrency": concurrency,
+        "turns": len(turns),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_turns_per_s": round(len(turns) / elapsed, 2) if elapsed else None,
+        "turn_ms_p50": round(percentile(walls, 0.5), 2),
+        "turn_ms_p95": round(percentile(walls, 0.95), 2),
+        "turn_ms_p99": round(percentile(walls, 0.99), 2),
+        "overhead_ms_p50": round(percentile(overheads, 0.5), 2),
+        "overhead_ms_p95": round(percentile(overheads, 0.95), 2),
+    }
+
+
+async def open_checkpointer(kind: str, directory: str):
+    """Returns (saver, db_path, close) for "sqlite" (as in production) or "memory"."""
+    if kind == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver(serde=get_serializer()), None, None
+
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    db_path = os.path.join(directory, "bench_short_memory.db")
+    conn = await aiosqlite.connect(db_path)
+    return AsyncSqliteSaver(conn=conn, serde=get_serializer()), db_path, conn.close
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    fake_llm.install(args.latency)
+    settings.TURN_DEADLINE_S = args.deadline
+
+    nodes, checkpoints = NodeProfiler(), CheckpointProfiler()
+    nodes.install()
+    messages = script(args.conversation, args.turns)
+    results: Dict[str, Any] = {"args": vars(args), "levels": []}
+
+    with tempfile.TemporaryDirectory() as directory:
+        saver, db_path, close = await open_checkpointer(args.checkpointer, directory)
+        checkpoints.install(saver)
+        app = build_graph_module.build_graph(saver)
+        run_id = str(int(time.time()))
+        try:
+            # Warm-up: imports, prompt registry, tokenizer and SQLite schema
+            with contextlib.redirect_stdout(io.StringIO()):
+                await run_turn(app, f"bench-{run_id}-warmup", messages[0])
+
+            for concurrency in args.concurrency:
+                nodes.reset(), checkpoints.reset(), fake_llm.stats.reset()
+                db_before = os.path.getsize(db_path) if db_path else 0
+                output = sys.stdout if args.show_logs else io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    level = await run_level(app, concurrency, messages, run_id)
+                level["llm_calls"] = dict(fake_llm.stats.calls)
+                level["nodes"] = nodes.report()
+                level["checkpoint"] = checkpoints.report()
+                level["checkpoint"]["bytes_per_turn"] = round(sum(checkpoints.bytes.values()) / max(level["turns"], 1))
+                if db_path:
+                    level["checkpoint"]["db_growth_kb"] = round((os.path.getsize(db_path) - db_before) / 1024, 1)
+                results["levels"].append(level)
+        finally:
+            if close:
+                await close()
+
+    results["degradations"] = deadline.degradation_report()
+    return results
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    for level in results["levels"]:
+        print(f"\n=== {level['concurrency']} concurrent chats: {level['turns']} turns in {level['elapsed_s']}s "
+              f"({level['throughput_turns_per_s']} turns/s) ===")
+        print(f"turn ms      p50 {level['turn_ms_p50']:>9}  p95 {level['turn_ms_p95']:>9}  p99 {level['turn_ms_p99']:>9}")
+        print(f"overhead ms  p50 {level['overhead_ms_p50']:>9}  p95 {level['overhead_ms_p95']:>9}   (outside LLM calls)")
+        print(f"\n{'node':<38}{'calls':>7}{'self p50':>11}{'self p95':>11}{'cpu mean':>11}{'llm mean':>11}")
+        for name, row in level["nodes"].items():
+            cpu = f"{row['cpu_ms_mean']:.3f}" if row["cpu_ms_mean"] is not None else "-"
+            print(f"{name:<38}{row['calls']:>7}{row['self_ms_p50']:>11.3f}{row['self_ms_p95']:>11.3f}{cpu:>11}{row['llm_ms_mean']:>11.1f}")
+        print(f"\n{'checkpoint':<38}{'calls':>7}{'total ms':>11}{'p50 ms':>11}{'p95 ms':>11}{'KB':>11}")
+        for method, row in level["checkpoint"].items():
+            if isinstance(row, dict):
+                print(f"{method:<38}{row['calls']:>7}{row['total_ms']:>11.2f}{row['p50_ms']:>11.3f}{row['p95_ms']:>11.3f}{row['bytes'] / 1024:>11.1f}")
+        print(f"{'bytes written per turn':<38}{level['checkpoint']['bytes_per_turn']:>7}")
+        if "db_growth_kb" in level["checkpoint"]:
+            print(f"{'db growth (KB)':<38}{level['checkpoint']['db_growth_kb']:>7}")
+    print(f"\nDegradations: {results['degradations']}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100], help="Concurrent chats per level")
+    parser.add_argument("--turns", type=int, default=4, help="Turns per chat")
+    parser.add_argument("--conversation", choices=sorted(CONVERSATIONS), default="mixed")
+    parser.add_argument("--latency", choices=sorted(fake_llm.PROFILES), default="zero", help="Fake LLM latency profile")
+    parser.add_argument("--checkpointer", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--deadline", type=float, default=600.0, help="Turn deadline in seconds (large by default to avoid degradation)")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    parser.add_argument("--show-logs", action="store_true", help="Keep the nodes' console output")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(benchmark(args))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
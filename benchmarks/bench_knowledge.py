@@ -0,0 +1,69 @@
+"""Micro-benchmark for the BM25 knowledge index (layers/perceive/knowledge_index.py).
+
+Indexes a synthetic corpus (Zipf-distributed vocabulary) in incremental
+batches, each a new segment, then times top-k queries and reopening the index:
+
+    python -m benchmarks.bench_knowledge --documents 20000 --batch 1000
+"""
+import argparse
+import itertools
+import random
+import tempfile
+import time
+from typing import List, Optional
+
+from benchmarks.bench_graph import percentile
+from layers.perceive.knowledge_index import KnowledgeIndex
+
+
+def vocabulary(size: int, rng: random.Random) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return [f"{''.join(rng.choice(letters) for _ in range(rng.randint(3, 8)))}{i}" for i in range(size)]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=20_000)
+    parser.add_argument("--words", type=int, default=400, help="Words per document")
+    parser.add_argument("--batch", type=int, default=1_000, help="Documents per add() call (one segment each)")
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    words = vocabulary(args.vocabulary, rng)
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+    def text(n: int) -> str:
+        return " ".join(rng.choices(words, cum_weights=weights, k=n))
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = KnowledgeIndex(directory)
+        batches: List[float] = []
+        for start in range(0, args.documents, args.batch):
+            documents = [{"title": text(4), "url": f"doc://{i}", "text": text(args.words)}
+                         for i in range(start, min(start + args.batch, args.documents))]
+            started = time.perf_counter()
+            index.add(documents)
+            batches.append(time.perf_counter() - started)
+
+        searches: List[float] = []
+        for _ in range(args.queries):
+            query = text(rng.randint(2, 6))
+            started = time.perf_counter()
+            index.search(query, args.k)
+            searches.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        reopened = KnowledgeIndex(directory)
+        reopen_s = time.perf_counter() - started
+
+    print(f"{len(index)} passages from {args.documents} documents in {len(index._segments)} segments")
+    print(f"add s/batch  p50 {percentile(batches, 0.5):.3f}  max {max(batches):.3f}  ({args.batch} documents per batch)")
+    print(f"top-{args.k} ms  p50 {percentile(searches, 0.5):.3f}  p95 {percentile(searches, 0.95):.3f}  p99 {percentile(searches, 0.99):.3f}")
+    print(f"reopen {reopen_s:.2f}s ({len(reopened)} passages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Micro-benchmark for the long-term memory index (layers/perceive/memory_access.py).
+
+Fills a scratch index with synthetic memories spread over many users, then
+times inserts, per-user top-k retrieval and reopening the index:
+
+    python -m benchmarks.bench_memory --memories 300000 --users 2000
+"""
+import argparse
+import random
+import tempfile
+import time
+from typing import List, Optional
+
+from benchmarks.bench_graph import percentile
+from layers.perceive.memory_access import MemoryIndex
+
+SUBJECTS = ["Their manager", "Their sister", "Their dog", "Their partner", "Their landlord", "Their best friend",
+            "They", "Their team", "Their mom", "Their roommate"]
+PREDICATES = ["moved the deadline up", "is visiting next week", "started a new job", "hates mornings",
+              "works night shifts", "is training for a marathon", "lives in Lisbon", "loves sushi",
+              "quit coffee", "is learning the guitar", "got promoted", "is studying for exams"]
+DETAILS = ["again", "this month", "after a long break", "since spring", "for the first time", "at last", ""]
+
+
+def synthetic_memory(rng: random.Random) -> str:
+    return f"{rng.choice(SUBJECTS)} {rng.choice(PREDICATES)} {rng.choice(DETAILS)} #{rng.randrange(10_000)}".strip()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--memories", type=int, default=300_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = MemoryIndex(directory)
+        inserts: List[float] = []
+        for _ in range(args.memories):
+            chat_id = str(rng.randrange(args.users))
+            text = synthetic_memory(rng)
+            started = time.perf_counter()
+            index.add(chat_id, text)
+            inserts.append((time.perf_counter() - started) * 1000)
+        index.flush()
+
+        searches: List[float] = []
+        for _ in range(args.queries):
+            chat_id = str(rng.randrange(args.users))
+            query = f"{rng.choice(SUBJECTS)} {rng.choice(PREDICATES)}"
+            started = time.perf_counter()
+            index.search(chat_id, query, args.k)
+            searches.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        reopened = MemoryIndex(directory)
+        reopen_s = time.perf_counter() - started
+
+    print(f"{len(index)} memories for {args.users} users ({args.memories} inserts, rest deduplicated)")
+    print(f"insert ms  p50 {percentile(inserts, 0.5):.3f}  p95 {percentile(inserts, 0.95):.3f}  p99 {percentile(inserts, 0.99):.3f}")
+    print(f"top-{args.k} ms  p50 {percentile(searches, 0.5):.3f}  p95 {percentile(searches, 0.95):.3f}  p99 {percentile(searches, 0.99):.3f}")
+    print(f"reopen {reopen_s:.2f}s ({len(reopened)} memories)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Micro-benchmark for the checkpoint serializer (graph/serde.py).
+
+Serializes checkpoints of synthetic threads (alternating user/assistant
+messages plus the durable session, user, trackers and reflection channels)
+with each codec, and reports bytes and serialize/deserialize time:
+
+    python -m benchmarks.bench_serde --messages 10 100 1000
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+
+from benchmarks.bench_graph import percentile
+from graph.serde import CODECS, CompressedSerializer
+
+WORDS = ("feel", "today", "work", "friend", "really", "think", "maybe", "week", "sleep", "plan", "honestly",
+         "photosynthesis", "energy", "light", "question", "help", "talk", "because", "about", "little")
+
+
+def thread(messages: int, rng: random.Random) -> Dict[str, Any]:
+    """A checkpoint holding a thread of `messages` messages and the other durable channels."""
+    def text(n: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(n))
+
+    history = [
+        HumanMessage(content=text(rng.randint(5, 30)), id=f"h{i}") if i % 2 == 0
+        else AIMessage(content=text(rng.randint(20, 120)), id=f"a{i}")
+        for i in range(messages)
+    ]
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {
+        "messages": history,
+        "session": {"start_time": "2026-01-01T10:00:00", "last_update": "2026-01-01T10:05:00", "context": {}},
+        "user": {"name": "Sam", "phone_number": None, "chat_id": "42"},
+        "trackers": {"mood": {"valence": 0.1, "arousal": 0.4, "n": messages // 2}, "engagement": {"turns": messages // 2}},
+        "reflection": {"impact": {"score": 0.6}, "memory": {"saved": 2}, "strategy": {"updated": True}},
+    }
+    return checkpoint
+
+
+def measure(serde: CompressedSerializer, value: Any, repeat: int) -> Dict[str, float]:
+    dumps: List[float] = []
+    loads: List[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        typed = serde.dumps_typed(value)
+        dumps.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        serde.loads_typed(typed)
+        loads.append(time.perf_counter() - started)
+    return {"bytes": len(typed[1]), "dumps_ms": percentile(dumps, 0.5) * 1000, "loads_ms": percentile(loads, 0.5) * 1000}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--min-bytes", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    codecs = ["none", *CODECS]
+
+    print(f"{'messages':>8} {'codec':>6} {'bytes':>10} {'ratio':>7} {'dumps ms':>9} {'loads ms':>9}")
+    for messages in args.messages:
+        checkpoint = thread(messages, rng)
+        baseline = None
+        for codec in codecs:
+            row = measure(CompressedSerializer(codec=codec, min_bytes=args.min_bytes), checkpoint, args.repeat)
+            baseline = baseline or row["bytes"]
+            print(f"{messages:>8} {codec:>6} {row['bytes']:>10} {row['bytes'] / baseline:>7.2f} "
+                  f"{row['dumps_ms']:>9.3f} {row['loads_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Scripted conversations for benchmarks.
+
+Messages starting with a question word are answered in assistant mode by the
+canned backend, everything else in bestie mode.
+"""
+from typing import List
+
+BESTIE = [
+    "ugh today was so long",
+    "my manager moved the deadline up again and nobody asked me",
+    "idk, I just feel kind of invisible at work lately",
+    "thanks, that actually helps a bit",
+]
+
+ASSISTANT = [
+    "what is the difference between a list and a tuple in python?",
+    "how do I make my morning routine less chaotic?",
+    "explain compound interest like I'm five",
+    "can you compare running and cycling for knee health?",
+]
+
+MIXED = [
+    "ugh today was so long",
+    "what is a good way to wind down before bed?",
+    "I tried that yesterday and still couldn't sleep",
+    "how much sleep do adults actually need?",
+]
+
+CONVERSATIONS = {"bestie": BESTIE, "assistant": ASSISTANT, "mixed": MIXED}
+
+
+def script(name: str, turns: int) -> List[str]:
+    """Returns `turns` user messages from a named conversation, repeating it as needed."""
+    messages = CONVERSATIONS[name]
+    return [messages[i % len(messages)] for i in range(turns)]
@@ -0,0 +1,190 @@
+"""Deterministic fake backend for ChatGroq and ChatOpenAI.
+
+`install()` patches the chat models' generate/stream methods, so everything
+above them (prompt rendering, callbacks, output parsers, hedging, routing)
+still runs as in production and only the network call is replaced by a
+canned response (see `benchmarks.canned`) after a sampled latency.
+
+Time spent waiting on fake calls is credited to every open `span()` (a turn
+and the nodes nested in it), counting overlapping concurrent calls once, which
+lets the harness separate our own overhead from LLM latency.
+"""
+import asyncio
+import contextvars
+import math
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+os.environ.setdefault("GROQ_API_KEY", "fake-groq-key")
+os.environ.setdefault("OPENAI_API_KEY", "fake-openai-key")
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_groq import ChatGroq
+from langchain_openai import ChatOpenAI
+
+from benchmarks.canned import canned_response
+
+DEFAULT_RESPONSE = "ok"
+STREAM_CHUNK_CHARS = 16
+
+
+class LatencyProfile:
+    """Samples per-call latency from a log-normal distribution, per model.
+
+    Args:
+        median_ms: Median latency for models without an override.
+        sigma: Log-normal shape; 0 gives a fixed latency.
+        per_model: Optional {model name: (median_ms, sigma)} overrides.
+        seed: Seed for reproducible runs.
+    """
+
+    def __init__(self, median_ms: float = 0.0, sigma: float = 0.0,
+                 per_model: Optional[Dict[str, tuple]] = None, seed: int = 0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.per_model = per_model or {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, model: str) -> float:
+        """Returns a latency in seconds for one call to `model`."""
+        median_ms, sigma = self.per_model.get(model, (self.median_ms, self.sigma))
+        if median_ms <= 0:
+            return 0.0
+        with self._lock:
+            factor = math.exp(self._rng.gauss(0.0, sigma)) if sigma else 1.0
+        return median_ms * factor / 1000
+
+
+PROFILES: Dict[str, LatencyProfile] = {
+    # Isolates our own overhead
+    "zero": LatencyProfile(),
+    "fixed": LatencyProfile(median_ms=50),
+    # Rough production shape: fast Groq models, slower kimi-k2 and gpt-4o, long tails
+    "prod": LatencyProfile(median_ms=400, sigma=0.5, per_model={
+        "llama-3.1-8b-instant": (150, 0.4),
+        "llama-3.3-70b-versatile": (450, 0.5),
+        "moonshotai/kimi-k2-instruct": (1200, 0.6),
+        "gpt-4o": (1800, 0.6),
+        "gpt-4o-mini": (900, 0.5),
+    }),
+}
+
+
+class FakeStats:
+    """Counts fake calls and total simulated LLM time."""
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.llm_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, model: str, seconds: float) -> None:
+        with self._lock:
+            self.calls[model] = self.calls.get(model, 0) + 1
+            self.llm_seconds += seconds
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.llm_seconds = 0.0
+
+
+stats = FakeStats()
+_profile: LatencyProfile = PROFILES["zero"]
+
+# Open spans, outermost first: mutable {"llm", "intervals"} dicts shared with copied contexts
+_spans: contextvars.ContextVar[Tuple[Dict[str, Any], ...]] = contextvars.ContextVar("fake_llm_spans", default=())
+
+
+def busy_time(intervals: Sequence[Tuple[float, float]]) -> float:
+    """Length of the union of (start, end) perf_counter intervals."""
+    total, end = 0.0, float("-inf")
+    for start, stop in sorted(intervals):
+        if stop > end:
+            total += stop - max(start, end)
+            end = stop
+    return total
+
+
+@contextmanager
+def span() -> Iterator[Dict[str, Any]]:
+    """Opens a span that collects the LLM waits of calls made inside it.
+
+    On exit, `acc["llm"]` is the time at least one call was outstanding and
+    `acc["intervals"]` holds each call's (start, end).
+    """
+    acc: Dict[str, Any] = {"llm": 0.0, "intervals": []}
+    token = _spans.set(_spans.get() + (acc,))
+    try:
+        yield acc
+    finally:
+        _spans.reset(token)
+        acc["llm"] = busy_time(acc["intervals"])
+
+
+def _respond(llm: Any, messages: List[BaseMessage]) -> tuple:
+    model = getattr(llm, "model_name", None) or "unknown"
+    system = "\n".join(str(m.content) for m in messages if isinstance(m, SystemMessage))
+    prompt = "\n".join(str(m.content) for m in messages)
+    text = canned_response(system, prompt) or DEFAULT_RESPONSE
+    return model, text, _profile.sample(model)
+
+
+def _account(model: str, started: float, delay: float) -> None:
+    stats.record(model, delay)
+    interval = (started, time.perf_counter())
+    for acc in _spans.get():
+        acc["intervals"].append(interval)
+
+
+def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    model, text, delay = _respond(self, messages)
+    started = time.perf_counter()
+    time.sleep(delay)
+    _account(model, started, delay)
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+    model, text, delay = _respond(self, messages)
+    started = time.perf_counter()
+    await asyncio.sleep(delay)
+    _account(model, started, delay)
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+    model, text, delay = _respond(self, messages)
+    started = time.perf_counter()
+    pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+    for piece in pieces:
+        time.sleep(delay / len(pieces))
+        yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+    _account(model, started, delay)
+
+
+async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+    model, text, delay = _respond(self, messages)
+    started = time.perf_counter()
+    pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+    for piece in pieces:
+        await asyncio.sleep(delay / len(pieces))
+        yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+    _account(model, started, delay)
+
+
+def install(profile: "LatencyProfile | str" = "zero") -> None:
+    """Replaces the network layer of ChatGroq and ChatOpenAI with the fake backend."""
+    global _profile
+    _profile = PROFILES[profile] if isinstance(profile, str) else profile
+    for cls in (ChatGroq, ChatOpenAI):
+        cls._generate = _generate
+        cls._agenerate = _agenerate
+        cls._stream = _stream
+        cls._astream = _astream
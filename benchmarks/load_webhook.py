@@ -0,0 +1,381 @@
+"""Load generator for the Telegram webhook (`POST /webhook` in ui/telegram/app.py).
+
+Synthesizes Telegram `Update` payloads for many chats and posts them at
+controlled rates (Poisson arrivals, optional per-chat bursts). Every chat
+opens with `/start`; `--history` primes chats with earlier turns before the
+measured levels, so prompts carry long histories.
+
+The generator also serves a fake Telegram Bot API (getMe, setWebhook,
+sendMessage, sendChatAction, ...), so it sees every reply the bot sends and can
+measure end-to-end reply latency. Point the bot at it and at the mock LLM
+server, or let `--spawn` start both in subprocesses:
+
+    python -m benchmarks.load_webhook --spawn --rates 1 2 5 10 --duration 30
+
+    # or against a bot you started yourself
+    python -m benchmarks.mock_llm_server --port 8900 &
+    TELEGRAM_API_BASE_URL=http://127.0.0.1:8901 GROQ_BASE_URL=http://127.0.0.1:8900 \\
+        OPENAI_BASE_URL=http://127.0.0.1:8900/v1 uvicorn ui.telegram.app:app --port 8001 &
+    python -m benchmarks.load_webhook --bot-url http://127.0.0.1:8001 --db data/vee_short_memory.db
+
+Per rate level it reports webhook response latency, end-to-end reply latency
+(update posted → first sendMessage for that chat), error rates, fallback
+replies and checkpoint DB growth, and finally the highest sustained rate.
+"""
+import argparse
+import asyncio
+import html
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+from benchmarks.bench_graph import percentile
+from benchmarks.conversations import CONVERSATIONS
+from utils.deadline import FALLBACK_REPLY
+
+BOT_TOKEN = "123456:load-test"
+CHAT_ID_BASE = 700_000_000
+SUSTAINED_REPLY_RATIO = 0.95
+SUSTAINED_ERROR_RATE = 0.01
+
+
+class FakeTelegramAPI:
+    """Fake Bot API that records every message the bot sends."""
+
+    def __init__(self):
+        # chat_id -> update_id -> {"sent_at", "replied"} for the updates whose webhook call is in flight
+        self.pending: Dict[int, Dict[int, Dict[str, Any]]] = defaultdict(dict)
+        self.reply_latencies: List[float] = []
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.unanswered = 0
+
+    def expect_reply(self, chat_id: int, update_id: int, sent_at: float) -> None:
+        self.pending[chat_id][update_id] = {"sent_at": sent_at, "replied": False}
+
+    def finish(self, chat_id: int, update_id: int) -> None:
+        """Closes an update once its webhook call returned, counting it if no reply was sent."""
+        update = self.pending[chat_id].pop(update_id, None)
+        if update is not None and not update["replied"]:
+            self.unanswered += 1
+
+    def outstanding(self) -> int:
+        """Updates still in flight that have no reply yet."""
+        return sum(not update["replied"] for updates in self.pending.values() for update in updates.values())
+
+    def reset(self) -> None:
+        self.pending.clear()
+        self.reply_latencies = []
+        self.counts = defaultdict(int)
+        self.unanswered = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.counts[method] += 1
+        if method == "getMe":
+            return web.json_response({"ok": True, "result": {"id": 123456, "is_bot": True, "username": "vee_load_test_bot"}})
+        if method != "sendMessage":
+            return web.json_response({"ok": True, "result": True})
+
+        data = await request.json()
+        chat_id = int(data["chat_id"])
+        # Replies are sent as HTML; the handler's turn-timeout fallback is MarkdownV2-escaped by the client
+        text = data.get("text", "")
+        if data.get("parse_mode") == "HTML":
+            text = html.unescape(re.sub(r"<[^>]+>", "", text))
+        elif data.get("parse_mode") == "MarkdownV2":
+            text = re.sub(r"\\(.)", r"\1", text)
+        if text == FALLBACK_REPLY:
+            self.counts["fallback_replies"] += 1
+        # Turns of a chat run one at a time, so a reply belongs to its oldest update in flight. Only the
+        # first message of a multi-part reply closes it; the rest must not close the chat's next update.
+        updates = self.pending.get(chat_id)
+        if updates:
+            oldest = next(iter(updates.values()))
+            if not oldest["replied"]:
+                oldest["replied"] = True
+                self.reply_latencies.append(time.perf_counter() - oldest["sent_at"])
+        return web.json_response({"ok": True, "result": {"message_id": self.counts[method], "chat": {"id": chat_id}}})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+
+class UpdateFactory:
+    """Builds realistic Telegram `Update` payloads."""
+
+    def __init__(self, chats: int, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.update_id = 0
+        self.message_ids: Dict[int, int] = defaultdict(int)
+        self.started: set = set()
+        self.chat_ids = [CHAT_ID_BASE + i for i in range(chats)]
+        self.scripts = {chat_id: self.rng.choice(list(CONVERSATIONS.values())) for chat_id in self.chat_ids}
+
+    def text_for(self, chat_id: int) -> str:
+        if chat_id not in self.started:
+            self.started.add(chat_id)
+            return "/start"
+        script = self.scripts[chat_id]
+        return script[self.message_ids[chat_id] % len(script)]
+
+    def update(self, chat_id: int, text: Optional[str] = None) -> Dict[str, Any]:
+        self.update_id += 1
+        self.message_ids[chat_id] += 1
+        text = text if text is not None else self.text_for(chat_id)
+        user = {"id": chat_id, "is_bot": False, "first_name": f"Load{chat_id - CHAT_ID_BASE}", "language_code": "en"}
+        return {
+            "update_id": self.update_id,
+            "message": {
+                "message_id": self.message_ids[chat_id],
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private", "first_name": user["first_name"]},
+                "from": user,
+                "text": text,
+            },
+        }
+
+
+def db_size(path: Optional[str]) -> int:
+    """Size of the SQLite DB including its WAL file."""
+    if not path:
+        return 0
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+class LoadGenerator:
+    def __init__(self, bot_url: str, api: FakeTelegramAPI, factory: UpdateFactory, burst_prob: float,
+                 timeout_s: float, seed: int = 0):
+        self.webhook_url = f"{bot_url.rstrip('/')}/webhook"
+        self.api = api
+        self.factory = factory
+        self.burst_prob = burst_prob
+        self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+        self.rng = random.Random(seed)
+        self.webhook_latencies: List[float] = []
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.sent = 0
+
+    async def post(self, session: aiohttp.ClientSession, payload: Dict[str, Any]) -> None:
+        chat_id = payload["message"]["chat"]["id"]
+        started = time.perf_counter()
+        self.sent += 1
+        self.api.expect_reply(chat_id, payload["update_id"], started)
+        try:
+            async with session.post(self.webhook_url, json=payload) as response:
+                await response.read()
+                self.statuses[str(response.status)] += 1
+        except asyncio.TimeoutError:
+            self.statuses["timeout"] += 1
+        except aiohttp.ClientError as e:
+            self.statuses[type(e).__name__] += 1
+        self.webhook_latencies.append(time.perf_counter() - started)
+        # The webhook returns once the turn is done, so its reply (if any) has been sent
+        self.api.finish(chat_id, payload["update_id"])
+
+    async def arrival(self, session: aiohttp.ClientSession, chat_id: int) -> None:
+        """One user message, sometimes followed by a burst of more before any reply."""
+        posts = [asyncio.create_task(self.post(session, self.factory.update(chat_id)))]
+        while self.rng.random() < self.burst_prob:
+            await asyncio.sleep(self.rng.uniform(0.1, 0.8))
+            posts.append(asyncio.create_task(self.post(session, self.factory.update(chat_id))))
+        await asyncio.gather(*posts)
+
+    async def prime(self, history: int, concurrency: int = 20) -> None:
+        """Sends `/start` plus `history` turns to every chat before measuring."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def prime_chat(session: aiohttp.ClientSession, chat_id: int) -> None:
+            for _ in range(history + 1):
+                async with semaphore:
+                    await self.post(session, self.factory.update(chat_id))
+
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            await asyncio.gather(*(prime_chat(session, chat_id) for chat_id in self.factory.chat_ids))
+
+    async def run_level(self, rate: float, duration_s: float, drain_s: float) -> Dict[str, Any]:
+        """Posts updates with Poisson arrivals at `rate`/s for `duration_s` and waits for replies."""
+        self.api.reset()
+        self.webhook_latencies, self.statuses = [], defaultdict(int)
+        self.sent = 0
+        tasks: List[asyncio.Task] = []
+        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+            started = time.perf_counter()
+            next_at = started
+            while next_at - started < duration_s:
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                tasks.append(asyncio.create_task(self.arrival(session, self.rng.choice(self.factory.chat_ids))))
+                next_at += self.rng.expovariate(rate)
+            offered_s = time.perf_counter() - started
+            if tasks:
+                await asyncio.wait(tasks, timeout=drain_s)
+            deadline_at = time.perf_counter() + drain_s
+            while self.api.outstanding() and time.perf_counter() < deadline_at:
+                await asyncio.sleep(0.2)
+            elapsed = time.perf_counter() - started
+
+        replies = len(self.api.reply_latencies)
+        sent = self.sent
+        errors = sum(n for status, n in self.statuses.items() if status != "200")
+        webhook_ms = [s * 1000 for s in self.webhook_latencies]
+        reply_ms = [s * 1000 for s in self.api.reply_latencies]
+        return {
+            "rate": rate,
+            "sent": sent,
+            "offered_per_s": round(sent / offered_s, 2) if offered_s else None,
+            "replies": replies,
+            "replies_per_s": round(replies / elapsed, 2) if elapsed else None,
+            "missing_replies": self.api.unanswered + self.api.outstanding(),
+            "fallback_replies": self.api.counts.get("fallback_replies", 0),
+            "webhook_status": dict(self.statuses),
+            "error_rate": round(errors / sent, 4) if sent else 0.0,
+            "webhook_ms_p50": round(percentile(webhook_ms, 0.5), 1),
+            "webhook_ms_p95": round(percentile(webhook_ms, 0.95), 1),
+            "webhook_ms_p99": round(percentile(webhook_ms, 0.99), 1),
+            "reply_ms_p50": round(percentile(reply_ms, 0.5), 1),
+            "reply_ms_p95": round(percentile(reply_ms, 0.95), 1),
+            "reply_ms_p99": round(percentile(reply_ms, 0.99), 1),
+            "api_calls": {k: v for k, v in self.api.counts.items() if k != "fallback_replies"},
+        }
+
+
+def sustained(level: Dict[str, Any]) -> bool:
+    """Whether the bot kept up with a level: nearly every update answered, few errors."""
+    return level["sent"] > 0 and level["replies"] >= SUSTAINED_REPLY_RATIO * level["sent"] \
+        and level["error_rate"] <= SUSTAINED_ERROR_RATE
+
+
+async def wait_for_health(bot_url: str, processes: List[subprocess.Popen], timeout_s: float = 60.0) -> None:
+    deadline_at = time.monotonic() + timeout_s
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline_at:
+            if any(process.poll() is not None for process in processes):
+                raise RuntimeError("A spawned process exited during startup, see its log")
+            try:
+                async with session.get(f"{bot_url.rstrip('/')}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise RuntimeError(f"Bot at {bot_url} did not become healthy within {timeout_s}s")
+
+
+def spawn(args: argparse.Namespace, directory: str) -> List[subprocess.Popen]:
+    """Starts the mock LLM server and one bot worker with their output in `directory`."""
+    llm_url = f"http://127.0.0.1:{args.llm_port}"
+    env = {
+        **os.environ,
+        "TELEGRAM_BOT_TOKEN": BOT_TOKEN,
+        "WEBHOOK_URL": f"http://127.0.0.1:{args.bot_port}/webhook",
+        "TELEGRAM_API_BASE_URL": f"http://127.0.0.1:{args.api_port}",
+        "CHECKPOINT_DB_PATH": args.db,
+        "GROQ_BASE_URL": llm_url,
+        "OPENAI_BASE_URL": f"{llm_url}/v1",
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "fake-groq-key"),
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "fake-openai-key"),
+    }
+    commands = [
+        [sys.executable, "-m", "benchmarks.mock_llm_server", "--port", str(args.llm_port), "--latency", args.latency],
+        [sys.executable, "-m", "uvicorn", "ui.telegram.app:app", "--port", str(args.bot_port), "--log-level", "warning"],
+    ]
+    processes = []
+    for name, command in zip(("mock_llm", "bot"), commands):
+        log = open(os.path.join(directory, f"{name}.log"), "w")
+        processes.append(subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT))
+    return processes
+
+
+async def load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    api = FakeTelegramAPI()
+    runner = web.AppRunner(api.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.api_port).start()
+
+    processes: List[subprocess.Popen] = []
+    if args.spawn:
+        # Kept after the run so the workers' logs can be inspected
+        directory = tempfile.mkdtemp(prefix="vee_load_")
+        args.db = args.db or os.path.join(directory, "load_short_memory.db")
+        processes = spawn(args, directory)
+        print(f"Spawned mock LLM server and bot worker (logs and DB in {directory})")
+    try:
+        await wait_for_health(args.bot_url, processes)
+        factory = UpdateFactory(args.chats, args.seed)
+        generator = LoadGenerator(args.bot_url, api, factory, args.burst_prob, args.timeout, args.seed)
+        print(f"Priming {args.chats} chats with /start + {args.history} turns...")
+        await generator.prime(args.history)
+
+        results: Dict[str, Any] = {"args": vars(args), "levels": []}
+        for rate in args.rates:
+            size_before = db_size(args.db)
+            level = await generator.run_level(rate, args.duration, args.drain)
+            level["db_growth_kb"] = round((db_size(args.db) - size_before) / 1024, 1) if args.db else None
+            level["sustained"] = sustained(level)
+            results["levels"].append(level)
+            print_level(level)
+        ok = [level["rate"] for level in results["levels"] if level["sustained"]]
+        results["max_sustained_rate"] = max(ok) if ok else None
+        return results
+    finally:
+        for process in processes:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        await runner.cleanup()
+
+
+def print_level(level: Dict[str, Any]) -> None:
+    print(f"\n=== {level['rate']} msg/s: sent {level['sent']} ({level['offered_per_s']}/s), "
+          f"replies {level['replies']} ({level['replies_per_s']}/s), missing {level['missing_replies']}, "
+          f"fallbacks {level['fallback_replies']} ===")
+    print(f"webhook ms  p50 {level['webhook_ms_p50']:>9}  p95 {level['webhook_ms_p95']:>9}  p99 {level['webhook_ms_p99']:>9}")
+    print(f"reply ms    p50 {level['reply_ms_p50']:>9}  p95 {level['reply_ms_p95']:>9}  p99 {level['reply_ms_p99']:>9}")
+    print(f"errors {level['error_rate']:.2%}  statuses {level['webhook_status']}  db growth {level['db_growth_kb']} KB"
+          f"  {'sustained' if level['sustained'] else 'NOT sustained'}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 5, 10], help="Offered messages/s per level")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per level")
+    parser.add_argument("--drain", type=float, default=30.0, help="Seconds to wait for outstanding replies")
+    parser.add_argument("--chats", type=int, default=50, help="Distinct chat_ids")
+    parser.add_argument("--history", type=int, default=4, help="Turns sent to every chat before measuring")
+    parser.add_argument("--burst-prob", type=float, default=0.2, help="Chance of each extra message in a burst")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Webhook request timeout (Telegram gives up at ~60s)")
+    parser.add_argument("--bot-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--api-port", type=int, default=8901, help="Port of the fake Telegram API served here")
+    parser.add_argument("--db", help="Checkpoint DB to measure growth of (a temp DB with --spawn)")
+    parser.add_argument("--spawn", action="store_true", help="Start the mock LLM server and one bot worker")
+    parser.add_argument("--bot-port", type=int, default=8001)
+    parser.add_argument("--llm-port", type=int, default=8900)
+    parser.add_argument("--latency", default="prod", help="Mock LLM latency profile (with --spawn)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    if args.spawn:
+        args.bot_url = f"http://127.0.0.1:{args.bot_port}"
+
+    results = asyncio.run(load_test(args))
+    print(f"\nMax sustained rate: {results['max_sustained_rate']} msg/s per worker")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Local mock of the OpenAI chat-completions API, as used by ChatOpenAI and ChatGroq.
+
+Serves `POST /v1/chat/completions` (OpenAI) and `POST /openai/v1/chat/completions`
+(Groq) with canned, schema-valid responses from `benchmarks.canned`, including
+SSE streaming and JSON mode. Latency, 5xx errors and 429 rate limits can be
+injected from the command line or changed at runtime via `POST /mock/config`.
+
+Run it and point the bot at it:
+
+    python -m benchmarks.mock_llm_server --port 8900 --latency prod --rate-limit-rate 0.02
+    GROQ_BASE_URL=http://localhost:8900 OPENAI_BASE_URL=http://localhost:8900/v1 python run_telegram_bot.py
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+from aiohttp import web
+
+from benchmarks.canned import canned_response
+from benchmarks.fake_llm import PROFILES, LatencyProfile
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+STREAM_CHUNK_CHARS = 16
+
+
+class MockConfig:
+    """Runtime behaviour of the mock server.
+
+    Attributes:
+        latency: Latency profile sampled per request (per model).
+        error_rate: Fraction of requests answered with a 500.
+        rate_limit_rate: Fraction of requests answered with a 429.
+        retry_after_s: Retry-After header sent with 429s.
+    """
+
+    def __init__(self, latency: LatencyProfile, error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 retry_after_s: float = 1.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_s = retry_after_s
+        self.rng = random.Random(seed)
+        self.counts: Dict[str, int] = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0}
+
+    def update(self, data: Dict[str, Any]) -> None:
+        if "latency" in data:
+            self.latency = PROFILES[data["latency"]]
+        if "median_ms" in data or "sigma" in data:
+            self.latency = LatencyProfile(median_ms=float(data.get("median_ms", 0)), sigma=float(data.get("sigma", 0)))
+        for key in ("error_rate", "rate_limit_rate", "retry_after_s"):
+            if key in data:
+                setattr(self, key, float(data[key]))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "median_ms": self.latency.median_ms,
+            "sigma": self.latency.sigma,
+            "per_model": self.latency.per_model,
+            "error_rate": self.error_rate,
+            "rate_limit_rate": self.rate_limit_rate,
+            "retry_after_s": self.retry_after_s,
+            "counts": self.counts,
+        }
+
+
+def _content(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):  # content parts
+        return "\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content)
+
+
+def completion_text(body: Dict[str, Any]) -> str:
+    """Returns the canned reply for a chat-completions request body."""
+    messages: List[Dict[str, Any]] = body.get("messages", [])
+    system = "\n".join(_content(m) for m in messages if m.get("role") == "system")
+    prompt = "\n".join(_content(m) for m in messages)
+    text = canned_response(system, prompt)
+    if text is None:
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        text = "{}" if json_mode else "ok"
+    return text
+
+
+def _usage(body: Dict[str, Any], text: str) -> Dict[str, int]:
+    prompt_tokens = sum(count_tokens(_content(m)) for m in body.get("messages", []))
+    completion_tokens = count_tokens(text)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _error(status: int, message: str, kind: str, headers: Dict[str, str] = None) -> web.Response:
+    return web.json_response({"error": {"message": message, "type": kind, "code": kind}}, status=status, headers=headers)
+
+
+async def chat_completions(request: web.Request) -> web.StreamResponse:
+    config: MockConfig = request.app["config"]
+    body = await request.json()
+    model = body.get("model", "unknown")
+    config.counts["requests"] += 1
+
+    roll = config.rng.random()
+    if roll < config.rate_limit_rate:
+        config.counts["rate_limited"] += 1
+        return _error(429, "Rate limit reached (mock)", "rate_limit_exceeded",
+                      headers={"retry-after": str(config.retry_after_s)})
+    if roll < config.rate_limit_rate + config.error_rate:
+        config.counts["errors"] += 1
+        return _error(500, "Internal server error (mock)", "server_error")
+
+    text = completion_text(body)
+    delay = config.latency.sample(model)
+    completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(delay)
+        return web.json_response({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": _usage(body, text),
+        })
+
+    config.counts["streamed"] += 1
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+
+    def chunk(delta: Dict[str, Any], finish_reason=None, **extra) -> bytes:
+        payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+        return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
+
+    pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+    await response.write(chunk({"role": "assistant", "content": ""}))
+    for piece in pieces:
+        await asyncio.sleep(delay / len(pieces))
+        await response.write(chunk({"content": piece}))
+    # Groq reports usage under x_groq on the final chunk, OpenAI under usage
+    usage = _usage(body, text)
+    await response.write(chunk({}, "stop", usage=usage, x_groq={"usage": usage}))
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+async def get_config(request: web.Request) -> web.Response:
+    return web.json_response(request.app["config"].describe())
+
+
+async def set_config(request: web.Request) -> web.Response:
+    config: MockConfig = request.app["config"]
+    try:
+        config.update(await request.json())
+    except (KeyError, ValueError) as e:
+        return _error(400, f"Invalid mock config: {e}", "invalid_request_error")
+    return web.json_response(config.describe())
+
+
+def create_app(config: MockConfig) -> web.Application:
+    app = web.Application()
+    app["config"] = config
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/openai/v1/chat/completions", chat_completions)
+    app.router.add_get("/mock/config", get_config)
+    app.router.add_post("/mock/config", set_config)
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", choices=sorted(PROFILES), default="prod", help="Latency profile")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that return 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests that return 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    config = MockConfig(PROFILES[args.latency], args.error_rate, args.rate_limit_rate, args.retry_after, args.seed)
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Replays recorded production conversations through the current graph.
+
+1. Record LLM calls in production with `LLM_CASSETTE_MODE=record`.
+2. Export the conversations from the checkpoint DB:
+
+    python -m benchmarks.replay export --db data/vee_short_memory.db --out conversations.jsonl
+
+3. Replay them through a modified graph with no network calls, serving every
+   LLM call from the cassette:
+
+    python -m benchmarks.replay run conversations.jsonl --match fuzzy
+
+The run reports turn latency, how many replies changed compared with the
+recorded ones (difflib similarity) and cassette hits/misses. With strict
+matching, any prompt the modified graph changed is a miss; fuzzy matching
+serves the most similar recorded prompt instead.
+"""
+import argparse
+import asyncio
+import contextlib
+import difflib
+import io
+import json
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.bench_graph import percentile, run_turn
+from config.settings import settings
+
+CHANGED_BELOW = 0.9
+
+
+def export(db_path: str, out_path: str, limit: Optional[int] = None) -> int:
+    """Dumps each thread's latest checkpoint as {"thread_id", "turns": [{"user", "reply"}]} lines."""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from graph.serde import get_serializer
+
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    saver = SqliteSaver(conn, serde=get_serializer())
+    thread_ids = [row[0] for row in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+    count = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        for thread_id in thread_ids[:limit]:
+            checkpoint = saver.get_tuple({"configurable": {"thread_id": thread_id}})
+            if checkpoint is None:
+                continue
+            turns: List[Dict[str, str]] = []
+            for message in checkpoint.checkpoint["channel_values"].get("messages", []):
+                if message.type == "human":
+                    turns.append({"user": str(message.content), "reply": ""})
+                elif message.type == "ai" and turns:
+                    turns[-1]["reply"] = str(message.content)
+            if turns:
+                f.write(json.dumps({"thread_id": thread_id, "turns": turns}, ensure_ascii=False) + "\n")
+                count += 1
+    conn.close()
+    return count
+
+
+def load_conversations(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def replay(conversations: List[Dict[str, Any]], show_logs: bool = False) -> Dict[str, Any]:
+    """Runs every conversation turn by turn and compares the replies with the recorded ones."""
+    from langgraph.checkpoint.memory import MemorySaver
+
+    import graph.build_graph as build_graph_module
+    from graph.serde import get_serializer
+    from llms.cassette import CassetteMiss, install_cassette
+
+    cassette = install_cassette()
+    app = build_graph_module.build_graph(MemorySaver(serde=get_serializer()))
+    walls: List[float] = []
+    similarities: List[float] = []
+    changed: List[Dict[str, Any]] = []
+    failed: List[Dict[str, Any]] = []
+    run_id = str(int(time.time()))
+
+    async def run_conversation(conversation: Dict[str, Any]) -> None:
+        chat_id = f"replay-{run_id}-{conversation['thread_id']}"
+        config = {"configurable": {"thread_id": chat_id}}
+        for turn in conversation["turns"]:
+            try:
+                timings = await run_turn(app, chat_id, turn["user"])
+            except CassetteMiss as e:
+                # An unrecorded call; the rest of the thread would diverge
+                failed.append({"thread_id": conversation["thread_id"], "user": turn["user"], "error": str(e)})
+                return
+            walls.append(timings["wall"] * 1000)
+            state = await app.aget_state(config)
+            messages = state.values.get("messages", [])
+            reply = str(messages[-1].content) if messages and messages[-1].type == "ai" else ""
+            if not turn.get("reply"):
+                continue
+            ratio = difflib.SequenceMatcher(None, turn["reply"], reply).ratio()
+            similarities.append(ratio)
+            if ratio < CHANGED_BELOW:
+                changed.append({"thread_id": conversation["thread_id"], "user": turn["user"],
+                                "recorded": turn["reply"], "replayed": reply, "similarity": round(ratio, 3)})
+
+    output = None if show_logs else io.StringIO()
+    with contextlib.redirect_stdout(output) if output else contextlib.nullcontext():
+        started = time.perf_counter()
+        await asyncio.gather(*(run_conversation(c) for c in conversations))
+        elapsed = time.perf_counter() - started
+
+    recorded_ms = [e["latency_ms"] for e in cassette.entries() if e.get("latency_ms") is not None] if cassette else []
+    return {
+        "conversations": len(conversations),
+        "turns": len(walls),
+        "elapsed_s": round(elapsed, 3),
+        "turn_ms_p50": round(percentile(walls, 0.5), 2),
+        "turn_ms_p95": round(percentile(walls, 0.95), 2),
+        "recorded_llm_ms_p50": round(percentile(recorded_ms, 0.5), 2),
+        "recorded_llm_ms_p95": round(percentile(recorded_ms, 0.95), 2),
+        "reply_similarity_mean": round(sum(similarities) / len(similarities), 3) if similarities else None,
+        "replies_changed": len(changed),
+        "turns_failed": len(failed),
+        "cassette": dict(cassette.stats) if cassette else None,
+        "changed": changed,
+        "failed": failed,
+    }
+
+
+def print_report(results: Dict[str, Any], show_changed: int) -> None:
+    print(f"\n=== {results['conversations']} conversations, {results['turns']} turns in {results['elapsed_s']}s ===")
+    print(f"turn ms          p50 {results['turn_ms_p50']:>9}  p95 {results['turn_ms_p95']:>9}   (replayed, no network)")
+    print(f"recorded llm ms  p50 {results['recorded_llm_ms_p50']:>9}  p95 {results['recorded_llm_ms_p95']:>9}   (per call)")
+    print(f"reply similarity mean {results['reply_similarity_mean']}, changed replies: {results['replies_changed']}")
+    print(f"cassette: {results['cassette']}, turns failed on a miss: {results['turns_failed']}")
+    for item in results["changed"][:show_changed]:
+        print(f"\n[{item['thread_id']}] {item['user']!r} (similarity {item['similarity']})")
+        print(f"  recorded: {item['recorded'][:200]!r}")
+        print(f"  replayed: {item['replayed'][:200]!r}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export conversations from a checkpoint DB")
+    export_parser.add_argument("--db", default="data/vee_short_memory.db")
+    export_parser.add_argument("--out", default="conversations.jsonl")
+    export_parser.add_argument("--limit", type=int, help="Export at most this many threads")
+
+    run_parser = commands.add_parser("run", help="Replay exported conversations through the graph")
+    run_parser.add_argument("conversations", help="JSONL file written by `export`")
+    run_parser.add_argument("--cassette", default=settings.LLM_CASSETTE_PATH)
+    run_parser.add_argument("--mode", choices=["replay", "record"], default="replay",
+                            help="`record` calls the real providers and appends to the cassette")
+    run_parser.add_argument("--match", choices=["strict", "fuzzy"], default=settings.LLM_CASSETTE_MATCH)
+    run_parser.add_argument("--threshold", type=float, default=settings.LLM_CASSETTE_FUZZY_THRESHOLD)
+    run_parser.add_argument("--show-changed", type=int, default=5, help="Print this many changed replies")
+    run_parser.add_argument("--json", help="Also write the results to this JSON file")
+    run_parser.add_argument("--show-logs", action="store_true", help="Keep the nodes' console output")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(f"Exported {export(args.db, args.out, args.limit)} conversations to {args.out}")
+        return
+
+    settings.LLM_CASSETTE_MODE = args.mode
+    settings.LLM_CASSETTE_MATCH = args.match
+    settings.LLM_CASSETTE_PATH = args.cassette
+    settings.LLM_CASSETTE_FUZZY_THRESHOLD = args.threshold
+    results = asyncio.run(replay(load_conversations(args.conversations), args.show_logs))
+    print_report(results, args.show_changed)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Runtime settings for the Vee conversation graph."""
+from typing import Literal, Optional
+from pydantic_settings import BaseSettings
+from pydantic import ConfigDict
+
+class VeeSettings(BaseSettings):
+    """Feature flags and tuning knobs for the conversation graph.
+
+    Attributes:
+        FUSED_FRONT_END: Run safety, sensing and mode decision as one fused LLM call.
+        SENSING_MODE: "llm", "local" (lexicon detector only) or "hybrid" (local first, escalate ambiguous turns).
+        SENSING_ESCALATION_THRESHOLD: Local uncertainty above which hybrid sensing calls the LLM.
+        LLM_HEDGING: Hedge slow drafter/generator calls with a duplicate request.
+        HEDGE_QUANTILE: Observed latency quantile after which a call is hedged.
+        HEDGE_MIN_SAMPLES: Samples needed per model before the observed quantile is trusted.
+        HEDGE_DEFAULT_DELAY_S: Hedge delay used until enough samples exist.
+        HEDGE_MIN_DELAY_S: Lower bound on the hedge delay.
+        HEDGE_MAX_RATE: Maximum fraction of calls that may be hedged (5 minute window).
+        HEDGE_MAX_TOKENS_PER_MINUTE: Maximum tokens spent on hedge requests per minute.
+        TURN_DEADLINE_S: Reply SLO per turn; nodes degrade as it runs out. None (default) disables the deadline.
+            It must leave IR_DEEP_MIN_REMAINING_S after the safety/sensing/mode calls, or most assistant turns use quick IR.
+        TURN_DEADLINE_GRACE_S: Extra time the handler waits past the deadline before replying with a fallback.
+        PLANNER_MIN_REMAINING_S: Below this many seconds left, skip the bestie planner and draft from sensing.
+        IR_DEEP_MIN_REMAINING_S: Below this many seconds left, use quick (single call) IR instead of the deep pipeline.
+        IR_QUICK_MIN_REMAINING_S: Below this many seconds left, reply with a fallback message instead of IR.
+        IR_MAP_REDUCE: Write multi-part Learn answers as concurrent per-task sections joined in order.
+        IR_MAP_REDUCE_MIN_TASKS: Plan tasks needed before an answer is split into sections.
+        IR_MAP_REDUCE_CONCURRENCY: Sections generated at the same time per answer.
+        IR_STREAM_SECTIONS: Send each section to Telegram as soon as it and the ones before it are written.
+        MODEL_ROUTING: Pick each node's model from its acceptable set by live latency/errors and turn complexity.
+        ROUTER_LATENCY_REF_S: Latency that costs as much as one unit in the routing cost.
+        ROUTER_ERROR_WEIGHT: Routing cost of a 100% error rate, in latency units.
+        ROUTER_QUALITY_WEIGHT: Routing cost of using a weak model on a maximally complex turn.
+        ROUTER_EXPLORE_RATE: Fraction of calls routed at random to keep every model's stats fresh.
+        GROQ_BASE_URL: Override the Groq API base URL, e.g. a local mock server.
+        OPENAI_BASE_URL: Override the OpenAI API base URL, e.g. a local mock server.
+        LLM_CASSETTE_MODE: "off", "record" (append every LLM call to the cassette) or "replay" (serve calls from it).
+        LLM_CASSETTE_MATCH: "strict" (exact model, params and prompt) or "fuzzy" (most similar prompt for the model).
+        LLM_CASSETTE_PATH: Cassette file (gzipped JSON lines).
+        LLM_CASSETTE_FUZZY_THRESHOLD: Minimum prompt similarity (0-1) accepted by fuzzy matching.
+        LONG_TERM_MEMORY: Save facts about each user and recall the relevant ones into the bestie prompts.
+        MEMORY_DIR: Directory of the memory-mapped memory index.
+        MEMORY_TOP_K: Memories recalled per turn.
+        MEMORY_MIN_SCORE: Minimum cosine similarity for a memory to be recalled.
+        MEMORY_DEDUP_THRESHOLD: Cosine similarity above which a new fact refreshes an existing memory.
+        MEMORY_EMBEDDING_DIM: Dimension of the hashed embeddings; fixed once the index exists.
+        KNOWLEDGE_INDEX: Ground assistant answers in passages from the local BM25 knowledge index.
+        KNOWLEDGE_DIR: Directory of the knowledge index (built with `python -m layers.perceive.knowledge_index add`).
+        KNOWLEDGE_TOP_K: Passages retrieved per assistant turn.
+        KNOWLEDGE_MIN_SCORE: Minimum BM25 score for a passage to be used.
+        FACT_CHECK_BATCH_SIZE: Claims verified per fact-checker call.
+        FACT_CHECK_CONCURRENCY: Fact-checker calls run at the same time.
+        FACT_CHECK_EXCERPTS: Most relevant document excerpts sent with each batch of claims.
+        CHECKPOINT_COMPRESSION: Codec for checkpoint blobs ("zstd", "zlib" or "none"), see graph.serde.
+        CHECKPOINT_COMPRESS_MIN_BYTES: Blobs smaller than this are stored uncompressed.
+        REFLECTION: Run reflection jobs (impact, memory, strategy) in the background after each reply.
+        REFLECT_CONCURRENCY: Turns reflected on concurrently.
+        REFLECT_MAX_RETRIES: Extra attempts for a failing reflection job.
+        REFLECT_RETRY_BACKOFF_S: Backoff before the first retry; doubles on each further retry.
+        REFLECT_QUEUE_SIZE: Pending turns kept before new ones are dropped.
+        SHADOW_REVIEW_RATE: Fraction of sent replies reviewed in the background by the reviewer LLM (0 disables).
+        SHADOW_REVIEW_BATCH_SIZE: Replies reviewed per reviewer call.
+        SHADOW_REVIEW_MAX_WAIT_S: Longest a sampled reply waits for its batch to fill.
+        SHADOW_REVIEW_QUEUE_SIZE: Sampled replies kept before new ones are dropped.
+        SHADOW_REVIEW_PATH: JSON-lines file the review scores are appended to.
+        BESTIE_PIPELINE: "two_stage" (planner then drafter), "fused" (plan and message in one call) or "ab" (split chats between the two).
+        BESTIE_FUSED_SHARE: Fraction of chats served by the fused pipeline when BESTIE_PIPELINE is "ab".
+        STRATEGY_POLICY: Learn plans per sensing state from reflection scores and skip the bestie planner LLM once confident.
+        POLICY_PATH: JSON file the strategy policy table is saved to.
+        POLICY_MIN_VISITS: Scored turns a sensing state needs before the policy may plan it.
+        POLICY_MIN_ARM_VISITS: Scored turns a plan shape needs before the policy may serve it.
+        POLICY_MIN_REWARD: Mean impact score the best trusted shape needs before the LLM is skipped.
+        POLICY_EXPLORE_RATE: Fraction of confident turns still planned by the LLM to discover new shapes.
+    """
+    FUSED_FRONT_END: bool = False
+    SENSING_MODE: Literal["llm", "local", "hybrid"] = "llm"
+    SENSING_ESCALATION_THRESHOLD: float = 0.55
+    LLM_HEDGING: bool = False
+    HEDGE_QUANTILE: float = 0.9
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_DEFAULT_DELAY_S: float = 4.0
+    HEDGE_MIN_DELAY_S: float = 0.3
+    HEDGE_MAX_RATE: float = 0.1
+    HEDGE_MAX_TOKENS_PER_MINUTE: int = 20000
+    TURN_DEADLINE_S: Optional[float] = None
+    TURN_DEADLINE_GRACE_S: float = 1.0
+    PLANNER_MIN_REMAINING_S: float = 5.0
+    IR_DEEP_MIN_REMAINING_S: float = 6.0
+    IR_QUICK_MIN_REMAINING_S: float = 1.5
+    IR_MAP_REDUCE: bool = False
+    IR_MAP_REDUCE_MIN_TASKS: int = 3
+    IR_MAP_REDUCE_CONCURRENCY: int = 4
+    IR_STREAM_SECTIONS: bool = False
+    MODEL_ROUTING: bool = False
+    ROUTER_LATENCY_REF_S: float = 2.0
+    ROUTER_ERROR_WEIGHT: float = 5.0
+    ROUTER_QUALITY_WEIGHT: float = 4.0
+    ROUTER_EXPLORE_RATE: float = 0.05
+    GROQ_BASE_URL: Optional[str] = None
+    OPENAI_BASE_URL: Optional[str] = None
+    LLM_CASSETTE_MODE: Literal["off", "record", "replay"] = "off"
+    LLM_CASSETTE_MATCH: Literal["strict", "fuzzy"] = "strict"
+    LLM_CASSETTE_PATH: str = "data/cassettes/llm.jsonl.gz"
+    LLM_CASSETTE_FUZZY_THRESHOLD: float = 0.8
+    LONG_TERM_MEMORY: bool = False
+    MEMORY_DIR: str = "data/memory"
+    MEMORY_TOP_K: int = 5
+    MEMORY_MIN_SCORE: float = 0.1
+    MEMORY_DEDUP_THRESHOLD: float = 0.9
+    MEMORY_EMBEDDING_DIM: int = 256
+    KNOWLEDGE_INDEX: bool = False
+    KNOWLEDGE_DIR: str = "data/knowledge"
+    KNOWLEDGE_TOP_K: int = 4
+    KNOWLEDGE_MIN_SCORE: float = 2.0
+    FACT_CHECK_BATCH_SIZE: int = 3
+    FACT_CHECK_CONCURRENCY: int = 10
+    FACT_CHECK_EXCERPTS: int = 4
+    CHECKPOINT_COMPRESSION: Literal["zstd", "zlib", "none"] = "zstd"
+    CHECKPOINT_COMPRESS_MIN_BYTES: int = 1024
+    REFLECTION: bool = False
+    REFLECT_CONCURRENCY: int = 2
+    REFLECT_MAX_RETRIES: int = 2
+    REFLECT_RETRY_BACKOFF_S: float = 0.5
+    REFLECT_QUEUE_SIZE: int = 1000
+    SHADOW_REVIEW_RATE: float = 0.0
+    SHADOW_REVIEW_BATCH_SIZE: int = 8
+    SHADOW_REVIEW_MAX_WAIT_S: float = 30.0
+    SHADOW_REVIEW_QUEUE_SIZE: int = 200
+    SHADOW_REVIEW_PATH: str = "data/reviews.jsonl"
+    BESTIE_PIPELINE: Literal["two_stage", "fused", "ab"] = "two_stage"
+    BESTIE_FUSED_SHARE: float = 0.5
+    STRATEGY_POLICY: bool = False
+    POLICY_PATH: str = "data/strategy_policy.json"
+    POLICY_MIN_VISITS: int = 8
+    POLICY_MIN_ARM_VISITS: int = 3
+    POLICY_MIN_REWARD: float = 0.55
+    POLICY_EXPLORE_RATE: float = 0.1
+
+    model_config = ConfigDict(env_file='.env', extra='allow')
+
+settings = VeeSettings()
@@ -3,17 +3,22 @@ from datetime import datetime
 from pathlib import Path
 from langgraph.graph import StateGraph
 from langchain_core.messages import HumanMessage
-from .state import VeeState
+from .state import VeeState, changes_only
+from .checkpointer import DurableCheckpointer, ephemeral_channels
 from .nodes import (
     ingest_node, safety_triage_node, sense_text_node, mode_decider_node, 
     bestie_planner_node, bestie_drafter_node, buttons_node, persist_assistant_node, 
-    vee_information_guardian
+    vee_information_guardian, front_end_node, bestie_fused_node
 )
-from .edges import mode_decider_edge
+from .edges import mode_decider_edge, front_end_edge
+from config.settings import settings
 
 def build_graph(checkpointer):
     """Build the Vee conversation workflow graph.
 
+    Nodes return only the channels they changed, and writes to ephemeral
+    channels (see graph.state) are not passed to the checkpointer.
+
     Returns:
         A compiled LangGraph workflow with a SQLite checkpointer.
     """
@@ -22,26 +27,46 @@ def build_graph(checkpointer):
     # 1. Define Nodes
     # =========================================================================
     # Core pipeline nodes
-    workflow.add_node("ingest", ingest_node)
-    workflow.add_node("safety", safety_triage_node)
-    workflow.add_node("perception", sense_text_node)
-    workflow.add_node("mode_decider", mode_decider_node)
+    workflow.add_node("ingest", changes_only(ingest_node))
+    workflow.add_node("safety", changes_only(safety_triage_node))
+    workflow.add_node("perception", changes_only(sense_text_node))
+    workflow.add_node("mode_decider", changes_only(mode_decider_node))
+    if settings.FUSED_FRONT_END:
+        workflow.add_node("front_end", changes_only(front_end_node))
 
     # Expertise and Persona nodes
-    workflow.add_node("vee_information_guardian", vee_information_guardian)
-    workflow.add_node("bestie_planner", bestie_planner_node)
-    workflow.add_node("bestie_drafter", bestie_drafter_node)
+    workflow.add_node("vee_information_guardian", changes_only(vee_information_guardian))
+    workflow.add_node("bestie_planner", changes_only(bestie_planner_node))
+    workflow.add_node("bestie_drafter", changes_only(bestie_drafter_node))
+    # Bestie mode goes to the dynamic planner, or plans and drafts in one call (BESTIE_PIPELINE)
+    bestie_routes = {"bestie": "bestie_planner"}
+    if settings.BESTIE_PIPELINE != "two_stage":
+        workflow.add_node("bestie_fused", changes_only(bestie_fused_node))
+        bestie_routes["bestie_fused"] = "bestie_fused"
 
     # Finalization nodes
-    workflow.add_node("load_buttons", buttons_node)
-    workflow.add_node("persist_assistant", persist_assistant_node)
+    workflow.add_node("load_buttons", changes_only(buttons_node))
+    workflow.add_node("persist_assistant", changes_only(persist_assistant_node))
 
     # 2. Define Edges
     # =========================================================================
     workflow.set_entry_point("ingest")
 
     # Core flow
-    workflow.add_edge("ingest", "safety")
+    if settings.FUSED_FRONT_END:
+        # One fused call decides the mode; the separate nodes are only a fallback
+        workflow.add_edge("ingest", "front_end")
+        workflow.add_conditional_edges(
+            "front_end",
+            front_end_edge,
+            {
+                "assistant": "vee_information_guardian",
+                **bestie_routes,
+                "fallback": "safety",
+            }
+        )
+    else:
+        workflow.add_edge("ingest", "safety")
     workflow.add_edge("safety", "perception")
     workflow.add_edge("perception", "mode_decider")
 
@@ -51,7 +76,7 @@ def build_graph(checkpointer):
         mode_decider_edge,
         {
             "assistant": "vee_information_guardian",  # Assistant mode uses the IR agent
-            "bestie": "bestie_planner",          # Bestie mode goes to the new dynamic planner
+            **bestie_routes,
         }
     )
 
@@ -61,8 +86,12 @@ def build_graph(checkpointer):
     # Converge paths to final steps
     workflow.add_edge("vee_information_guardian", "persist_assistant")  # End assistant flow here
     workflow.add_edge("bestie_drafter", "load_buttons")
+    if "bestie_fused" in bestie_routes:
+        workflow.add_edge("bestie_fused", "load_buttons")
     workflow.add_edge("load_buttons", "persist_assistant")
 
     # 3. Compile the graph
     # =========================================================================
+    if checkpointer is not None:
+        checkpointer = DurableCheckpointer(checkpointer, ephemeral_channels(VeeState))
     return workflow.compile(checkpointer=checkpointer)
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""Checkpointer wrapper that persists only durable state channels."""
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.channels import UntrackedValue
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointMetadata, CheckpointTuple
+
+
+def ephemeral_channels(schema: type) -> FrozenSet[str]:
+    """Names of the channels of a state schema declared `Ephemeral` (see graph.state)."""
+    return frozenset(
+        key for key, typ in getattr(schema, "__annotations__", {}).items()
+        if any(isinstance(meta, UntrackedValue) for meta in getattr(typ, "__metadata__", ()))
+    )
+
+
+class DurableCheckpointer(BaseCheckpointSaver):
+    """Delegates to `saver`, dropping pending writes to ephemeral channels.
+
+    LangGraph already leaves untracked channels out of checkpoints, but still
+    saves every node's writes to them as pending writes. Those only matter for
+    resuming an interrupted step, and a turn is never resumed: the next
+    message starts a new run that recomputes them.
+
+    Args:
+        saver: The checkpointer that stores the durable state.
+        ephemeral: Channel names whose writes are not stored.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, ephemeral: FrozenSet[str]):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.ephemeral = ephemeral
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def _durable(self, writes: Sequence[Tuple[str, Any]]) -> Sequence[Tuple[str, Any]]:
+        return [(channel, value) for channel, value in writes if channel not in self.ephemeral]
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver.get_tuple(config)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self.saver.aget_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs: Any) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, **kwargs)
+
+    def alist(self, config: Optional[RunnableConfig], **kwargs: Any) -> AsyncIterator[CheckpointTuple]:
+        return self.saver.alist(config, **kwargs)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: Dict[str, Any]) -> RunnableConfig:
+        return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: Dict[str, Any]) -> RunnableConfig:
+        return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        writes = self._durable(writes)
+        if writes:
+            self.saver.put_writes(config, writes, task_id, task_path)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        writes = self._durable(writes)
+        if writes:
+            await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver.delete_thread(thread_id)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.saver.adelete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[Any], channel: None) -> Any:
+        return self.saver.get_next_version(current, channel)
@@ -3,11 +3,31 @@ from .state import VeeState
 from llms.mode_decider import get_mode_decider_chain
 from llms.expertise_router import get_expertise_router_chain
 from langchain_core.messages.utils import get_buffer_string
+from config.settings import settings
+from utils.experiments import in_treatment
+
+def bestie_pipeline(state: VeeState) -> str:
+    """Which bestie pipeline serves this chat: "fused" or "two_stage" (see `BESTIE_PIPELINE`)."""
+    if settings.BESTIE_PIPELINE == "ab":
+        chat_id = (state.get("user") or {}).get("chat_id")
+        return "fused" if in_treatment("bestie_pipeline", chat_id, settings.BESTIE_FUSED_SHARE) else "two_stage"
+    return settings.BESTIE_PIPELINE
+
+def _route_mode(state: VeeState, mode: str) -> str:
+    # Bestie turns go to the fused plan+draft node when this chat uses it
+    if mode == "bestie" and bestie_pipeline(state) == "fused":
+        return "bestie_fused"
+    return mode
 
 def mode_decider_edge(state: VeeState) -> str:
     """Reads the mode from the state and returns it for routing."""
     mode = state.get("mode", "bestie") # Default to bestie if not found
-    return mode
+    return _route_mode(state, mode)
+
+def front_end_edge(state: VeeState) -> str:
+    """Routes on the fused front-end's mode, or to the separate nodes if it failed."""
+    mode = state.get("mode")
+    return _route_mode(state, mode) if mode else "fallback"
 
 def expertise_router_edge(state: VeeState) -> str:
     """
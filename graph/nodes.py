@@ -1,35 +1,29 @@
 from typing import Dict, Any, List
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.messages.utils import get_buffer_string
+from langgraph.config import get_stream_writer
 
 from .state import VeeState
 from llms.safety import safety_triage
+from llms.front_end import front_end_triage
 from llms.sensing import sense
-from llms.planner import plan_next_move
-from llms.drafter import draft
+from llms.planner import plan_next_move, plan_from_sensing, plan_and_draft
 from llms.mode_decider import get_mode_decider_chain
-from langchain_core.output_parsers import PydanticOutputParser
-from llms.llm_factory import get_groq_llm
-from models.bestie import BestiePlan
-from .vee_ir import load_prompt
+from llms.router import router, complexity
+from llms.hedging import HedgedLLM
+from layers.perceive.memory_access import user_profile
+from layers.reflect.strategy_adjuster import get_policy
+from prompts.registry import registry
+from config.settings import settings
+from utils.token_budget import budget
+from utils.state_utils import build_turn_context, draft_source, get_turn, mood_trajectory, record_reply, to_role_dicts, update_trackers, with_sensing
+from utils.token_budget import compact_json
+from utils import deadline
+import asyncio
 import json
-import re
-from datetime import datetime
 
 # Import the Vee IR graph builder and its state
-from .vee_ir import build_graph as build_vee_ir_graph, VeeIRState as VeeIRGraphState
-
-# Helper Functions
-# =========================================================================
-def _get_formatted_messages(messages: List[HumanMessage | AIMessage]) -> List[Dict[str, str]]:
-    """Formats messages into a list of dicts for LLM prompts."""
-    formatted = []
-    for m in messages:
-        if isinstance(m, HumanMessage):
-            formatted.append({"role": "user", "content": m.content})
-        elif isinstance(m, AIMessage):
-            formatted.append({"role": "assistant", "content": m.content})
-    return formatted
+from .vee_ir import build_graph as build_vee_ir_graph, build_quick_graph as build_quick_ir_graph, VeeIRState as VeeIRGraphState
 
 # Graph Nodes
 # =========================================================================
@@ -37,46 +31,76 @@ def _get_formatted_messages(messages: List[HumanMessage | AIMessage]) -> List[Di
 # 1. Core Pipeline Nodes (Sequential)
 # -------------------------------------------------------------------------
 def ingest_node(state: dict) -> dict:
-    """Extracts the latest user message and saves it to the state."""
+    """Extracts the latest user message and builds the shared turn context."""
     print("\n--- 1. INGEST NODE ---")
     messages = state["messages"]
     for m in reversed(messages):
         if isinstance(m, HumanMessage):
             state["last_user_text"] = m.content
             break
-    print(f"Ingest complete. Last user text: '{state.get('last_user_text', '')[:50]}...'\n")
+    state["turn"] = build_turn_context(messages, state.get("last_user_text") or "")
+    state["trackers"] = update_trackers(state.get("trackers"), state.get("last_user_text") or "")
+    state["draft_source"] = None
+    # The handler normally starts the turn (possibly without a deadline); otherwise it starts now
+    if "deadline" not in state:
+        state["deadline"] = deadline.get_deadline() or deadline.start_turn()
+    print(f"Ingest complete. Last user text: '{state.get('last_user_text', '')[:50]}...'")
+    print(f"Turn token counts: {state['turn'].token_counts}\n")
     return state
 
 def safety_triage_node(state: dict) -> dict:
     """Runs safety triage on the latest user text and records the risk level."""
     print("\n--- 2. SAFETY TRIAGE NODE ---")
-    text = state.get("last_user_text", "")
+    text = get_turn(state).text_for("safety")
     tri = safety_triage(text)
     state["risk_level"] = tri.get("risk_level") if isinstance(tri, dict) else None
     print(f"Safety triage complete. Risk level: {state.get('risk_level')}\n")
     return state
 
+def front_end_node(state: dict) -> dict:
+    """Runs the fused safety/sensing/mode call; clears `mode` so the separate nodes run on failure."""
+    print("\n--- 2. FUSED FRONT-END NODE ---")
+    turn = get_turn(state)
+
+    writer = get_stream_writer()
+
+    def on_field(key: str, value: Any) -> None:
+        # Surface the risk level and mode on the custom stream as soon as they are generated
+        if key in ("risk_level", "mode"):
+            writer({"front_end": {key: value}})
+
+    result = front_end_triage(turn.text_for("front_end"), turn.history_for("front_end"), on_field)
+    if result is None:
+        state["mode"] = None
+        print("Fused front-end failed. Falling back to separate safety/sensing/mode nodes.\n")
+        return state
+
+    state["risk_level"] = result["risk_level"]
+    state["sensing"] = result["sensing"]
+    state["turn"] = with_sensing(turn, result["sensing"])
+    state["mode"] = result["mode"]
+    print(f"Fused front-end complete. Risk level: {state['risk_level']}, mode: {state['mode']}\n")
+    return state
+
 def sense_text_node(state: dict) -> dict:
     """Analyzes the user's text for emotional and conversational cues."""
     print("\n--- 3. SENSE TEXT NODE ---")
-    text = state.get("last_user_text", "")
-    recent_msgs = state["messages"][-5:]
-    conversation_history = get_buffer_string(recent_msgs)
-    formatted_messages = _get_formatted_messages(recent_msgs)
-    
-    state["sensing"] = sense(text, conversation_history, formatted_messages)
+    turn = get_turn(state)
+
+    state["sensing"] = sense(turn.text_for("sensing"), turn.history_for("sensing"), to_role_dicts(turn.fitted_messages("sensing")))
+    state["turn"] = with_sensing(turn, state["sensing"])
     print(f"Sensing complete. Sensing data present: {'sensing' in state}\n")
     return state
 
 def mode_decider_node(state: VeeState) -> VeeState:
     """Determines the mode ('bestie' or 'assistant') and saves it to the state."""
     print("\n--- 4. MODE DECIDER NODE ---")
-    mode_decider_chain = get_mode_decider_chain()
-
     # Prepare the input for the chain
-    sensing_data = json.dumps(state.get("sensing", {}), indent=2)
-    conversation_history = get_buffer_string(state.get("messages", [])[-5:])
-    latest_user_message = state.get("last_user_text", "")
+    turn = get_turn(state)
+    mode_decider_chain = get_mode_decider_chain(complexity(turn.user_text, state.get("sensing")))
+    sensing_data = budget.text("mode_decider", "sensing", turn.sensing_json)
+    conversation_history = turn.history_for("mode_decider")
+    latest_user_message = turn.text_for("mode_decider")
 
     input_data = f"""Sensing Data:
     {sensing_data}
@@ -115,10 +139,22 @@ async def vee_information_guardian(state: VeeState) -> VeeState:
     """Invokes the Vee IR sub-graph to perform focused information retrieval."""
     print("\n--- 6a. VEE INFORMATION GUARDIAN NODE ---")
 
-    # 1. Compile the Vee IR graph
+    # 1. Pick deep or quick IR depending on the time left in the turn
+    left = deadline.remaining(state)
+    if left < settings.IR_QUICK_MIN_REMAINING_S:
+        deadline.record_degradation("fallback")
+        print(f"Only {left:.1f}s left in the turn. Replying with a fallback message.")
+        state["draft"] = deadline.FALLBACK_REPLY
+        return state
+    deep = left >= settings.IR_DEEP_MIN_REMAINING_S
+    if not deep:
+        deadline.record_degradation("quick_ir")
+        print(f"Only {left:.1f}s left in the turn. Using quick IR.")
+
     # Note: Compiling the graph on every invocation might be inefficient.
     # Consider moving this to a higher level if performance becomes an issue.
-    vee_ir_app = build_vee_ir_graph().compile()
+    # The IR state only lives for this turn, so it is never checkpointed.
+    vee_ir_app = (build_vee_ir_graph() if deep else build_quick_ir_graph()).compile(checkpointer=False)
 
     # 2. Extract the latest user query from the state
     query = state.get("last_user_text")
@@ -131,15 +167,35 @@ async def vee_information_guardian(state: VeeState) -> VeeState:
     ir_input_state: VeeIRGraphState = {
         "user_query": query,
         "conversation_history": state.get("messages", [])[-5:],
+        "turn": get_turn(state),
+        "deadline": deadline.get_deadline(state),
     }
     print(f"Invoking IR graph with state: user_query='{ir_input_state['user_query']}'")
 
     # 4. Invoke the sub-graph asynchronously
+    # Deep IR must leave enough time to fall back to quick IR if it stalls
     try:
-        final_ir_state = await vee_ir_app.ainvoke(ir_input_state, {"recursion_limit": 15})
+        with deadline.scope(state):
+            if deep:
+                try:
+                    final_ir_state = await asyncio.wait_for(
+                        vee_ir_app.ainvoke(ir_input_state, {"recursion_limit": 15}),
+                        timeout=deadline.remaining(state) - settings.IR_QUICK_MIN_REMAINING_S,
+                    )
+                except (asyncio.TimeoutError, deadline.DeadlineExceeded):
+                    deadline.record_degradation("quick_ir")
+                    print("Deep IR ran out of time. Retrying with quick IR.")
+                    final_ir_state = await build_quick_ir_graph().compile(checkpointer=False).ainvoke(ir_input_state, {"recursion_limit": 15})
+            else:
+                final_ir_state = await vee_ir_app.ainvoke(ir_input_state, {"recursion_limit": 15})
         # 5. Store the final answer in the main graph's 'draft' state
         state["draft"] = final_ir_state.get("final_answer")
+        state["draft_source"] = final_ir_state.get("draft_source")
         print(f"Vee IR subgraph finished. Final answer: '{state.get('draft', '')[:50]}...'\n")
+    except deadline.DeadlineExceeded:
+        deadline.record_degradation("fallback")
+        print("Quick IR ran out of time. Replying with a fallback message.")
+        state["draft"] = deadline.FALLBACK_REPLY
     except Exception as e:
         print(f"Error invoking Vee IR subgraph: {e}")
         state["draft"] = "I encountered an issue while trying to find that information. Could you try asking in a different way?"
@@ -151,16 +207,41 @@ def bestie_planner_node(state: VeeState) -> VeeState:
     """Generates a dynamic conversational plan for the Bestie persona."""
     print("\n--- 5b. BESTIE PLANNER NODE ---")
     
-    # Delegate planning to the centralized plan_next_move function
-    user_name = "Agent Mo"
-    user_context = "user has been working hard building you the best AI bestie ever vee which is you"
+    state["bestie_variant"] = "two_stage"
+    turn = get_turn(state)
+    left = deadline.remaining(state)
+    if left < settings.PLANNER_MIN_REMAINING_S:
+        deadline.record_degradation("skip_planner")
+        state["bestie_plan"] = plan_from_sensing(state.get("sensing", {}))
+        print(f"Only {left:.1f}s left in the turn. Skipping the planner and drafting from sensing.")
+        return state
 
-    plan = plan_next_move(
-        sensing=state.get("sensing", {}),
-        conversation_history=get_buffer_string(state.get("messages", [])[-5:]),
-        user_name=user_name,
-        user_context=user_context
-    )
+    # Familiar sensing states are planned from what has worked before, without the LLM
+    if settings.STRATEGY_POLICY:
+        plan, reason = get_policy().choose(state.get("sensing"))
+        if plan:
+            state["bestie_plan"] = plan
+            print(f"Planned from the strategy policy. Strategy: {plan['strategy_note']}")
+            return state
+        print(f"Strategy policy deferred to the planner LLM ({reason}).")
+
+    # Delegate planning to the centralized plan_next_move function, bounded by the turn deadline
+    user_name, user_context = user_profile(state, turn.user_text)
+    try:
+        with deadline.scope(state):
+            plan = plan_next_move(
+                sensing=state.get("sensing", {}),
+                sensing_json=turn.sensing_json,
+                conversation_history=turn.history_for("bestie_planner"),
+                user_name=user_name,
+                user_context=user_context,
+                mood_trajectory=compact_json(mood_trajectory(state.get("trackers"))),
+                complexity_score=complexity(turn.user_text, state.get("sensing")),
+            )
+    except deadline.DeadlineExceeded:
+        deadline.record_degradation("skip_planner")
+        plan = plan_from_sensing(state.get("sensing", {}))
+        print("The planner ran out of time. Drafting from sensing.")
     
     state["bestie_plan"] = plan
     print(f"Bestie planning complete. Strategy: {plan.get('strategy_note', 'N/A')}")
@@ -171,40 +252,93 @@ def bestie_drafter_node(state: VeeState) -> VeeState:
     """Generates a response using the bestie persona ('Vee's Voice') based on the dynamic plan."""
     print("\n--- 6b. BESTIE DRAFTER NODE ---")
     
-    llm = get_groq_llm(model_name="moonshotai/kimi-k2-instruct", temperature=0.7)
-    drafter_prompt = load_prompt('bestie/drafter_prompt.md')
-
     # Prepare the input for the drafter
     plan = state.get("bestie_plan", {})
-    plan_str = json.dumps(plan, indent=2)
-    conversation_history = get_buffer_string(state.get("messages", [])[-5:])
-
-    # Get user profile information
-    user_name = "Agent Mo"
-    user_context = "user has been working hard building you the best AI bestie ever vee which is you"
+    plan_str = budget.json("bestie_drafter", "plan", plan)
+    turn = get_turn(state)
+    model = router.llm("bestie_drafter", complexity(turn.user_text, state.get("sensing")), temperature=0.7)
+    llm = HedgedLLM(model)
 
-    # Get current time information
-    now = datetime.now()
-    current_time = now.strftime("%I:%M %p")
-    current_date = now.strftime("%Y-%m-%d")
-    current_day = now.strftime("%A")
+    # Get user profile information from long-term memory
+    user_name, user_context = user_profile(state, turn.user_text)
 
-    prompt = drafter_prompt.format(
+    prompt = registry.render(
+        'bestie/drafter_prompt.md',
         plan=plan_str,
-        conversation_history=conversation_history,
-        current_time=current_time,
-        current_date=current_date,
-        current_day=current_day,
+        conversation_history=turn.history_for("bestie_drafter"),
+        current_time=turn.current_time,
+        current_date=turn.current_date,
+        current_day=turn.current_day,
         user_name=user_name,
         user_context=user_context
     )
 
-    response = llm.invoke(prompt)
+    try:
+        with deadline.scope(state):
+            response = llm.invoke(prompt)
+    except deadline.DeadlineExceeded:
+        deadline.record_degradation("fallback")
+        print("Drafter ran out of time. Replying with a fallback message.")
+        state["draft"] = deadline.FALLBACK_REPLY
+        return state
     state["draft"] = response.content.strip().strip('"').replace("—", "...")
+    state["draft_source"] = draft_source("bestie_drafter", model, 'bestie/drafter_prompt.md')
     print(f"Bestie drafting complete. Draft: '{state.get('draft', '')[:50]}...'")
 
     return state
 
+def bestie_fused_node(state: VeeState) -> VeeState:
+    """Plans and drafts the Bestie reply in a single structured LLM call (BESTIE_PIPELINE "fused")."""
+    print("\n--- 5b/6b. BESTIE FUSED PLAN+DRAFT NODE ---")
+
+    state["bestie_variant"] = "fused"
+    # A learned plan only needs the drafter, which is one call already. The reply then comes from the
+    # two-stage drafter, so it's labelled as such to keep the pipeline comparison fair
+    if settings.STRATEGY_POLICY:
+        plan, reason = get_policy().choose(state.get("sensing"))
+        if plan:
+            state["bestie_variant"] = "two_stage"
+            state["bestie_plan"] = plan
+            print(f"Planned from the strategy policy. Strategy: {plan['strategy_note']}")
+            return bestie_drafter_node(state)
+
+    turn = get_turn(state)
+    user_name, user_context = user_profile(state, turn.user_text)
+    try:
+        with deadline.scope(state):
+            reply = plan_and_draft(
+                sensing_json=turn.sensing_json,
+                conversation_history=turn.history_for("bestie_fused"),
+                user_name=user_name,
+                user_context=user_context,
+                mood_trajectory=compact_json(mood_trajectory(state.get("trackers"))),
+                current_time=turn.current_time,
+                current_date=turn.current_date,
+                current_day=turn.current_day,
+                complexity_score=complexity(turn.user_text, state.get("sensing")),
+            )
+    except deadline.DeadlineExceeded:
+        deadline.record_degradation("fallback")
+        print("Fused bestie call ran out of time. Replying with a fallback message.")
+        state["draft"] = deadline.FALLBACK_REPLY
+        return state
+    except Exception as e:
+        print(f"Error in the fused bestie call: {e}")
+        reply = None
+
+    if reply is None:
+        # Failed call or unusable output: draft from a sensing-based plan with the regular drafter
+        state["bestie_plan"] = plan_from_sensing(state.get("sensing", {}))
+        print("Fused bestie call failed. Drafting from sensing instead.")
+        return bestie_drafter_node(state)
+
+    message = reply.pop("message")
+    state["draft_source"] = reply.pop("source")
+    state["bestie_plan"] = reply
+    state["draft"] = message.strip().strip('"').replace("—", "...")
+    print(f"Bestie fused planning+drafting complete. Strategy: {reply.get('strategy_note', 'N/A')}, draft: '{state['draft'][:50]}...'")
+    return state
+
 # 3. Finalization Nodes (Converged)
 # -------------------------------------------------------------------------
 
@@ -225,4 +359,5 @@ def persist_assistant_node(state: dict) -> dict:
     final_draft = state.get("draft", "")
     print(f"Persisting draft: '{final_draft[:50]}...'\n")
     state["messages"].append(AIMessage(content=final_draft))
+    state["trackers"] = record_reply(state.get("trackers"))
     return state
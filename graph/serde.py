@@ -0,0 +1,88 @@
+"""Compressing checkpoint serializer.
+
+Checkpoints and pending writes are encoded by LangGraph's `JsonPlusSerializer`
+(msgpack, with extension types for messages and pydantic models). Payloads of
+at least `min_bytes` are then compressed with zstd or zlib, and the codec is
+recorded in the type tag (`"msgpack+zstd"`), like LangGraph's encrypted
+serializer does. Untagged blobs are passed through unchanged, so checkpoints
+written before compression was turned on (or with another codec) still load.
+"""
+import logging
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+Codec = Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+
+def _codecs() -> Dict[str, Codec]:
+    codecs: Dict[str, Codec] = {"zlib": (lambda data: zlib.compress(data, 1), zlib.decompress)}
+    if zstandard is not None:
+        codecs["zstd"] = (lambda data: zstandard.compress(data, 3), zstandard.decompress)
+    return codecs
+
+
+CODECS = _codecs()
+# Matches the CHECKPOINT_COMPRESSION default, falling back like `get_serializer` without zstandard
+DEFAULT_CODEC = "zstd" if "zstd" in CODECS else "zlib"
+
+
+class CompressedSerializer(SerializerProtocol):
+    """Wraps a serializer to compress large typed payloads.
+
+    Args:
+        serde: The serializer that encodes objects, JsonPlusSerializer by default.
+        codec: "zstd", "zlib" or "none" (write uncompressed; tagged blobs still load). Defaults
+            to zstd, or zlib if zstandard is not installed.
+        min_bytes: Payloads smaller than this are stored as they are.
+    """
+
+    def __init__(self, serde: Optional[SerializerProtocol] = None, codec: str = DEFAULT_CODEC, min_bytes: int = 1024):
+        if codec != "none" and codec not in CODECS:
+            raise ValueError(f"Unknown checkpoint codec {codec!r}, expected one of {['none', *CODECS]}")
+        self.serde = serde or JsonPlusSerializer()
+        self.codec = codec
+        self.min_bytes = min_bytes
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        if self.codec == "none" or len(data) < self.min_bytes:
+            return type_, data
+        compress, _ = CODECS[self.codec]
+        return f"{type_}+{self.codec}", compress(data)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        base, _, codec = type_.rpartition("+")
+        if base and codec in ("zstd", "zlib"):
+            if codec not in CODECS:
+                raise ValueError("Checkpoint is zstd-compressed but the zstandard package is not installed")
+            _, decompress = CODECS[codec]
+            return self.serde.loads_typed((base, decompress(payload)))
+        return self.serde.loads_typed(data)
+
+
+def get_serializer() -> SerializerProtocol:
+    """The checkpoint serializer configured by CHECKPOINT_COMPRESSION and CHECKPOINT_COMPRESS_MIN_BYTES."""
+    codec = settings.CHECKPOINT_COMPRESSION
+    if codec == "zstd" and zstandard is None:
+        logger.warning("zstandard not available, compressing checkpoints with zlib")
+        codec = "zlib"
+    return CompressedSerializer(codec=codec, min_bytes=settings.CHECKPOINT_COMPRESS_MIN_BYTES)
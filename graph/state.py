@@ -1,6 +1,24 @@
-from typing import Dict, List, Optional, Any, Union
+import copy
+import functools
+import inspect
+from typing import Annotated, Any, Callable, Dict, List, Optional, Union
+from langgraph.channels import UntrackedValue
 from langgraph.graph import MessagesState
 from langchain_core.messages import HumanMessage, AIMessage
+from models.turn import TurnContext
+
+
+class Ephemeral:
+    """Marks a per-turn state channel: `Ephemeral[T]`.
+
+    Ephemeral channels live in memory for the duration of a run and are never
+    written to checkpoints, so every turn starts without them and nodes
+    recompute them from the durable channels.
+    """
+
+    def __class_getitem__(cls, typ):
+        return Annotated[typ, UntrackedValue(typ)]
+
 
 class VeeState(MessagesState):
     """State for Vee's conversation workflow.
@@ -12,8 +30,19 @@ class VeeState(MessagesState):
         planning (Dict): Strategy and content planning
         acting (Dict): Response generation and modulation
         risk_level (str): Safety triage level for latest user input
+        turn (TurnContext): Precomputed, immutable view of the current turn
+        deadline (float): UNIX timestamp by which the turn should reply
+        reflection (Dict): Background reflection results by job, see layers.reflect.pipeline
+        draft_source (Dict): Node, model and prompt version that produced the draft, for shadow reviews
+        bestie_variant (str): Bestie pipeline ("two_stage" or "fused") that served the turn
+        trackers (Dict): Mood and engagement tracker state, updated in O(1) per turn
         next_node (str): Next node to execute
         checkpoint (str): State serialization timestamp
+
+    Only messages, session, user, trackers and reflection are durable, i.e.
+    checkpointed and carried to the next turn. The other channels are
+    `Ephemeral`: rebuilt every turn, so they are never written to the
+    checkpointer. Read them from the run's output, not from `aget_state`.
     """
     
     # Session info
@@ -31,28 +60,85 @@ class VeeState(MessagesState):
     }
     
     # Sensing (emotion/intent detection)
-    sensing: Dict[str,Any] = {}
+    sensing: Ephemeral[Dict[str,Any]] = {}
     
     # Planning (strategy & content)
-    plan: Dict[str,Any] = {}
+    plan: Ephemeral[Dict[str,Any]] = {}
+
+    # Bestie plan produced by bestie_planner (or from sensing when short on time)
+    bestie_plan: Ephemeral[Dict[str,Any]] = {}
+
+    # Bestie pipeline that served the turn ("two_stage" or "fused"), for the A/B metrics
+    bestie_variant: Ephemeral[Optional[str]] = None
     
     # Acting (response generation)
-    draft: str = ""
-    care: Dict[str, float] | Dict[str,Any] = {}
-    buttons: List[List[Dict[str,str]]] = []
+    draft: Ephemeral[str] = ""
+    # What produced the draft (node, model, prompt version), see utils.state_utils.draft_source
+    draft_source: Ephemeral[Optional[Dict[str, str]]] = None
+    care: Ephemeral[Dict[str, float] | Dict[str,Any]] = {}
+    buttons: Ephemeral[List[List[Dict[str,str]]]] = []
 
     # Mode selected by the mode_decider
-    mode: Optional[str] = None
+    mode: Ephemeral[Optional[str]] = None
     
     # Workflow control
-    next_node: Optional[str] = None
-    checkpoint: Optional[str] = None
+    next_node: Ephemeral[Optional[str]] = None
+    checkpoint: Ephemeral[Optional[str]] = None
 
     # Convenience cache of the latest user text extracted by node_ingest
-    last_user_text: Optional[str] = None
+    last_user_text: Ephemeral[Optional[str]] = None
+
+    # Precomputed history/prompt variants for this turn, built by node_ingest
+    turn: Ephemeral[Optional[TurnContext]] = None
+
+    # Reply deadline for this turn (UNIX timestamp), see utils.deadline
+    deadline: Ephemeral[Optional[float]] = None
+
+    # Mood/engagement trackers (layers.perceive), folded forward by ingest and persist
+    trackers: Dict[str, Any] = {}
+
+    # Written back by the post-reply reflection pipeline for later turns
+    reflection: Dict[str, Any] = {}
 
     # Safety triage result for latest input
-    risk_level: Optional[str] = None
+    risk_level: Ephemeral[Optional[str]] = None
 
     # Output from the information guardian sub-graph
-    information_response: Optional[dict] = None
\ No newline at end of file
+    information_response: Ephemeral[Optional[dict]] = None
+
+
+def _changes(before: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    """The channels a node changed, with only the messages it added."""
+    changes = {key: value for key, value in state.items()
+               if key != "messages" and (key not in before or value != before[key])}
+    seen = {id(m) for m in before["messages"]}
+    added = [m for m in state.get("messages", []) if id(m) not in seen]
+    if added:
+        changes["messages"] = added
+    return changes
+
+
+def changes_only(node: Callable) -> Callable:
+    """Wraps a node that mutates and returns the whole state to return only what it changed.
+
+    Every returned channel is a write the checkpointer saves, so returning the
+    whole state would store the full message history once per node.
+    """
+    def snapshot(state: Dict[str, Any]) -> Dict[str, Any]:
+        before = {key: copy.deepcopy(value) if isinstance(value, (dict, list)) and key != "messages" else value
+                  for key, value in state.items()}
+        before["messages"] = list(state.get("messages", []))
+        return before
+
+    if inspect.iscoroutinefunction(node):
+        @functools.wraps(node)
+        async def async_wrapper(state, *args, **kwargs):
+            before = snapshot(state)
+            return _changes(before, await node(state, *args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(node)
+    def wrapper(state, *args, **kwargs):
+        before = snapshot(state)
+        return _changes(before, node(state, *args, **kwargs))
+    return wrapper
@@ -14,17 +14,17 @@ Key Components:
 """
 from __future__ import annotations
 
-import json
+import asyncio
 import re
-from typing import List, Literal, TypedDict, Dict, Any, NotRequired
+from typing import List, Literal, TypedDict, Dict, Any, NotRequired, Optional
 
 from dotenv import load_dotenv
+from langgraph.config import get_stream_writer
 from langgraph.graph import END, START, StateGraph
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages.utils import get_buffer_string
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import Runnable
 from pydantic import BaseModel, Field
 from models.vee_ir import (
     VeeInformationIntent,
@@ -33,7 +33,15 @@ from models.vee_ir import (
     Plan,
     VeeIRState,
 )
-from utils.formatter import format_for_telegram
+from prompts.registry import registry
+from llms.hedging import HedgedLLM
+from llms.router import router, complexity
+from utils.token_budget import budget
+from utils.state_utils import draft_source
+from utils.deadline import DeadlineExceeded
+from utils.json_stream import JSONParseError, parse_model
+from layers.perceive.knowledge_index import retrieve
+from config.settings import settings
 
 # Load environment variables
 load_dotenv()
@@ -41,60 +49,84 @@ load_dotenv()
 # ===============================
 # Prompts
 # ===============================
-
-def load_prompt(file_name: str) -> str:
-    """Loads a prompt from the vee_ir prompts directory."""
-    import os
-    # Assumes vee_ir.py is in ai-bestie/graph, and prompts are in ai-bestie/prompts/vee_ir
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    # This path goes up one level from 'graph' and then into 'prompts/vee_ir'
-    prompt_path = os.path.join(current_dir, '..', 'prompts', file_name)
-    try:
-        with open(prompt_path, 'r') as f:
-            return f.read()
-    except FileNotFoundError:
-        # A fallback or more robust error handling could be implemented here
-        return f"Error: Prompt file '{file_name}' not found."
-
-CLASSIFIER_PROMPT = load_prompt('vee_ir/classifier_prompt.md')
-UNIFIED_GOAL_EXTRACTOR_PROMPT = load_prompt('vee_ir/unified_goal_extractor_prompt.md')
-PLANNER_PROMPT = load_prompt('vee_ir/planner_prompt.md')
-KNOWLEDGE_GENERATOR_PROMPT = load_prompt('vee_ir/knowledge_generator_prompt.md')
+# Templates live in prompts/vee_ir/ and are served by the prompt registry,
+# which renders the static instructions as a cacheable system-message prefix.
+CLASSIFIER_PROMPT = 'vee_ir/classifier_prompt.md'
+UNIFIED_GOAL_EXTRACTOR_PROMPT = 'vee_ir/unified_goal_extractor_prompt.md'
+PLANNER_PROMPT = 'vee_ir/planner_prompt.md'
+KNOWLEDGE_GENERATOR_PROMPT = 'vee_ir/knowledge_generator_prompt.md'
+SECTION_GENERATOR_PROMPT = 'vee_ir/section_generator_prompt.md'
+
+# Intents whose plan tasks are independent sections (Solve steps and Update
+# rewrites read as one piece, so they keep the single generator)
+MAP_REDUCE_INTENTS = {"Learn"}
+
+def _history(state: VeeIRState, node: str) -> str:
+    """Returns the budgeted history, from the main graph's turn context when available."""
+    turn = state.get("turn")
+    if turn is not None:
+        return turn.history_for(node)
+    return budget.history(node, state.get("conversation_history", []))
+
+def _user_query(state: VeeIRState, node: str) -> str:
+    """Returns the user query fitted to the node's budget."""
+    turn = state.get("turn")
+    if turn is not None and turn.user_text == state["user_query"]:
+        return turn.text_for(node)
+    return budget.text(node, "user_text", state["user_query"])
+
+def _documents(state: VeeIRState, node: str) -> str:
+    """Returns the retrieved reference documents as numbered citations, fitted to the node's budget."""
+    documents = state.get("documents") or []
+    if not documents:
+        return "(none)"
+    return budget.text(node, "documents", "\n".join(
+        f"[{i}] {d['title']} ({d['url']}): {d.get('excerpt') or ''}" for i, d in enumerate(documents, 1)
+    ))
 
 # ===============================
 # LLM Client
 # ===============================
-def make_llm(model: str = "gpt-4o", temperature: float = 0.0) -> ChatOpenAI:
-    """Factory for the chat model."""
-    return ChatOpenAI(model=model, temperature=temperature)
+def make_llm(node: str, state: VeeIRState, temperature: float = 0.0) -> Runnable:
+    """Returns the chat model routed for an IR node and the query's complexity."""
+    return router.llm(node, complexity(state["user_query"]), temperature=temperature)
 
 # ===============================
 # Graph Nodes
 # ===============================
+def node_retrieve(state: VeeIRState) -> VeeIRState:
+    """Knowledge Retriever (no LLM call)
+
+    Looks the query up in the local BM25 knowledge index, so the generator
+    can ground its answer in corpus passages without a network search.
+    """
+    print("\n--- Knowledge Retriever Node ---")
+    documents = retrieve(state["user_query"])
+    state["documents"] = [document.model_dump() for document in documents]
+    print(f"State after retrieval: {len(documents)} documents")
+    return state
+
 def node_classify_intent(state: VeeIRState) -> VeeIRState:
     """Classifier (Intent Router)"""
     print("\n--- Classify Intent Node ---")
     print(f"Received state keys: {list(state.keys())}")
     
-    llm = make_llm()
+    llm = make_llm("ir_classifier", state)
     
     # Get the last 5 messages for context
-    recent_messages = state.get("conversation_history", [])[-5:]
-    conversation_history_str = get_buffer_string(recent_messages)
-    
-    prompt_input = f"""Conversation History:
-{conversation_history_str}
-
-Latest user message: {state['user_query']}"""
+    conversation_history_str = _history(state, "ir_classifier")
     
-    prompt = f"{CLASSIFIER_PROMPT}\n\n{prompt_input}"
-    response = llm.invoke([HumanMessage(content=prompt)])
+    prompt = registry.render(
+        CLASSIFIER_PROMPT,
+        conversation_history=conversation_history_str,
+        user_query=_user_query(state, "ir_classifier")
+    )
+    response = llm.invoke(prompt)
     
     # Parse the JSON output from the classifier
     try:
-        intent_data = json.loads(response.content.strip())
-        state["information_intent"] = intent_data
-    except (json.JSONDecodeError, KeyError):
+        state["information_intent"] = parse_model(response.content, VeeInformationIntent, "ir_classifier")
+    except JSONParseError:
         # Handle cases where the output is not valid JSON or is missing keys
         # For now, we'll fall back to a default or handle the error
         print("Error: Could not parse intent from LLM response.")
@@ -109,24 +141,21 @@ def node_unified_goal_extractor(state: VeeIRState) -> VeeIRState:
     print("\n--- Unified Goal Extractor Node ---")
     print(f"Received state keys: {list(state.keys())}")
 
-    llm = make_llm()
+    llm = make_llm("ir_goal_extractor", state)
 
     # Get conversation history
-    recent_messages = state.get("conversation_history", [])[-5:]
-    conversation_history_str = get_buffer_string(recent_messages)
+    conversation_history_str = _history(state, "ir_goal_extractor")
 
-    prompt = UNIFIED_GOAL_EXTRACTOR_PROMPT.format(
+    prompt = registry.render(
+        UNIFIED_GOAL_EXTRACTOR_PROMPT,
         conversation_history=conversation_history_str,
-        user_query=state['user_query'],
+        user_query=_user_query(state, "ir_goal_extractor"),
         user_intent=state['information_intent']['intent']
     )
 
-    parser = PydanticOutputParser(pydantic_object=UnifiedGoal)
-    chain = llm | parser
-
     try:
-        goal_data = chain.invoke(prompt)
-        state["unified_goal"] = goal_data.model_dump()
+        response = llm.invoke(prompt)
+        state["unified_goal"] = parse_model(response.content, UnifiedGoal, "ir_goal_extractor").model_dump()
 
     except Exception as e:
         print(f"Error: Could not parse unified goal from LLM response: {e}")
@@ -145,19 +174,19 @@ def node_plan_response(state: VeeIRState) -> VeeIRState:
     print("\n--- Plan Response Node ---")
     print(f"Received state keys: {list(state.keys())}")
 
-    llm = make_llm()
+    llm = make_llm("ir_planner", state)
     
-    recent_messages = state.get("conversation_history", [])[-5:]
-    conversation_history_str = get_buffer_string(recent_messages)
+    conversation_history_str = _history(state, "ir_planner")
 
     sub_task_list = [f"- {task['text']}" for task in state["unified_goal"].get("sub_tasks", [])]
-    sub_tasks_str = "\n".join(sub_task_list)
+    sub_tasks_str = budget.text("ir_planner", "sub_tasks", "\n".join(sub_task_list))
 
-    user_query = state["user_query"]
+    user_query = _user_query(state, "ir_planner")
     user_intent = state["information_intent"]["intent"]
     goal = state["unified_goal"].get("goal", "")
 
-    prompt = PLANNER_PROMPT.format(
+    prompt = registry.render(
+        PLANNER_PROMPT,
         conversation_history=conversation_history_str,
         user_query=user_query,
         user_intent=user_intent,
@@ -165,12 +194,9 @@ def node_plan_response(state: VeeIRState) -> VeeIRState:
         sub_tasks=sub_tasks_str
     )
 
-    parser = PydanticOutputParser(pydantic_object=Plan)
-    chain = llm | parser
-
     try:
-        plan_data = chain.invoke(prompt)
-        state["plan"] = plan_data.model_dump()
+        response = llm.invoke(prompt)
+        state["plan"] = parse_model(response.content, Plan, "ir_planner").model_dump()
 
     except Exception as e:
         print(f"Error: Could not parse plan from LLM response: {e}")
@@ -189,27 +215,120 @@ def node_knowledge_generator(state: VeeIRState) -> VeeIRState:
     print("\n--- Knowledge Generator Node ---")
     print(f"Received state keys: {list(state.keys())}")
     
-    llm = make_llm(temperature=0.4)
+    model = make_llm("ir_generator", state, temperature=0.4)
+    llm = HedgedLLM(model)
 
-    plan_str = json.dumps(state["plan"], indent=2)
+    plan_str = budget.json("ir_generator", "plan", state["plan"])
 
     # Get conversation history
-    recent_messages = state.get("conversation_history", [])[-5:]
-    conversation_history_str = get_buffer_string(recent_messages)
+    conversation_history_str = _history(state, "ir_generator")
 
-    prompt = KNOWLEDGE_GENERATOR_PROMPT.format(
+    prompt = registry.render(
+        KNOWLEDGE_GENERATOR_PROMPT,
         conversation_history=conversation_history_str,
-        plan=plan_str
+        plan=plan_str,
+        documents=_documents(state, "ir_generator"),
     )
 
     response = llm.invoke(prompt)
 
-    formatted_answer = format_for_telegram(response.content.strip())
-    state["final_answer"] = formatted_answer
+    # Markdown; converted to Telegram HTML (and split to Telegram's limit) when sent
+    state["final_answer"] = response.content.strip()
+    state["draft_source"] = draft_source("ir_generator", model, KNOWLEDGE_GENERATOR_PROMPT)
     
     print(f"State after generation: final_answer='{state.get('final_answer', '')[:50]}...'")
     return state
 
+def map_reduce_edge(state: VeeIRState) -> str:
+    """Routes multi-part Learn plans to parallel section generation ("map"), the rest to the single generator."""
+    plan = state.get("plan") or {}
+    intent = (state.get("information_intent") or {}).get("intent")
+    if plan.get("clarification_needed") or intent not in MAP_REDUCE_INTENTS:
+        return "single"
+    return "map" if len(plan.get("tasks") or []) >= settings.IR_MAP_REDUCE_MIN_TASKS else "single"
+
+async def node_section_generator(state: VeeIRState) -> VeeIRState:
+    """Map step: writes each plan task as its own section, concurrently.
+
+    Finished sections are also emitted in plan order on the graph's custom
+    stream as `{"ir_section": {"index", "count", "text"}}`, so a caller
+    streaming with `stream_mode="custom"` (and `subgraphs=True`) can send the
+    first section while the others are still being written.
+    """
+    print("\n--- Section Generator Node ---")
+    tasks = sorted(state["plan"].get("tasks", []), key=lambda t: t.get("order", 0))
+    outline = budget.text("ir_section", "plan", "\n".join(f"{i}. {t.get('task', '')}" for i, t in enumerate(tasks, 1)))
+    conversation_history_str = _history(state, "ir_section")
+    documents_str = _documents(state, "ir_section")
+    semaphore = asyncio.Semaphore(settings.IR_MAP_REDUCE_CONCURRENCY)
+    writer = get_stream_writer()
+    sections: Dict[int, Optional[str]] = {}
+    emitted = 0
+    models: Dict[int, Runnable] = {}
+
+    async def write(index: int, task: Dict[str, Any]) -> None:
+        nonlocal emitted
+        model = make_llm("ir_section", state, temperature=0.4)
+        models[index] = model
+        prompt = registry.render(
+            SECTION_GENERATOR_PROMPT,
+            conversation_history=conversation_history_str,
+            note=state["plan"].get("note", ""),
+            outline=outline,
+            position=f"section {index + 1} of {len(tasks)}",
+            task=task.get("task", ""),
+            word_budget=task.get("word_budget", 40),
+            documents=documents_str,
+        )
+        try:
+            async with semaphore:
+                response = await HedgedLLM(model).ainvoke(prompt)
+            sections[index] = response.content.strip()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # A missing section beats no answer; the others still go out
+            print(f"Error generating section {index + 1}: {e}")
+            sections[index] = None
+        # Stream sections in order, each once every earlier one is done
+        while emitted in sections:
+            if sections[emitted]:
+                writer({"ir_section": {"index": emitted, "count": len(tasks), "text": sections[emitted]}})
+            emitted += 1
+
+    await asyncio.gather(*(write(i, task) for i, task in enumerate(tasks)))
+    if not any(sections.values()):
+        raise RuntimeError("Every section of the answer failed to generate")
+
+    state["sections"] = [sections[i] for i in range(len(tasks))]
+    # Credited to the model of the first section in plan order that was written, as they're sent
+    first = next(i for i, section in enumerate(state["sections"]) if section)
+    state["draft_source"] = draft_source("ir_section", models[first], SECTION_GENERATOR_PROMPT)
+    print(f"State after section generation: {sum(1 for s in state['sections'] if s)}/{len(tasks)} sections")
+    return state
+
+def node_merge_sections(state: VeeIRState) -> VeeIRState:
+    """Reduce step: joins the sections in plan order into the final answer, without an LLM call."""
+    print("\n--- Merge Sections Node ---")
+    state["final_answer"] = "\n\n".join(section for section in state.get("sections", []) if section)
+    print(f"State after merge: final_answer='{state.get('final_answer', '')[:50]}...'")
+    return state
+
+def node_quick_plan(state: VeeIRState) -> VeeIRState:
+    """Quick Planner (no LLM call)
+
+    Used when the turn deadline leaves no room for the deep pipeline: the
+    generator answers the query directly from a minimal plan.
+    """
+    print("\n--- Quick Plan Node ---")
+    state["plan"] = {
+        "note": "Answer the user's latest question directly and concisely.",
+        "tasks": [{"task": _user_query(state, "ir_planner"), "order": 1, "word_budget": state.get("word_limit", 80)}],
+        "clarification_needed": False,
+        "missing_info": [],
+    }
+    return state
+
 # ===============================
 # Graph Assembly
 # ===============================
@@ -221,10 +340,40 @@ def build_graph() -> StateGraph:
     graph.add_node("planner", node_plan_response)
     graph.add_node("knowledge_generator", node_knowledge_generator)
 
-    graph.add_edge(START, "classifier")
+    if settings.KNOWLEDGE_INDEX:
+        graph.add_node("retriever", node_retrieve)
+        graph.add_edge(START, "retriever")
+        graph.add_edge("retriever", "classifier")
+    else:
+        graph.add_edge(START, "classifier")
     graph.add_edge("classifier", "unified_goal_extractor")
     graph.add_edge("unified_goal_extractor", "planner")
-    graph.add_edge("planner", "knowledge_generator")
+    if settings.IR_MAP_REDUCE:
+        # Multi-part answers: sections written concurrently, then joined in order
+        graph.add_node("section_generator", node_section_generator)
+        graph.add_node("merge_sections", node_merge_sections)
+        graph.add_conditional_edges("planner", map_reduce_edge, {"map": "section_generator", "single": "knowledge_generator"})
+        graph.add_edge("section_generator", "merge_sections")
+        graph.add_edge("merge_sections", END)
+    else:
+        graph.add_edge("planner", "knowledge_generator")
+    graph.add_edge("knowledge_generator", END)
+
+    return graph
+
+def build_quick_graph() -> StateGraph:
+    """Builds the quick IR graph: a fixed plan followed by a single generator call."""
+    graph = StateGraph(VeeIRState)
+    graph.add_node("quick_planner", node_quick_plan)
+    graph.add_node("knowledge_generator", node_knowledge_generator)
+
+    if settings.KNOWLEDGE_INDEX:
+        graph.add_node("retriever", node_retrieve)
+        graph.add_edge(START, "retriever")
+        graph.add_edge("retriever", "quick_planner")
+    else:
+        graph.add_edge(START, "quick_planner")
+    graph.add_edge("quick_planner", "knowledge_generator")
     graph.add_edge("knowledge_generator", END)
 
     return graph
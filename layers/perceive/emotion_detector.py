@@ -0,0 +1,174 @@
+"""Lexicon-based emotion detector that runs locally on the CPU.
+
+Tokens are mapped to rows of a (vocabulary x emotion) weight matrix and summed
+in one vectorized step, with light adjustments for negation, intensifiers,
+emoji, exclamation marks and shouting. A message scores in well under a
+millisecond, so it can run on every turn.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+EMOTION_LABELS: Tuple[str, ...] = (
+    "joy", "excited", "grateful", "love",
+    "sad", "lonely", "tired", "stressed",
+    "anxious", "angry", "frustrated", "confused",
+)
+_EMOTION_INDEX = {label: i for i, label in enumerate(EMOTION_LABELS)}
+
+# word -> {emotion: weight}; weights around 1.0 are a clear signal.
+LEXICON: Dict[str, Dict[str, float]] = {
+    # joy / excitement
+    "happy": {"joy": 1.0}, "glad": {"joy": 0.8}, "great": {"joy": 0.6}, "good": {"joy": 0.4},
+    "awesome": {"joy": 0.8, "excited": 0.4}, "amazing": {"joy": 0.8, "excited": 0.5},
+    "yay": {"joy": 0.9, "excited": 0.6}, "fun": {"joy": 0.6}, "nice": {"joy": 0.4},
+    "proud": {"joy": 0.8}, "relieved": {"joy": 0.6}, "lol": {"joy": 0.4}, "haha": {"joy": 0.5},
+    "excited": {"excited": 1.0}, "hyped": {"excited": 1.0}, "cant wait": {"excited": 0.9},
+    "finally": {"excited": 0.4, "joy": 0.3}, "won": {"joy": 0.7, "excited": 0.7},
+    "promoted": {"joy": 0.8, "excited": 0.7}, "passed": {"joy": 0.6},
+    # gratitude / affection
+    "thanks": {"grateful": 0.9}, "thank": {"grateful": 0.9}, "grateful": {"grateful": 1.0},
+    "appreciate": {"grateful": 0.9}, "love": {"love": 0.9}, "miss": {"love": 0.4, "lonely": 0.5},
+    "adore": {"love": 1.0}, "care": {"love": 0.4},
+    # sadness / loneliness
+    "sad": {"sad": 1.0}, "down": {"sad": 0.5}, "upset": {"sad": 0.7, "angry": 0.3},
+    "cry": {"sad": 0.9}, "crying": {"sad": 1.0}, "cried": {"sad": 0.9}, "hurt": {"sad": 0.8},
+    "depressed": {"sad": 1.0}, "miserable": {"sad": 1.0}, "heartbroken": {"sad": 1.0, "love": 0.2},
+    "lost": {"sad": 0.4, "confused": 0.5}, "blah": {"sad": 0.4, "tired": 0.4}, "meh": {"sad": 0.3},
+    "lonely": {"lonely": 1.0}, "alone": {"lonely": 0.8}, "isolated": {"lonely": 0.9},
+    "nobody": {"lonely": 0.5}, "ignored": {"lonely": 0.7, "sad": 0.3},
+    # fatigue / stress / anxiety
+    "tired": {"tired": 1.0}, "exhausted": {"tired": 1.0, "stressed": 0.3}, "drained": {"tired": 0.9},
+    "sleepy": {"tired": 0.8}, "burnt": {"tired": 0.7, "stressed": 0.5}, "burnout": {"tired": 0.8, "stressed": 0.6},
+    "long day": {"tired": 0.7}, "stressed": {"stressed": 1.0}, "stress": {"stressed": 0.9},
+    "overwhelmed": {"stressed": 1.0, "anxious": 0.4}, "pressure": {"stressed": 0.7},
+    "deadline": {"stressed": 0.6}, "busy": {"stressed": 0.5}, "swamped": {"stressed": 0.8},
+    "anxious": {"anxious": 1.0}, "anxiety": {"anxious": 1.0}, "nervous": {"anxious": 0.9},
+    "worried": {"anxious": 0.9}, "worry": {"anxious": 0.8}, "scared": {"anxious": 1.0},
+    "afraid": {"anxious": 0.9}, "panic": {"anxious": 1.0}, "dread": {"anxious": 0.8},
+    # anger / frustration
+    "angry": {"angry": 1.0}, "mad": {"angry": 0.9}, "furious": {"angry": 1.0}, "hate": {"angry": 0.8},
+    "annoyed": {"frustrated": 0.8, "angry": 0.3}, "annoying": {"frustrated": 0.7},
+    "frustrated": {"frustrated": 1.0}, "frustrating": {"frustrated": 0.9}, "ugh": {"frustrated": 0.6},
+    "stuck": {"frustrated": 0.7, "confused": 0.3}, "fed up": {"frustrated": 0.9, "angry": 0.4},
+    "unfair": {"angry": 0.7, "frustrated": 0.4}, "wtf": {"angry": 0.6, "frustrated": 0.5},
+    # confusion
+    "confused": {"confused": 1.0}, "confusing": {"confused": 0.8}, "idk": {"confused": 0.6},
+    "unsure": {"confused": 0.8}, "weird": {"confused": 0.5}, "odd": {"confused": 0.4},
+    "dont know": {"confused": 0.6}, "not sure": {"confused": 0.8},
+}
+
+EMOJI_LEXICON: Dict[str, Dict[str, float]] = {
+    "😂": {"joy": 0.6}, "🤣": {"joy": 0.6}, "😊": {"joy": 0.6}, "😁": {"joy": 0.7}, "🥳": {"excited": 1.0},
+    "🎉": {"excited": 0.9, "joy": 0.5}, "❤": {"love": 0.8}, "🥰": {"love": 0.9}, "🙏": {"grateful": 0.7},
+    "😭": {"sad": 0.9}, "😢": {"sad": 0.9}, "💔": {"sad": 0.8}, "😩": {"tired": 0.6, "frustrated": 0.4},
+    "😴": {"tired": 0.9}, "😰": {"anxious": 0.9}, "😟": {"anxious": 0.6}, "😡": {"angry": 1.0},
+    "😤": {"frustrated": 0.8}, "🤔": {"confused": 0.5}, "😕": {"confused": 0.6},
+}
+
+NEGATORS = {"not", "no", "never", "dont", "isnt", "wasnt", "aint", "cant", "hardly"}
+INTENSIFIERS = {"so": 1.4, "very": 1.4, "really": 1.3, "super": 1.5, "extremely": 1.7, "too": 1.2, "totally": 1.3, "kinda": 0.7, "bit": 0.7}
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+_SUFFIXES = ("ing", "ed", "ly", "es", "s")
+
+# Vocabulary matrix built once at import: rows are lexicon entries.
+_VOCAB = {term: i for i, term in enumerate(LEXICON)}
+_WEIGHTS = np.zeros((len(LEXICON), len(EMOTION_LABELS)), dtype=np.float32)
+for _term, _weights in LEXICON.items():
+    for _label, _w in _weights.items():
+        _WEIGHTS[_VOCAB[_term], _EMOTION_INDEX[_label]] = _w
+_EMOJI_WEIGHTS = {
+    emoji: np.array([weights.get(label, 0.0) for label in EMOTION_LABELS], dtype=np.float32)
+    for emoji, weights in EMOJI_LEXICON.items()
+}
+
+
+@lru_cache(maxsize=8192)
+def _lookup(token: str) -> int:
+    """Returns the lexicon row for a token, trying a few suffix strips; -1 if unknown."""
+    row = _VOCAB.get(token)
+    if row is not None:
+        return row
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            row = _VOCAB.get(token[: -len(suffix)])
+            if row is not None:
+                return row
+    return -1
+
+
+def emotion_vector(text: str) -> Tuple[np.ndarray, int]:
+    """Scores a message against every emotion.
+
+    Returns:
+        A tuple of (scores in 0..1 aligned with EMOTION_LABELS, number of lexicon hits).
+    """
+    lowered = text.lower()
+    tokens = _TOKEN_RE.findall(lowered.replace("'", "").replace("’", ""))
+
+    rows: List[int] = []
+    scales: List[float] = []
+    scale = 1.0
+    negate_window = 0
+    previous = ""
+    for token in tokens:
+        row = _VOCAB.get(previous + " " + token, -1) if previous else -1
+        if row >= 0:
+            # Phrases like "not sure" already carry their own negation
+            negate_window = 0
+        elif token in NEGATORS:
+            negate_window = 3
+            previous = token
+            continue
+        elif token in INTENSIFIERS:
+            scale *= INTENSIFIERS[token]
+            previous = token
+            continue
+        else:
+            row = _lookup(token)
+        if row >= 0:
+            rows.append(row)
+            # A negated cue still signals the topic, but much more weakly.
+            scales.append(scale * (0.2 if negate_window else 1.0))
+            scale = 1.0
+        negate_window = max(negate_window - 1, 0)
+        previous = token
+
+    raw = np.zeros(len(EMOTION_LABELS), dtype=np.float32)
+    if rows:
+        raw += np.asarray(scales, dtype=np.float32) @ _WEIGHTS[rows]
+    hits = len(rows)
+    for char in lowered:
+        emoji = _EMOJI_WEIGHTS.get(char)
+        if emoji is not None:
+            raw += emoji
+            hits += 1
+
+    if hits:
+        boost = 1.0 + 0.15 * min(text.count("!"), 3)
+        letters = [c for c in text if c.isalpha()]
+        if len(letters) >= 6 and sum(c.isupper() for c in letters) / len(letters) > 0.7:
+            boost += 0.3
+        raw *= boost
+
+    # Saturating squash keeps scores in 0..1 without a hard cap.
+    return 1.0 - np.exp(-raw), hits
+
+
+def top_emotions(scores: np.ndarray, top_k: int = 3, min_score: float = 0.15) -> List[Dict[str, float]]:
+    """Turns an emotion score vector into up to `top_k` `{"label", "score"}` dicts, strongest first."""
+    order = np.argsort(-scores)[:top_k]
+    return [
+        {"label": EMOTION_LABELS[i], "score": round(float(scores[i]), 2)}
+        for i in order
+        if scores[i] >= min_score
+    ]
+
+
+def detect_emotions(text: str, top_k: int = 3, min_score: float = 0.15) -> List[Dict[str, float]]:
+    """Returns up to `top_k` emotions detected in `text`, strongest first."""
+    scores, _ = emotion_vector(text)
+    return top_emotions(scores, top_k, min_score)
@@ -0,0 +1,98 @@
+"""Per-user engagement tracker with constant-time updates.
+
+Keeps exponentially-weighted means and variances of the user's message length
+(in words), how long they take to answer our replies, and the gap between
+their messages. Each message is compared with the user's own running stats,
+so a user who always writes two words is not read as withdrawing. The state is
+one fixed-size array plus two timestamps.
+"""
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+ALPHA = 0.2
+# Rows of the stats array: (mean, variance) per metric
+WORDS, REPLY_LATENCY, GAP = 0, 1, 2
+ENGAGED_ABOVE = 0.75
+WITHDRAWING_BELOW = -0.75
+MIN_TURNS = 3
+MAX_Z = 3.0
+
+
+class EngagementTracker:
+    """Exponentially-weighted message-length and response-time stats for one user."""
+
+    def __init__(self, stats: Optional[List[List[float]]] = None, counts: Optional[List[int]] = None,
+                 last_user_at: Optional[float] = None, last_reply_at: Optional[float] = None, last_z: float = 0.0):
+        self.stats = np.asarray(stats if stats is not None else np.zeros((3, 2)), dtype=np.float64)
+        self.counts = list(counts or [0, 0, 0])
+        self.last_user_at = last_user_at
+        self.last_reply_at = last_reply_at
+        self.last_z = last_z
+
+    @classmethod
+    def from_state(cls, data: Optional[Dict[str, Any]]) -> "EngagementTracker":
+        return cls(**data) if data else cls()
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "stats": [[round(float(x), 4) for x in row] for row in self.stats],
+            "counts": self.counts,
+            "last_user_at": self.last_user_at,
+            "last_reply_at": self.last_reply_at,
+            "last_z": round(float(self.last_z), 3),
+        }
+
+    def _z(self, metric: int, value: float) -> float:
+        mean, var = (float(x) for x in self.stats[metric])
+        if self.counts[metric] < MIN_TURNS:
+            return 0.0
+        return max(-MAX_Z, min(MAX_Z, (value - mean) / math.sqrt(var + 1e-6)))
+
+    def _observe(self, metric: int, value: float) -> None:
+        """Exponentially-weighted mean and variance update (Welford-style, O(1))."""
+        if self.counts[metric] == 0:
+            self.stats[metric] = (value, 0.0)
+        else:
+            mean, var = self.stats[metric]
+            delta = value - mean
+            mean += ALPHA * delta
+            var = (1 - ALPHA) * (var + ALPHA * delta * delta)
+            self.stats[metric] = (mean, var)
+        self.counts[metric] += 1
+
+    def user_message(self, text: str, now: Optional[float] = None) -> "EngagementTracker":
+        """Records a user message and scores it against the user's own history."""
+        now = now or time.time()
+        words = math.log1p(len(text.split()))
+        z = self._z(WORDS, words)
+        self._observe(WORDS, words)
+        if self.last_reply_at and (not self.last_user_at or self.last_reply_at >= self.last_user_at):
+            latency = math.log1p(max(now - self.last_reply_at, 0.0))
+            # Answering faster than usual counts as engagement
+            z -= self._z(REPLY_LATENCY, latency)
+            self._observe(REPLY_LATENCY, latency)
+        if self.last_user_at:
+            self._observe(GAP, math.log1p(max(now - self.last_user_at, 0.0)))
+        self.last_user_at = now
+        self.last_z = z
+        return self
+
+    def assistant_reply(self, now: Optional[float] = None) -> "EngagementTracker":
+        """Records when our reply went out, to time the user's next answer."""
+        self.last_reply_at = now or time.time()
+        return self
+
+    def summary(self) -> Dict[str, Any]:
+        """Engagement level of the latest message, for the planner."""
+        level = "engaged" if self.last_z > ENGAGED_ABOVE else "withdrawing" if self.last_z < WITHDRAWING_BELOW else "steady"
+        return {
+            "level": level,
+            "score": round(self.last_z, 2),
+            "typical_words": round(math.expm1(self.stats[WORDS][0])) if self.counts[WORDS] else None,
+            "typical_reply_s": round(math.expm1(self.stats[REPLY_LATENCY][0]), 1) if self.counts[REPLY_LATENCY] else None,
+            "typical_gap_s": round(math.expm1(self.stats[GAP][0]), 1) if self.counts[GAP] else None,
+        }
+
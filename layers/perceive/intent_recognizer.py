@@ -0,0 +1,100 @@
+"""Rule-based intent recognizer and need inference that run locally on the CPU.
+
+Each intent is scored from a handful of cheap surface features (question
+marks, leading wh-words, request verbs, first-person feeling statements,
+greetings, gratitude). Scores are normalised into a confidence so callers can
+tell clear-cut messages from ambiguous ones.
+"""
+import re
+from typing import Dict, List, Tuple
+
+INTENT_LABELS: Tuple[str, ...] = (
+    "vent", "seek_info", "seek_advice", "request_task",
+    "share_news", "greeting", "gratitude", "small_talk",
+)
+
+_WH_START = re.compile(r"^\s*(what|why|how|when|where|who|which|is|are|can|could|does|do|should|would|will)\b")
+_ADVICE = re.compile(r"\b(should i|what do i do|what should|any advice|advice|help me decide|how do i deal|how can i stop)\b")
+_TASK = re.compile(r"^\s*(please\s+)?(write|explain|summari[sz]e|translate|list|give me|make|create|draft|generate|compare|calculate|fix|help me (write|with|understand))\b")
+_INFO = re.compile(r"\b(what is|what are|who is|how does|how do|how to|difference between|meaning of|define|when did|why does|why do)\b")
+_FEELING = re.compile(r"\b(i feel|i'm feeling|im feeling|i am feeling|i'm so|im so|i am so|i've been|ive been|i just|i hate|i can't|i cant|i don't know|i dont know)\b")
+_NEWS = re.compile(r"\b(guess what|i got|i just got|i finally|i passed|i won|good news|i did it)\b")
+_GREETING = re.compile(r"^\s*(hi|hey|hello|yo|sup|good (morning|evening|night|afternoon)|hiya)\b")
+_GRATITUDE = re.compile(r"\b(thanks|thank you|thx|ty|appreciate it)\b")
+
+# intent -> likely needs, strongest first
+NEEDS_BY_INTENT: Dict[str, List[str]] = {
+    "vent": ["validation", "to be heard"],
+    "seek_info": ["information"],
+    "seek_advice": ["guidance", "reassurance"],
+    "request_task": ["task help"],
+    "share_news": ["celebration", "to be heard"],
+    "greeting": ["connection"],
+    "gratitude": ["acknowledgement"],
+    "small_talk": ["connection"],
+}
+
+# emotion -> likely needs, strongest first
+NEEDS_BY_EMOTION: Dict[str, List[str]] = {
+    "sad": ["comfort", "validation"],
+    "lonely": ["connection", "comfort"],
+    "tired": ["rest", "validation"],
+    "stressed": ["reassurance", "relief"],
+    "anxious": ["reassurance", "comfort"],
+    "angry": ["validation", "to be heard"],
+    "frustrated": ["validation", "encouragement"],
+    "confused": ["clarity", "reassurance"],
+    "joy": ["celebration"],
+    "excited": ["celebration"],
+    "grateful": ["acknowledgement"],
+    "love": ["connection"],
+}
+
+
+def intent_scores(text: str, emotional_weight: float = 0.0) -> Dict[str, float]:
+    """Scores every intent from surface features of the message.
+
+    Args:
+        text: The latest user message.
+        emotional_weight: Strength of the strongest detected emotion (0..1),
+            which nudges ambiguous statements towards venting.
+    """
+    lowered = text.lower().replace("’", "'")
+    is_question = "?" in lowered or bool(_WH_START.match(lowered))
+    words = len(lowered.split())
+
+    scores = {label: 0.0 for label in INTENT_LABELS}
+    scores["seek_info"] += 1.2 * bool(_INFO.search(lowered)) + 0.6 * is_question
+    scores["seek_advice"] += 1.5 * bool(_ADVICE.search(lowered)) + 0.2 * is_question
+    scores["request_task"] += 1.6 * bool(_TASK.match(lowered))
+    scores["vent"] += 1.0 * bool(_FEELING.search(lowered)) + 1.2 * emotional_weight - 0.4 * is_question
+    scores["share_news"] += 1.4 * bool(_NEWS.search(lowered))
+    scores["greeting"] += 1.3 * bool(_GREETING.match(lowered)) * (1.0 if words <= 4 else 0.4)
+    scores["gratitude"] += 1.4 * bool(_GRATITUDE.search(lowered))
+    scores["small_talk"] += 0.3 + 0.3 * (words <= 6 and not is_question)
+    return scores
+
+
+def recognize_intent(text: str, emotional_weight: float = 0.0) -> Dict[str, float]:
+    """Returns the top intent as `{"label", "confidence"}`.
+
+    Confidence is the top score's share of the positive score mass, so a
+    message with two competing readings comes out near 0.5.
+    """
+    scores = intent_scores(text, emotional_weight)
+    positive = {label: max(score, 0.0) for label, score in scores.items()}
+    label = max(positive, key=positive.get)
+    total = sum(positive.values()) or 1.0
+    return {"label": label, "confidence": round(positive[label] / total, 2)}
+
+
+def infer_needs(intent: str, emotions: List[Dict[str, float]], limit: int = 3) -> List[str]:
+    """Combines intent- and emotion-driven needs into a short de-duplicated list."""
+    needs: List[str] = []
+    candidates = [NEEDS_BY_EMOTION.get(e["label"], []) for e in emotions[:2]]
+    candidates.insert(0 if not emotions else 1, NEEDS_BY_INTENT.get(intent, []))
+    for group in candidates:
+        for need in group:
+            if need not in needs:
+                needs.append(need)
+    return needs[:limit]
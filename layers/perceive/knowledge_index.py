@@ -0,0 +1,379 @@
+"""Local BM25 knowledge index for grounding assistant answers.
+
+Documents from a curated corpus are split into passages of about
+`PASSAGE_WORDS` words, and each passage is indexed as its own BM25 document.
+Search results come back as `models.info_seeker.Document`s whose excerpt is
+the matching passage, so the IR pipeline can cite them.
+
+The index is a list of immutable segments, like a small Lucene:
+
+- every `add()` batch is written as a new segment: a sorted term dictionary
+  (term -> offset, document frequency) in JSON and a flat `uint32` postings
+  file of (passage id, term frequency) pairs, memory-mapped for reads;
+- passage metadata and text are appended to `passages.jsonl`, and
+  `manifest.json` (segments, passage count, deleted ids) is rewritten
+  atomically last, so a crash mid-add leaves the previous index intact;
+- re-adding a URL deletes its old passages; once there are more than
+  `MAX_SEGMENTS` segments they are merged into one, dropping deleted postings.
+
+A query reads one postings slice per query term and segment, scores it with
+numpy into a dense score array and takes the top-k with `argpartition`, so
+lookups take about a millisecond on tens of thousands of passages (see `benchmarks/bench_knowledge.py`).
+
+Usage:
+    python -m layers.perceive.knowledge_index add corpus.jsonl notes/*.md
+    python -m layers.perceive.knowledge_index search "how do vaccines work"
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from models.info_seeker import Document
+
+logger = logging.getLogger(__name__)
+
+K1 = 1.2
+B = 0.75
+PASSAGE_WORDS = 150
+MAX_SEGMENTS = 8
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an the and or but of to in on at for with from by as is are was were be been being am it its this that "
+    "these those there their they them he she his her we our you your i my me do does did have has had not no "
+    "so if then than too very can could would should will just about into over also what which who how why when".split()
+)
+
+
+def _stem(word: str) -> str:
+    """Light plural stemming, so "vaccines" matches "vaccine"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, stemmed word tokens without stopwords."""
+    return [_stem(w) for w in _TOKEN_RE.findall(text.lower().replace("'", "")) if w not in STOPWORDS]
+
+
+def split_passages(text: str, words: int = PASSAGE_WORDS) -> List[str]:
+    """Splits text into passages of about `words` words, on paragraph boundaries where possible."""
+    passages: List[str] = []
+    current: List[str] = []
+    for paragraph in (p.strip() for p in re.split(r"\n\s*\n", text)):
+        if not paragraph:
+            continue
+        paragraph_words = paragraph.split()
+        if current and len(current) + len(paragraph_words) > words:
+            passages.append(" ".join(current))
+            current = []
+        # Paragraphs longer than a passage are cut into passage-sized pieces
+        while len(paragraph_words) > words:
+            passages.append(" ".join(paragraph_words[:words]))
+            paragraph_words = paragraph_words[words:]
+        current.extend(paragraph_words)
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def rank_passages(query: str, passages: List[str], k: int) -> List[int]:
+    """Indices of the `k` passages most relevant to `query` by BM25, best first, for small in-memory lists."""
+    tokenized = [Counter(tokenize(p)) for p in passages]
+    if not tokenized:
+        return []
+    n = len(tokenized)
+    avgdl = sum(sum(t.values()) for t in tokenized) / n or 1.0
+    df = Counter(term for t in tokenized for term in t)
+    scores = []
+    for i, tf in enumerate(tokenized):
+        length = sum(tf.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            if tf[term]:
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * tf[term] * (K1 + 1) / (tf[term] + K1 * (1 - B + B * length / avgdl))
+        scores.append((score, i))
+    return [i for score, i in sorted(scores, key=lambda s: -s[0])[:k] if score > 0]
+
+
+class Segment:
+    """One immutable batch of the index: a term dictionary and memory-mapped postings."""
+
+    def __init__(self, directory: str, name: str):
+        self.name = name
+        with open(os.path.join(directory, f"{name}.terms.json"), encoding="utf-8") as f:
+            self.terms: Dict[str, Tuple[int, int]] = {t: tuple(v) for t, v in json.load(f).items()}
+        path = os.path.join(directory, f"{name}.postings.u32")
+        size = os.path.getsize(path) // 8
+        self.postings = np.memmap(path, dtype=np.uint32, mode="r", shape=(size, 2)) if size else np.zeros((0, 2), np.uint32)
+
+    def lookup(self, term: str) -> Optional[np.ndarray]:
+        """(passage id, term frequency) rows for a term, or None."""
+        entry = self.terms.get(term)
+        return self.postings[entry[0]:entry[0] + entry[1]] if entry else None
+
+    @staticmethod
+    def write(directory: str, name: str, postings: Dict[str, Any]) -> None:
+        """Writes a segment from term -> (passage id, term frequency) rows (lists of pairs or arrays)."""
+        terms: Dict[str, Tuple[int, int]] = {}
+        parts: List[np.ndarray] = []
+        offset = 0
+        for term in sorted(postings):
+            rows = np.asarray(postings[term], dtype=np.uint32).reshape(-1, 2)
+            terms[term] = (offset, len(rows))
+            parts.append(rows)
+            offset += len(rows)
+        rows = np.concatenate(parts) if parts else np.zeros((0, 2), np.uint32)
+        rows.tofile(os.path.join(directory, f"{name}.postings.u32"))
+        with open(os.path.join(directory, f"{name}.terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, separators=(",", ":"))
+
+
+class KnowledgeIndex:
+    """Segmented BM25 index over corpus passages.
+
+    Args:
+        directory: Where the manifest, passages and segment files live.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._passages: List[Dict[str, Any]] = []
+        self._lengths = np.zeros(0, dtype=np.float32)
+        self._by_url: Dict[str, List[int]] = defaultdict(list)
+        self._deleted: set = set()
+        self._segments: List[Segment] = []
+        self._df: Counter = Counter()
+        self._next_segment = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._passages) - len(self._deleted)
+
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    @property
+    def _passages_path(self) -> str:
+        return os.path.join(self.directory, "passages.jsonl")
+
+    def _load(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(self._manifest_path):
+            return
+        with open(self._manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        count = manifest["passages"]
+        size = 0
+        with open(self._passages_path, "rb") as f:
+            for line in f:
+                if len(self._passages) == count:
+                    break
+                self._track(json.loads(line))
+                size += len(line)
+        if os.path.getsize(self._passages_path) > size:
+            # Lines past the manifest's count belong to an add that did not finish
+            os.truncate(self._passages_path, size)
+        self._lengths = np.asarray([p["length"] for p in self._passages], dtype=np.float32)
+        self._deleted = set(manifest.get("deleted", []))
+        self._segments = [Segment(self.directory, name) for name in manifest["segments"]]
+        self._next_segment = manifest.get("next_segment", len(self._segments))
+        self._recount_df()
+        logger.info(f"Loaded knowledge index with {len(self)} passages in {len(self._segments)} segments from {self.directory}")
+
+    def _track(self, passage: Dict[str, Any]) -> None:
+        self._passages.append(passage)
+        self._by_url[passage["url"]].append(passage["id"])
+
+    def _recount_df(self) -> None:
+        self._df = Counter()
+        for segment in self._segments:
+            for term, (_, df) in segment.terms.items():
+                self._df[term] += df
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "passages": len(self._passages),
+            "segments": [s.name for s in self._segments],
+            "next_segment": self._next_segment,
+            "deleted": sorted(self._deleted),
+        }
+        tmp = f"{self._manifest_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path)
+
+    def add(self, documents: Iterable[Dict[str, Any]]) -> int:
+        """Indexes documents (dicts with `title`, `url`, `text` and optional `author`, `publisher`, `date`)
+        as one new segment; returns the number of passages added."""
+        with self._lock:
+            postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+            new: List[Dict[str, Any]] = []
+            for document in documents:
+                url = document.get("url") or document.get("title", "")
+                # Re-adding a URL replaces its previous version
+                self._deleted.update(self._by_url.pop(url, []))
+                meta = {k: document.get(k) for k in ("title", "author", "publisher", "date")}
+                for text in split_passages(document.get("text", "")):
+                    tokens = tokenize(f"{meta['title'] or ''} {text}")
+                    passage_id = len(self._passages) + len(new)
+                    for term, tf in Counter(tokens).items():
+                        postings[term].append((passage_id, tf))
+                    new.append({"id": passage_id, "url": url, **meta, "text": text, "length": len(tokens)})
+            if not new:
+                if self._deleted:
+                    self._write_manifest()
+                return 0
+
+            name = f"seg_{self._next_segment:05d}"
+            Segment.write(self.directory, name, postings)
+            with open(self._passages_path, "a", encoding="utf-8") as f:
+                for passage in new:
+                    f.write(json.dumps(passage, ensure_ascii=False, separators=(",", ":")) + "\n")
+            for passage in new:
+                self._track(passage)
+            self._lengths = np.concatenate([self._lengths, np.asarray([p["length"] for p in new], dtype=np.float32)])
+            self._segments = self._segments + [Segment(self.directory, name)]
+            self._next_segment += 1
+            for term, rows in postings.items():
+                self._df[term] += len(rows)
+            if len(self._segments) > MAX_SEGMENTS:
+                self._merge()
+            self._write_manifest()
+            return len(new)
+
+    def _merge(self) -> None:
+        """Merges every segment into one, dropping postings of deleted passages."""
+        deleted = np.asarray(sorted(self._deleted), dtype=np.uint32)
+        merged: Dict[str, np.ndarray] = {}
+        for term in self._df:
+            rows = np.concatenate([r for r in (s.lookup(term) for s in self._segments) if r is not None])
+            if len(deleted):
+                rows = rows[~np.isin(rows[:, 0], deleted)]
+            if len(rows):
+                merged[term] = rows
+        name = f"seg_{self._next_segment:05d}"
+        Segment.write(self.directory, name, merged)
+        old = self._segments
+        self._segments = [Segment(self.directory, name)]
+        self._next_segment += 1
+        self._recount_df()
+        self._write_manifest()
+        for segment in old:
+            for suffix in (".terms.json", ".postings.u32"):
+                os.remove(os.path.join(self.directory, segment.name + suffix))
+        logger.info(f"Merged {len(old)} knowledge index segments into {name}")
+
+    def search(self, query: str, k: int = 5, min_score: float = 0.0) -> List[Tuple[float, Dict[str, Any]]]:
+        """Returns up to `k` (BM25 score, passage) pairs, best first."""
+        segments, lengths, passages = self._segments, self._lengths, self._passages
+        n = len(lengths)
+        if not n:
+            return []
+        avgdl = float(lengths.mean()) or 1.0
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            df = self._df.get(term, 0)
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for segment in segments:
+                rows = segment.lookup(term)
+                if rows is None:
+                    continue
+                ids, tf = rows[:, 0].astype(np.int64), rows[:, 1].astype(np.float32)
+                # Passage ids are unique within one term's postings, so plain fancy-index add is safe
+                scores[ids] += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * lengths[ids] / avgdl))
+        if self._deleted:
+            scores[np.fromiter(self._deleted, dtype=np.int64)] = 0.0
+        if k < n:
+            top = np.argpartition(-scores, k)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)[:k]
+        return [(float(scores[i]), passages[i]) for i in top if scores[i] > min_score]
+
+
+def to_document(passage: Dict[str, Any]) -> Document:
+    return Document(title=passage.get("title") or passage["url"], url=passage["url"], author=passage.get("author"),
+                    publisher=passage.get("publisher"), date=passage.get("date"), excerpt=passage["text"])
+
+
+_index: Optional[KnowledgeIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Returns the process-wide knowledge index under `settings.KNOWLEDGE_DIR`."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = KnowledgeIndex(settings.KNOWLEDGE_DIR)
+    return _index
+
+
+def retrieve(query: str, k: Optional[int] = None) -> List[Document]:
+    """Returns the corpus passages most relevant to `query`, as `Document`s."""
+    if not settings.KNOWLEDGE_INDEX or not query:
+        return []
+    try:
+        hits = get_knowledge_index().search(query, k or settings.KNOWLEDGE_TOP_K, settings.KNOWLEDGE_MIN_SCORE)
+    except Exception as e:
+        logger.error(f"Knowledge retrieval failed: {e}")
+        return []
+    return [to_document(passage) for _, passage in hits]
+
+
+def _read_corpus(paths: List[str]) -> Iterable[Dict[str, Any]]:
+    """Yields documents from JSON-lines files (one document per line) and plain text/markdown files."""
+    for path in paths:
+        if path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            continue
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        heading = re.search(r"^#+\s*(.+)$", text, re.MULTILINE)
+        title = heading.group(1).strip() if heading else os.path.splitext(os.path.basename(path))[0]
+        yield {"title": title, "url": f"file://{os.path.abspath(path)}", "text": text}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=settings.KNOWLEDGE_DIR, help="Index directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add", help="Index documents (.jsonl with title/url/text, or .md/.txt files)")
+    add_parser.add_argument("paths", nargs="+")
+    search_parser = commands.add_parser("search", help="Print the top passages for a query")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--k", type=int, default=settings.KNOWLEDGE_TOP_K)
+    args = parser.parse_args(argv)
+
+    index = KnowledgeIndex(args.dir)
+    if args.command == "add":
+        added = index.add(_read_corpus(args.paths))
+        print(f"Indexed {added} passages; {len(index)} passages in {len(index._segments)} segments")
+    else:
+        for score, passage in index.search(args.query, args.k):
+            print(f"{score:6.2f}  {passage['title']} ({passage['url']})\n        {passage['text'][:160]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Long-term user memory: a memory-mapped embedding index keyed by chat_id.
+
+Memories are short facts about the user (see `layers.reflect.memory_updater`).
+Each one is embedded locally with signed feature hashing of its words and word
+bigrams, so no model or network call is needed, and stored as a row of a
+float32 matrix in a memory-mapped file. Metadata (chat_id, text, timestamps)
+is kept in an append-only JSON-lines log next to it.
+
+Retrieval only scores the rows of one chat (a single matrix-vector product over
+its memories), so top-k stays well under a millisecond however many memories
+other users have. Inserts are appended in place; the vector file grows by
+doubling. Exact repeats and near-duplicates of an existing memory refresh that
+memory instead of adding a row.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an the and or but of to in on at for with is are was were be been am im i my me "
+    "it its this that so just really very do does did have has had".split()
+)
+INITIAL_CAPACITY = 1024
+DEFAULT_USER_NAME = "friend"
+NO_MEMORIES = "Nothing saved about the user yet."
+
+
+@lru_cache(maxsize=4096)
+def embed(text: str, dim: int = 256) -> np.ndarray:
+    """Embeds text as an L2-normalized, signed feature-hashing vector of words and bigrams."""
+    words = [w for w in _TOKEN_RE.findall(text.lower().replace("'", "")) if w not in STOPWORDS]
+    features = [(w, 1.0) for w in words] + [(f"{a} {b}", 0.5) for a, b in zip(words, words[1:])]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in features:
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += weight if h & 0x80000000 else -weight
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    vector.setflags(write=False)
+    return vector
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha1(" ".join(_TOKEN_RE.findall(text.lower())).encode("utf-8")).hexdigest()
+
+
+class MemoryIndex:
+    """Per-user memories in a memory-mapped vector file plus a metadata log.
+
+    Args:
+        directory: Where `vectors.f32` and `memories.jsonl` live.
+        dim: Embedding dimension; fixed for the lifetime of the files.
+    """
+
+    def __init__(self, directory: str, dim: int = 256):
+        self.directory = directory
+        self.dim = dim
+        self._vectors_path = os.path.join(directory, "vectors.f32")
+        self._meta_path = os.path.join(directory, "memories.jsonl")
+        self._lock = threading.Lock()
+        self._meta: List[Dict[str, Any]] = []
+        self._rows: Dict[str, List[int]] = {}
+        self._fingerprints: Dict[Tuple[str, str], int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def _load(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._track(json.loads(line))
+        rows_on_disk = os.path.getsize(self._vectors_path) // (4 * self.dim) if os.path.exists(self._vectors_path) else 0
+        if rows_on_disk < len(self._meta):
+            # The vector file was lost or truncated; embeddings are cheap to rebuild from the log
+            logger.warning(f"Memory index is missing {len(self._meta) - rows_on_disk} vectors, re-embedding them")
+        self._open(max(rows_on_disk, len(self._meta), INITIAL_CAPACITY))
+        for row in range(rows_on_disk, len(self._meta)):
+            self._vectors[row] = embed(self._meta[row]["text"], self.dim)
+        logger.info(f"Loaded {len(self._meta)} memories for {len(self._rows)} users from {self.directory}")
+
+    def _track(self, entry: Dict[str, Any]) -> None:
+        # Refreshed memories are logged again under their row; the last line wins
+        if entry.get("row") is not None and entry["row"] < len(self._meta):
+            self._meta[entry["row"]] = entry
+            return
+        entry["row"] = len(self._meta)
+        self._meta.append(entry)
+        self._rows.setdefault(entry["chat_id"], []).append(entry["row"])
+        self._fingerprints[(entry["chat_id"], entry["fingerprint"])] = entry["row"]
+
+    def _open(self, capacity: int) -> None:
+        """(Re)maps the vector file with room for `capacity` rows."""
+        if self._vectors is not None:
+            self._vectors.flush()
+        size = capacity * self.dim * 4
+        with open(self._vectors_path, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def search(self, chat_id: str, query: str, k: int = 5, min_score: float = 0.0) -> List[Tuple[float, Dict[str, Any]]]:
+        """Returns up to `k` (score, memory) pairs for one user, most relevant first."""
+        rows = self._rows.get(str(chat_id))
+        if not rows:
+            return []
+        rows = rows[:]  # inserts may append concurrently
+        scores = self._vectors[np.asarray(rows, dtype=np.int64)] @ embed(query, self.dim)
+        if len(rows) > k:
+            top = np.argpartition(-scores, k)[:k]
+            top = top[np.argsort(-scores[top])]
+        else:
+            top = np.argsort(-scores)
+        return [(float(scores[i]), self._meta[rows[i]]) for i in top if scores[i] > min_score]
+
+    def add(self, chat_id: str, text: str, dedup_threshold: float = 0.9) -> bool:
+        """Adds a memory for a user; returns False when it refreshed an existing one instead."""
+        chat_id = str(chat_id)
+        text = text.strip()
+        if not text:
+            return False
+        now = time.time()
+        vector = embed(text, self.dim)
+        with self._lock:
+            row = self._fingerprints.get((chat_id, _fingerprint(text)))
+            if row is None and dedup_threshold < 1.0:
+                match = self.search(chat_id, text, k=1, min_score=dedup_threshold)
+                row = match[0][1]["row"] if match else None
+            if row is not None:
+                entry = self._meta[row]
+                entry["seen"] = entry.get("seen", 1) + 1
+                entry["updated_at"] = now
+                self._append_meta(entry)
+                return False
+
+            row = len(self._meta)
+            if row >= self._vectors.shape[0]:
+                self._open(self._vectors.shape[0] * 2)
+            self._vectors[row] = vector
+            entry = {"chat_id": chat_id, "text": text, "fingerprint": _fingerprint(text),
+                     "created_at": now, "updated_at": now, "seen": 1, "row": None}
+            self._track(entry)
+            self._append_meta(entry)
+            return True
+
+    def _append_meta(self, entry: Dict[str, Any]) -> None:
+        with open(self._meta_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def flush(self) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+
+
+_index: Optional[MemoryIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> MemoryIndex:
+    """Returns the process-wide memory index under `settings.MEMORY_DIR`."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MemoryIndex(settings.MEMORY_DIR, settings.MEMORY_EMBEDDING_DIM)
+    return _index
+
+
+def recall(chat_id: Optional[str], query: str, k: Optional[int] = None) -> List[str]:
+    """Returns the texts of the user's memories most relevant to `query`."""
+    if not settings.LONG_TERM_MEMORY or not chat_id:
+        return []
+    try:
+        hits = get_index().search(chat_id, query, k or settings.MEMORY_TOP_K, settings.MEMORY_MIN_SCORE)
+    except Exception as e:
+        logger.error(f"Memory recall failed for chat {chat_id}: {e}")
+        return []
+    return [memory["text"] for _, memory in hits]
+
+
+def user_profile(state: Dict[str, Any], query: str) -> Tuple[str, str]:
+    """Returns (user name, user context) for the bestie prompts from the user's long-term memories."""
+    user = state.get("user") or {}
+    memories = recall(user.get("chat_id"), query)
+    context = "\n".join(f"- {text}" for text in memories) if memories else NO_MEMORIES
+    return user.get("name") or DEFAULT_USER_NAME, context
@@ -0,0 +1,91 @@
+"""Per-user mood tracker with constant-time updates.
+
+Keeps two exponentially-decayed averages of the lexicon emotion scores (see
+`emotion_detector`): a fast one for the current mood and a slow one for the
+user's baseline. Old turns fade both per turn and with wall-clock time, so a
+mood from yesterday weighs less than one from five minutes ago. The state is
+two fixed-size arrays plus two weights, whatever the conversation length, and
+is stored in the thread's state as plain lists.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from layers.perceive.emotion_detector import EMOTION_LABELS, emotion_vector, top_emotions
+
+FAST_ALPHA = 0.5
+SLOW_ALPHA = 0.1
+HALF_LIFE_S = 12 * 3600
+TREND_THRESHOLD = 0.1
+POSITIVE = {"joy", "excited", "grateful", "love"}
+# Per-emotion valence: positive emotions +1, confusion mildly negative, the rest -1
+VALENCE = np.array(
+    [1.0 if label in POSITIVE else -0.5 if label == "confused" else -1.0 for label in EMOTION_LABELS], dtype=np.float32)
+
+
+def valence(scores: np.ndarray) -> float:
+    """Net valence of an emotion score vector, roughly in -1..1."""
+    return float(scores @ VALENCE) / 2
+
+
+class MoodTracker:
+    """Exponentially-decayed emotion averages for one user."""
+
+    def __init__(self, fast: Optional[List[float]] = None, slow: Optional[List[float]] = None,
+                 fast_weight: float = 0.0, slow_weight: float = 0.0, turns: int = 0, updated_at: Optional[float] = None):
+        size = len(EMOTION_LABELS)
+        self.fast = np.asarray(fast if fast is not None else np.zeros(size), dtype=np.float32)
+        self.slow = np.asarray(slow if slow is not None else np.zeros(size), dtype=np.float32)
+        self.fast_weight = fast_weight
+        self.slow_weight = slow_weight
+        self.turns = turns
+        self.updated_at = updated_at
+
+    @classmethod
+    def from_state(cls, data: Optional[Dict[str, Any]]) -> "MoodTracker":
+        return cls(**data) if data else cls()
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "fast": [round(float(x), 4) for x in self.fast],
+            "slow": [round(float(x), 4) for x in self.slow],
+            "fast_weight": round(float(self.fast_weight), 4),
+            "slow_weight": round(float(self.slow_weight), 4),
+            "turns": self.turns,
+            "updated_at": self.updated_at,
+        }
+
+    def update(self, text: str, now: Optional[float] = None) -> "MoodTracker":
+        """Folds one user message into both averages in O(1)."""
+        now = now or time.time()
+        scores, _ = emotion_vector(text)
+        age = 0.5 ** ((now - self.updated_at) / HALF_LIFE_S) if self.updated_at else 1.0
+        # Decayed sums: sum = sum * d + x, weight = weight * d + 1, mean = sum / weight
+        fast_decay, slow_decay = (1 - FAST_ALPHA) * age, (1 - SLOW_ALPHA) * age
+        self.fast = self.fast * fast_decay + scores
+        self.slow = self.slow * slow_decay + scores
+        self.fast_weight = self.fast_weight * fast_decay + 1
+        self.slow_weight = self.slow_weight * slow_decay + 1
+        self.turns += 1
+        self.updated_at = now
+        return self
+
+    def current(self) -> np.ndarray:
+        return self.fast / self.fast_weight if self.fast_weight else self.fast
+
+    def baseline(self) -> np.ndarray:
+        return self.slow / self.slow_weight if self.slow_weight else self.slow
+
+    def trajectory(self) -> Dict[str, Any]:
+        """Current mood against the user's baseline, for the planner."""
+        current, baseline = self.current(), self.baseline()
+        shift = valence(current) - valence(baseline)
+        trend = "improving" if shift > TREND_THRESHOLD else "worsening" if shift < -TREND_THRESHOLD else "steady"
+        return {
+            "turns": self.turns,
+            "current": top_emotions(current, top_k=2, min_score=0.1),
+            "baseline": top_emotions(baseline, top_k=2, min_score=0.1),
+            "valence": round(valence(current), 2),
+            "trend": trend,
+        }
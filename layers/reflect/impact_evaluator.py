@@ -0,0 +1,74 @@
+"""Scores how the previous reply landed, from the user's reaction to it.
+
+Runs in the reflection pipeline after every turn. The user's latest message is
+their reaction to our previous reply, so the reply is scored from the shift
+in emotional valence between the two user messages, how much the user kept
+engaging, and explicit feedback ("thanks, that helps", "you don't get it").
+The plan and sensing behind each reply are saved so the next evaluation can
+attribute its score to them (see `layers.reflect.strategy_adjuster`).
+"""
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import HumanMessage
+
+from layers.perceive.emotion_detector import emotion_vector
+from layers.perceive.mood_tracker import valence as score_valence
+from layers.reflect.pipeline import ReflectionContext, ReflectionResult
+from utils.experiments import experiment_stats
+
+_POSITIVE_FEEDBACK_RE = re.compile(
+    r"\b(thanks|thank you|that helps|helped|makes sense|exactly|so true|you'?re right|good idea|love that)\b", re.IGNORECASE)
+_NEGATIVE_FEEDBACK_RE = re.compile(
+    r"\b(not helpful|you don'?t get it|that'?s not what|whatever|never ?mind|stop|useless|not really)\b", re.IGNORECASE)
+HISTORY_SIZE = 20
+
+
+def valence(text: str) -> float:
+    """Net emotional valence of a message, roughly in -1..1."""
+    return score_valence(emotion_vector(text)[0])
+
+
+def _user_texts(messages: List[Any]) -> List[str]:
+    return [str(m.content) for m in messages if isinstance(m, HumanMessage)]
+
+
+def score_reaction(previous_text: str, reaction: str) -> Dict[str, float]:
+    """Scores a reply in 0..1 from the user's message before it and their reaction after it."""
+    shift = valence(reaction) - valence(previous_text)
+    engagement = math.log1p(len(reaction.split())) - math.log1p(len(previous_text.split()))
+    explicit = (1.0 if _POSITIVE_FEEDBACK_RE.search(reaction) else 0.0) - (1.0 if _NEGATIVE_FEEDBACK_RE.search(reaction) else 0.0)
+    score = 0.5 + 0.25 * math.tanh(shift) + 0.1 * math.tanh(engagement) + 0.25 * explicit
+    return {
+        "score": round(min(max(score, 0.0), 1.0), 3),
+        "valence_shift": round(shift, 3),
+        "engagement": round(engagement, 3),
+        "explicit": explicit,
+    }
+
+
+def evaluate_impact(ctx: ReflectionContext) -> ReflectionResult:
+    """Scores the previous reply and remembers what produced the current one."""
+    state = ctx.state
+    previous: Dict[str, Any] = ctx.reflection.get("impact") or {}
+    texts = _user_texts(state.get("messages") or [])
+
+    evaluated: Optional[Dict[str, Any]] = None
+    if len(texts) >= 2 and previous.get("last_reply"):
+        evaluated = {**previous["last_reply"], **score_reaction(texts[-2], texts[-1])}
+        if evaluated.get("variant"):
+            experiment_stats.record_score("bestie_pipeline", evaluated["variant"], evaluated["score"])
+    history = (previous.get("history") or []) + ([evaluated["score"]] if evaluated else [])
+
+    bestie = state.get("mode") == "bestie"
+    return ReflectionResult({
+        "evaluated": evaluated,
+        "last_reply": {
+            "mode": state.get("mode"),
+            "plan": state.get("bestie_plan") if bestie else None,
+            "sensing": state.get("sensing") if bestie else None,
+            "variant": state.get("bestie_variant") if bestie else None,
+        },
+        "history": history[-HISTORY_SIZE:],
+    })
@@ -0,0 +1,93 @@
+"""Extracts facts about the user from each turn and saves them as long-term memories.
+
+Extraction is rule-based: sentences where the user discloses something about
+themselves ("I work nights", "my sister is visiting") are kept, rewritten in
+the third person, and added to the memory index in
+`layers.perceive.memory_access`, which deduplicates repeats. This runs in the
+reflection pipeline, after the reply has been sent.
+"""
+import logging
+import re
+from typing import List, Optional
+
+from config.settings import settings
+from layers.perceive.memory_access import get_index
+from layers.reflect.pipeline import ReflectionContext, ReflectionResult
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_RE = re.compile(r"[^.!?\n]+[.!?]?")
+_DISCLOSURE_RE = re.compile(
+    r"\b(i am|i'?m|i was|i work|i live|i have|i'?ve|i like|i love|i hate|i prefer|i study|i moved|"
+    r"i started|i quit|i got|i want|my \w+|call me)\b",
+    re.IGNORECASE,
+)
+_NAME_RE = re.compile(r"\bmy name is\s+([a-z]+)\b", re.IGNORECASE)
+# "call me" only introduces a name when a capitalized word follows outside a
+# question, so "can you call me tomorrow?" or "call me later" is not a name
+_CALL_ME_RE = re.compile(r"\b[Cc]all me\s+([A-Z][a-z]+)\b")
+_PRONOUNS = [
+    (r"\bi am\b", "they are"), (r"\bi was\b", "they were"), (r"\bi'?m\b", "they're"),
+    (r"\bi'?ve\b", "they've"), (r"\bi'll\b", "they'll"), (r"\bi'd\b", "they'd"),
+    (r"\bi\b", "they"), (r"\bmy\b", "their"), (r"\bmine\b", "theirs"),
+    (r"\bmyself\b", "themselves"), (r"\bme\b", "them"),
+]
+_FILLER_RE = re.compile(r"^(?:(?:hey|hi|ugh|so|well|lol|omg|honestly|and|but|also|ok|okay)\b[\s,]*)+", re.IGNORECASE)
+MIN_WORDS = 3
+MAX_WORDS = 40
+
+
+def _third_person(sentence: str) -> str:
+    text = _FILLER_RE.sub("", sentence.strip().rstrip(".!"))
+    for pattern, replacement in _PRONOUNS:
+        text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text[:1].upper() + text[1:]
+
+
+def extract_facts(user_text: str) -> List[str]:
+    """Returns the self-disclosures in a user message as third-person facts."""
+    facts = []
+    for match in _SENTENCE_RE.finditer(user_text or ""):
+        sentence = match.group().strip()
+        words = sentence.split()
+        if sentence.endswith("?") or not MIN_WORDS <= len(words) <= MAX_WORDS:
+            continue
+        if _DISCLOSURE_RE.search(sentence):
+            facts.append(_third_person(sentence))
+    return facts
+
+
+def extract_name(user_text: str) -> Optional[str]:
+    """Returns the name the user introduced themselves with, if any."""
+    match = _NAME_RE.search(user_text or "")
+    if match:
+        return match.group(1).capitalize()
+    for sentence in _SENTENCE_RE.finditer(user_text or ""):
+        match = _CALL_ME_RE.search(sentence.group())
+        if match and not sentence.group().strip().endswith("?"):
+            return match.group(1)
+    return None
+
+
+def update_memory(chat_id: Optional[str], user_text: str) -> int:
+    """Saves the facts in a user message to their long-term memory; returns how many were new."""
+    if not settings.LONG_TERM_MEMORY or not chat_id:
+        return 0
+    index = get_index()
+    added = 0
+    for fact in extract_facts(user_text):
+        try:
+            added += index.add(chat_id, fact, settings.MEMORY_DEDUP_THRESHOLD)
+        except Exception as e:
+            logger.error(f"Failed to save memory for chat {chat_id}: {e}")
+    return added
+
+
+def reflect_memory(ctx: ReflectionContext) -> ReflectionResult:
+    """Reflection job: saves the turn's facts and picks up the user's name."""
+    user = ctx.state.get("user") or {}
+    user_text = ctx.state.get("last_user_text") or ""
+    name = extract_name(user_text)
+    saved = update_memory(user.get("chat_id") or ctx.chat_id, user_text)
+    updates = {"user": {**user, "name": name}} if name and name != user.get("name") else {}
+    return ReflectionResult({"saved": saved}, updates)
@@ -0,0 +1,194 @@
+"""Post-reply reflection pipeline.
+
+Once a reply has been persisted and sent, the handler submits the turn here.
+Reflection jobs (impact evaluation, memory updates, strategy adjustment) then
+run in the background with bounded concurrency and per-job retries, so they
+never add user-visible latency. Each job returns a `ReflectionResult`; its
+summary is stored under `reflection[<job name>]` in the thread's state and
+its updates are applied to the state as-is, ready for the next turn.
+
+Writes to a thread are serialized with that thread's turns through
+`thread_lock`, so a reflection never overwrites a turn in flight. Turns of the
+same thread are reflected on one at a time, and each starts from the
+reflection state its predecessor saved, so no update is computed from a stale
+read and lost.
+"""
+import asyncio
+import inspect
+import logging
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Union
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReflectionContext:
+    """What a reflection job sees of the turn it reflects on.
+
+    Attributes:
+        chat_id: Thread the turn belongs to.
+        state: The thread's state right after the turn.
+        results: Summaries of the jobs that already ran for this turn, by job name.
+    """
+    chat_id: str
+    state: Dict[str, Any]
+    results: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def reflection(self) -> Dict[str, Any]:
+        """Reflection state saved by earlier turns."""
+        return self.state.get("reflection") or {}
+
+
+class ReflectionResult(NamedTuple):
+    """Output of a reflection job.
+
+    Attributes:
+        summary: Stored under `reflection[<job name>]` for later turns and jobs.
+        updates: Other top-level state keys to overwrite, e.g. `{"user": {...}}`.
+    """
+    summary: Dict[str, Any]
+    updates: Dict[str, Any] = {}
+
+
+ReflectionJob = Callable[[ReflectionContext], Union[ReflectionResult, Awaitable[ReflectionResult]]]
+
+
+class ReflectionPipeline:
+    """Runs reflection jobs for finished turns off the critical path.
+
+    Args:
+        graph: Compiled graph whose checkpointer holds the threads.
+        jobs: Ordered (name, job) pairs run for every turn; later jobs see earlier results.
+        concurrency: Turns reflected on at the same time.
+        retries: Extra attempts per failing job, with exponential backoff.
+        queue_size: Pending turns kept before new ones are dropped.
+    """
+
+    def __init__(self, graph: Any, jobs: List[tuple], concurrency: int = 2, retries: int = 2, queue_size: int = 1000):
+        self.graph = graph
+        self.jobs = jobs
+        self.concurrency = concurrency
+        self.retries = retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_size = queue_size
+        self._workers: List[asyncio.Task] = []
+        # Only threads that are busy keep their locks
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._reflecting: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self.counts: Dict[str, int] = {"submitted": 0, "completed": 0, "retried": 0, "failed": 0, "dropped": 0}
+        self._lag: List[float] = []
+
+    def thread_lock(self, chat_id: Any) -> asyncio.Lock:
+        """Lock held by a thread's turns and by reflection writes to it."""
+        return self._lock_for(self._locks, str(chat_id))
+
+    @staticmethod
+    def _lock_for(locks: "weakref.WeakValueDictionary[str, asyncio.Lock]", chat_id: str) -> asyncio.Lock:
+        lock = locks.get(chat_id)
+        if lock is None:
+            lock = locks[chat_id] = asyncio.Lock()
+        return lock
+
+    def _start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def submit(self, chat_id: Any, state: Dict[str, Any]) -> bool:
+        """Queues a finished turn for reflection; returns False if the queue is full."""
+        self._start()
+        try:
+            self._queue.put_nowait((str(chat_id), dict(state), time.monotonic()))
+        except asyncio.QueueFull:
+            self.counts["dropped"] += 1
+            logger.warning(f"Reflection queue full, dropping turn for chat {chat_id}")
+            return False
+        self.counts["submitted"] += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id, state, queued_at = await self._queue.get()
+            try:
+                await self._reflect(chat_id, state)
+                self.counts["completed"] += 1
+                self._lag = (self._lag + [time.monotonic() - queued_at])[-500:]
+            except Exception as e:
+                logger.error(f"Reflection for chat {chat_id} failed: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, name: str, job: ReflectionJob, ctx: ReflectionContext) -> Optional[ReflectionResult]:
+        for attempt in range(self.retries + 1):
+            try:
+                if inspect.iscoroutinefunction(job):
+                    return await job(ctx)
+                # Jobs are small but may touch disk; keep them off the event loop
+                return await asyncio.to_thread(job, ctx)
+            except Exception as e:
+                if attempt == self.retries:
+                    self.counts["failed"] += 1
+                    logger.error(f"Reflection job {name} failed for chat {ctx.chat_id}: {e}")
+                    return None
+                self.counts["retried"] += 1
+                await asyncio.sleep(settings.REFLECT_RETRY_BACKOFF_S * 2 ** attempt)
+
+    async def _reflect(self, chat_id: str, state: Dict[str, Any]) -> None:
+        async with self._lock_for(self._reflecting, chat_id):
+            # The snapshot was taken at submit time; an earlier turn's reflection may have saved since
+            current = await self.graph.aget_state({"configurable": {"thread_id": chat_id}})
+            state = {**state, "reflection": (current.values or {}).get("reflection") or state.get("reflection")}
+            results: Dict[str, Dict[str, Any]] = {}
+            updates: Dict[str, Any] = {}
+            for name, job in self.jobs:
+                result = await self._run_job(name, job, ReflectionContext(chat_id, state, results))
+                if result is not None:
+                    results[name] = result.summary
+                    updates.update(result.updates)
+            if results or updates:
+                await self._write_back(chat_id, results, updates)
+
+    async def _write_back(self, chat_id: str, results: Dict[str, Dict[str, Any]], updates: Dict[str, Any]) -> None:
+        config = {"configurable": {"thread_id": chat_id}}
+        async with self.thread_lock(chat_id):
+            current = await self.graph.aget_state(config)
+            reflection = dict((current.values or {}).get("reflection") or {})
+            reflection.update(results)
+            await self.graph.aupdate_state(config, {**updates, "reflection": reflection}, as_node="persist_assistant")
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Waits for queued reflections to finish, then stops the workers."""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Stopping with {self._queue.qsize()} reflections still queued")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def report(self) -> Dict[str, Any]:
+        lag = sorted(self._lag)
+        return {
+            **self.counts,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "lag_s_p50": round(lag[len(lag) // 2], 3) if lag else None,
+            "lag_s_max": round(lag[-1], 3) if lag else None,
+        }
+
+
+def default_jobs() -> List[tuple]:
+    """The reflection jobs run after every turn, in order."""
+    from layers.reflect.impact_evaluator import evaluate_impact
+    from layers.reflect.memory_updater import reflect_memory
+    from layers.reflect.strategy_adjuster import adjust_strategy
+
+    return [("impact", evaluate_impact), ("memory", reflect_memory), ("strategy", adjust_strategy)]
@@ -0,0 +1,181 @@
+"""Sampled, asynchronous quality reviews of sent replies.
+
+A configurable fraction of replies is queued after delivery and reviewed in
+the background by the reviewer prompts in `llms.reviewer` (C.A.R.E. for
+bestie replies; clarity/accuracy/neutrality for assistant replies). Queued
+replies are reviewed in batches of one LLM call per reply kind, so monitoring
+costs a fraction of a call per reviewed reply and never delays a reply.
+
+Scores are keyed by what produced the reply (node, model and prompt version,
+see `utils.state_utils.draft_source`), appended to a JSON-lines log and kept
+as running means for the metrics endpoint, so quality can be compared across
+models and prompt versions while latency changes roll out.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.settings import settings
+from llms.reviewer import review_drafts
+
+logger = logging.getLogger(__name__)
+
+Reviewer = Callable[[str, List[Tuple[str, str]]], List[Dict[str, float]]]
+
+
+class ShadowReviewer:
+    """Samples sent replies and reviews them in background batches.
+
+    Args:
+        rate: Fraction of replies reviewed (0 disables reviews).
+        batch_size: Replies reviewed per batch.
+        max_wait_s: Longest a sampled reply waits for its batch to fill.
+        queue_size: Sampled replies kept before new ones are dropped.
+        path: JSON-lines file the reviews are appended to; None keeps them in memory only.
+        reviewer: Scores a batch of (user message, reply) pairs of one kind.
+    """
+
+    def __init__(self, rate: float, batch_size: int = 8, max_wait_s: float = 30.0, queue_size: int = 200,
+                 path: Optional[str] = None, reviewer: Reviewer = review_drafts):
+        self.rate = rate
+        self.batch_size = batch_size
+        self.max_wait_s = max_wait_s
+        self.path = path
+        self.reviewer = reviewer
+        self._queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+        self.counts: Dict[str, int] = {"sampled": 0, "reviewed": 0, "batches": 0, "failed": 0, "dropped": 0}
+        # (node, model, prompt version) -> {"n": reviews, score key: running mean}
+        self._scores: Dict[Tuple[str, str, str], Dict[str, float]] = defaultdict(lambda: {"n": 0})
+
+    def submit(self, chat_id: Any, state: Dict[str, Any]) -> bool:
+        """Samples a sent reply for review; returns True if it was queued."""
+        source = state.get("draft_source")
+        draft = state.get("draft")
+        if not source or not draft or random.random() >= self.rate:
+            return False
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self._queue_size)
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        item = {
+            "chat_id": str(chat_id),
+            "kind": "bestie" if state.get("mode") == "bestie" else "assistant",
+            "user_text": state.get("last_user_text") or "",
+            "draft": "\n\n".join(draft) if isinstance(draft, list) else str(draft),
+            "source": source,
+        }
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.counts["dropped"] += 1
+            return False
+        self.counts["sampled"] += 1
+        return True
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Waits for one reply, then collects more until the batch is full, `max_wait_s` has passed or we drain."""
+        batch = [await self._queue.get()]
+        until = time.monotonic() + self.max_wait_s
+        while len(batch) < self.batch_size:
+            if self._closing:
+                # Draining: batch up what is already queued without waiting for more
+                if self._queue.empty():
+                    break
+                batch.append(self._queue.get_nowait())
+                continue
+            left = until - time.monotonic()
+            if left <= 0:
+                break
+            try:
+                # Short waits, so a drain does not sit out the whole batch window
+                batch.append(await asyncio.wait_for(self._queue.get(), min(left, 0.5)))
+            except asyncio.TimeoutError:
+                continue
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._review(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _review(self, batch: List[Dict[str, Any]]) -> None:
+        by_kind: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for item in batch:
+            by_kind[item["kind"]].append(item)
+        for kind, items in by_kind.items():
+            try:
+                scores = await asyncio.to_thread(self.reviewer, kind, [(i["user_text"], i["draft"]) for i in items])
+            except Exception as e:
+                self.counts["failed"] += len(items)
+                logger.error(f"Shadow review of {len(items)} {kind} replies failed: {e}")
+                continue
+            self.counts["batches"] += 1
+            records = [self._record(item, item_scores) for item, item_scores in zip(items, scores) if item_scores]
+            self.counts["failed"] += len(items) - len(records)
+            if records and self.path:
+                await asyncio.to_thread(self._append, records)
+
+    def _record(self, item: Dict[str, Any], scores: Dict[str, float]) -> Dict[str, Any]:
+        source = item["source"]
+        overall = sum(scores.values()) / len(scores)
+        stats = self._scores[(source.get("node"), source.get("model"), source.get("prompt_version"))]
+        stats["n"] += 1
+        for key, value in {**scores, "overall": overall}.items():
+            stats[key] = stats.get(key, 0.0) + (value - stats.get(key, 0.0)) / stats["n"]
+        self.counts["reviewed"] += 1
+        return {"reviewed_at": time.time(), "chat_id": item["chat_id"], "kind": item["kind"], **source,
+                "scores": scores, "overall": round(overall, 3)}
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Reviews what is still queued (within `timeout`), then stops the worker."""
+        self._closing = True
+        if self._queue is not None and self._worker is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Stopping with {self._queue.qsize()} shadow reviews still queued")
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    def report(self) -> Dict[str, Any]:
+        """Counters plus mean scores per "node|model|prompt version"."""
+        return {
+            **self.counts,
+            "rate": self.rate,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "scores": {
+                "|".join(str(part) for part in key): {k: (v if k == "n" else round(v, 3)) for k, v in stats.items()}
+                for key, stats in self._scores.items()
+            },
+        }
+
+
+def shadow_reviewer() -> ShadowReviewer:
+    """A shadow reviewer configured from the `SHADOW_REVIEW_*` settings."""
+    return ShadowReviewer(
+        rate=settings.SHADOW_REVIEW_RATE,
+        batch_size=settings.SHADOW_REVIEW_BATCH_SIZE,
+        max_wait_s=settings.SHADOW_REVIEW_MAX_WAIT_S,
+        queue_size=settings.SHADOW_REVIEW_QUEUE_SIZE,
+        path=settings.SHADOW_REVIEW_PATH,
+    )
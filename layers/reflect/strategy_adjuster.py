@@ -0,0 +1,216 @@
+"""Learns which bestie plans land well, per user and per kind of turn.
+
+Runs in the reflection pipeline after `impact_evaluator`, where the score of
+the previous reply is credited two ways:
+
+- to each component type of the plan behind it, as a running mean kept in the
+  thread's reflection state (per user);
+- to the plan's shape (its sequence of component types) under the discretized
+  sensing state it answered (top emotion, intent, uncertainty bucket), in the
+  process-wide `StrategyPolicy` shared by all users.
+
+The policy is a Beta-Bernoulli Thompson-sampling bandit per sensing state.
+Once a state has been seen often enough and its best shape scores well,
+`bestie_planner_node` takes the plan from the policy instead of calling the
+planner LLM; novel, low-confidence and a small fraction of exploratory turns
+still go to the LLM, whose plans become new arms.
+"""
+import json
+import logging
+import os
+import random
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from config.settings import settings
+from layers.reflect.pipeline import ReflectionContext, ReflectionResult
+from models.bestie import BestiePlan
+
+logger = logging.getLogger(__name__)
+
+UNCERTAINTY_BUCKETS = ((0.34, "low"), (0.67, "mid"), (1.01, "high"))
+MAX_ARMS_PER_STATE = 8
+SAVE_EVERY = 20
+# Drafter focus for each component type of a policy plan, filled from the sensing
+FOCUS = {
+    "validate": "back up that feeling {emotion} right now is totally valid",
+    "relate": "a quick 'same, been there' moment about feeling {emotion}",
+    "reflect": "mirror back what they seem to be going through",
+    "share_insight": "one small, casual thought that might help with {need}",
+    "normalize": "remind them feeling {emotion} happens to everyone",
+    "lighten": "a light, playful touch to ease the mood",
+    "cheer": "hype them up and send some encouragement",
+    "ask_open_question": "casually invite them to share more about what's going on",
+    "ask_clarifying_question": "check what they mean, without making it feel like a quiz",
+    "ask_nosy_question": "playfully poke for the juicy details",
+}
+
+
+def state_key(sensing: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Discretizes sensing into "emotion|intent|uncertainty", or None if there is nothing to key on."""
+    sensing = sensing or {}
+    emotions = [e for e in sensing.get("emotions") or [] if isinstance(e, dict)]
+    emotion = max(emotions, key=lambda e: e.get("score", 0) or 0).get("label") if emotions else None
+    intent = (sensing.get("intent") or {}).get("label")
+    if not emotion and not intent:
+        return None
+    uncertainty = float(sensing.get("uncertainty", 0.5) or 0.0)
+    bucket = next(name for upper, name in UNCERTAINTY_BUCKETS if uncertainty < upper)
+    return f"{emotion or 'none'}|{intent or 'none'}|{bucket}"
+
+
+def plan_shape(plan: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The plan's component types joined in order, e.g. "validate+ask_open_question"."""
+    try:
+        return "+".join(c.type for c in BestiePlan(**(plan or {})).response_components)
+    except Exception:
+        return None
+
+
+def plan_for_shape(shape: str, sensing: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Builds a drafter-ready plan for a learned shape, with focuses filled from the sensing."""
+    sensing = sensing or {}
+    emotion, intent, _ = (state_key(sensing) or "none|none|").split("|")
+    emotion = "this way" if emotion == "none" else emotion
+    need = (sensing.get("needs") or ["whatever's on their mind"])[0]
+    types = shape.split("+")
+    return {
+        "strategy_note": f"Keep it casual and real: {', then '.join(t.replace('_', ' ') for t in types)}.",
+        "response_components": [
+            {"type": t, "focus": FOCUS.get(t, "what they just said").format(emotion=emotion, need=need, intent=intent)}
+            for t in types
+        ],
+    }
+
+
+class StrategyPolicy:
+    """Thompson-sampling bandit over plan shapes, per discretized sensing state.
+
+    Args:
+        path: JSON file the table is loaded from and saved to; None keeps it in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        # state -> shape -> {"n": plays, "reward": summed 0..1 scores}
+        self._table: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._counters: Counter = Counter()
+        self._unsaved = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._table = json.load(f).get("states", {})
+            logger.info(f"Loaded strategy policy with {len(self._table)} states from {self.path}")
+        except Exception as e:
+            logger.error(f"Could not load strategy policy from {self.path}, starting empty: {e}")
+
+    def save(self) -> None:
+        """Writes the table atomically (write then rename)."""
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({"states": self._table}, separators=(",", ":"))
+            self._unsaved = 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def update(self, sensing: Optional[Dict[str, Any]], plan: Optional[Dict[str, Any]], score: float) -> bool:
+        """Credits a 0..1 impact score to the plan's shape under the sensing state."""
+        key, shape = state_key(sensing), plan_shape(plan)
+        if key is None or shape is None:
+            return False
+        with self._lock:
+            arms = self._table.setdefault(key, {})
+            if shape not in arms and len(arms) >= MAX_ARMS_PER_STATE:
+                # Make room by dropping the least-played arm
+                del arms[min(arms, key=lambda s: arms[s]["n"])]
+            arm = arms.setdefault(shape, {"n": 0, "reward": 0.0})
+            arm["n"] += 1
+            arm["reward"] = round(arm["reward"] + min(max(score, 0.0), 1.0), 4)
+            self._counters["updates"] += 1
+            self._unsaved += 1
+            due = self._unsaved >= SAVE_EVERY
+        if due:
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"Could not save strategy policy to {self.path}: {e}")
+        return True
+
+    def choose(self, sensing: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Returns (plan, reason); the plan is None when the planner LLM should run instead.
+
+        Reasons: "policy" (plan served), "novel" (state never or rarely seen),
+        "low_confidence" (no arm tried enough or scoring well enough) and
+        "explore" (LLM kept on a confident state to discover new shapes).
+        """
+        key = state_key(sensing)
+        with self._lock:
+            arms = {shape: dict(arm) for shape, arm in self._table.get(key, {}).items()} if key else {}
+        reason, shape = self._decide(arms)
+        self._counters[reason] += 1
+        return (plan_for_shape(shape, sensing) if shape else None), reason
+
+    def _decide(self, arms: Dict[str, Dict[str, float]]) -> Tuple[str, Optional[str]]:
+        if sum(arm["n"] for arm in arms.values()) < settings.POLICY_MIN_VISITS:
+            return "novel", None
+        # Thompson sampling over the arms that have been played enough to trust
+        trusted = {s: a for s, a in arms.items() if a["n"] >= settings.POLICY_MIN_ARM_VISITS}
+        if not trusted or max(a["reward"] / a["n"] for a in trusted.values()) < settings.POLICY_MIN_REWARD:
+            return "low_confidence", None
+        if random.random() < settings.POLICY_EXPLORE_RATE:
+            return "explore", None
+        shape = max(trusted, key=lambda s: random.betavariate(1 + trusted[s]["reward"], 1 + trusted[s]["n"] - trusted[s]["reward"]))
+        return "policy", shape
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "states": len(self._table),
+                "arms": sum(len(arms) for arms in self._table.values()),
+                **dict(self._counters),
+            }
+
+
+_policy: Optional[StrategyPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_policy() -> StrategyPolicy:
+    """Returns the process-wide strategy policy stored at `settings.POLICY_PATH`."""
+    global _policy
+    if _policy is None:
+        with _policy_lock:
+            if _policy is None:
+                _policy = StrategyPolicy(settings.POLICY_PATH)
+    return _policy
+
+
+def adjust_strategy(ctx: ReflectionContext) -> ReflectionResult:
+    """Updates the per-component running mean and the shared policy with the latest impact score."""
+    previous: Dict[str, Any] = ctx.reflection.get("strategy") or {}
+    components: Dict[str, Dict[str, float]] = {k: dict(v) for k, v in (previous.get("components") or {}).items()}
+    evaluated = (ctx.results.get("impact") or {}).get("evaluated")
+    plan = (evaluated or {}).get("plan") or {}
+
+    for component in plan.get("response_components") or []:
+        stats = components.setdefault(component.get("type", "unknown"), {"n": 0, "mean": 0.0})
+        stats["n"] += 1
+        stats["mean"] = round(stats["mean"] + (evaluated["score"] - stats["mean"]) / stats["n"], 4)
+
+    if plan and settings.STRATEGY_POLICY:
+        get_policy().update(evaluated.get("sensing"), plan, evaluated["score"])
+
+    return ReflectionResult({
+        "components": components,
+        "evaluations": previous.get("evaluations", 0) + (1 if plan else 0),
+    })
@@ -0,0 +1,234 @@
+"""Record/replay cassettes for LLM calls.
+
+A cassette is a gzipped JSON-lines file with one entry per (model, params,
+prompt) → response. It plugs into LangChain's global LLM cache, so every chat
+model call that goes through `invoke`/`ainvoke` is covered without touching
+call sites:
+
+- record: every call goes to the provider and is appended to the cassette,
+  together with its observed latency;
+- replay: calls are served from the cassette without network access. With
+  strict matching, the model, its parameters and the prompt must match
+  exactly. With fuzzy matching, the most similar recorded prompt for the same
+  model is used when it clears `LLM_CASSETTE_FUZZY_THRESHOLD` (useful when
+  prompts embed the time or slightly edited instructions).
+
+A replay miss raises `CassetteMiss` rather than falling through to the network,
+and nothing on the way up to the caller of the graph swallows it.
+Streaming calls (`stream`/`astream`) bypass LangChain's cache, so callers that
+stream check `active_cassette()` and make a single `invoke` call instead.
+"""
+import asyncio
+import contextvars
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.load import dumps, loads
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_MODEL_RE = re.compile(r'"model(?:_name)?":\s*"([^"]+)"')
+_WORD_RE = re.compile(r"\w+")
+
+# Key and start time of the call being recorded in this context. LangChain looks
+# up and updates the cache in the same context, and concurrent calls (threads,
+# asyncio tasks) each get their own, so identical prompts don't clash.
+_call_start: contextvars.ContextVar[Optional[Tuple[str, float]]] = contextvars.ContextVar("cassette_call_start", default=None)
+
+
+class CassetteMiss(BaseException):
+    """Raised in replay mode when no recorded response matches a call.
+
+    Derives from BaseException so the `except Exception` fallbacks around LLM
+    calls cannot turn a miss into a silently degraded reply; it reaches the
+    caller of the graph (see `benchmarks.replay`).
+    """
+
+
+def _key(prompt: str, llm_string: str) -> str:
+    return hashlib.sha1(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+
+def _model(llm_string: str) -> str:
+    match = _MODEL_RE.search(llm_string)
+    return match.group(1) if match else "unknown"
+
+
+def _prompt_text(prompt: str) -> str:
+    """Extracts the message contents from LangChain's serialized prompt."""
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        return prompt
+    if not isinstance(messages, list):
+        return prompt
+    return "\n".join(str(m.get("kwargs", {}).get("content", "")) if isinstance(m, dict) else str(m) for m in messages)
+
+
+def _shingles(text: str) -> Set[Tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    return {tuple(words[i:i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+def similarity(a: Set[Tuple[str, ...]], b: Set[Tuple[str, ...]]) -> float:
+    """Jaccard similarity of two shingle sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class Cassette(BaseCache):
+    """LLM cache that records calls to, or replays them from, a cassette file."""
+
+    def __init__(self, path: str, mode: str = "replay", match: str = "strict", fuzzy_threshold: float = 0.8):
+        """
+        Args:
+            path: Cassette file (`.jsonl.gz`).
+            mode: "record" or "replay".
+            match: "strict" or "fuzzy" (replay only).
+            fuzzy_threshold: Minimum prompt similarity (0-1) for a fuzzy match.
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.match = match
+        self.fuzzy_threshold = fuzzy_threshold
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._by_model: Dict[str, List[Tuple[str, Set[Tuple[str, ...]]]]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "fuzzy_hits": 0, "misses": 0, "recorded": 0}
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    self._index(json.loads(line))
+        logger.info(f"Loaded {len(self._entries)} cassette entries from {self.path}")
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        self._entries[entry["key"]] = entry
+        if self.mode == "replay" and self.match == "fuzzy":
+            self._by_model.setdefault(entry["model"], []).append((entry["key"], _shingles(entry["prompt"])))
+
+    def entries(self) -> Sequence[Dict[str, Any]]:
+        """All recorded entries (model, prompt, response, latency)."""
+        return list(self._entries.values())
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = _key(prompt, llm_string)
+        if self.mode == "record":
+            _call_start.set((key, time.monotonic()))
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return loads(entry["response"], allowed_objects="core")
+
+        if self.match == "fuzzy":
+            entry = self._fuzzy(_model(llm_string), _prompt_text(prompt))
+            if entry is not None:
+                self.stats["fuzzy_hits"] += 1
+                return loads(entry["response"], allowed_objects="core")
+
+        self.stats["misses"] += 1
+        raise CassetteMiss(f"No cassette entry for a {_model(llm_string)} call ({self.match} matching)")
+
+    def _fuzzy(self, model: str, text: str) -> Optional[Dict[str, Any]]:
+        target = _shingles(text)
+        best_key, best_score = None, 0.0
+        for key, shingles in self._by_model.get(model, ()):
+            score = similarity(target, shingles)
+            if score > best_score:
+                best_key, best_score = key, score
+        if best_key is None or best_score < self.fuzzy_threshold:
+            return None
+        return self._entries[best_key]
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        # In the caller's context (not an executor's copy) so `aupdate` sees the start time
+        return self.lookup(prompt, llm_string)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.mode != "record":
+            return
+        self._record(prompt, llm_string, return_val, self._started(_key(prompt, llm_string)))
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self.mode != "record":
+            return
+        started = self._started(_key(prompt, llm_string))
+        await asyncio.get_running_loop().run_in_executor(None, self._record, prompt, llm_string, return_val, started)
+
+    @staticmethod
+    def _started(key: str) -> Optional[float]:
+        call = _call_start.get()
+        if call is None or call[0] != key:
+            return None
+        _call_start.set(None)
+        return call[1]
+
+    def _record(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE, started: Optional[float]) -> None:
+        key = _key(prompt, llm_string)
+        with self._lock:
+            entry = {
+                "key": key,
+                "model": _model(llm_string),
+                "llm_string": llm_string,
+                "prompt": _prompt_text(prompt),
+                "response": dumps(return_val),
+                "latency_ms": round((time.monotonic() - started) * 1000, 1) if started else None,
+                "recorded_at": time.time(),
+            }
+            self._entries[key] = entry
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Appending a gzip member per entry keeps the file a valid gzip stream
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.stats["recorded"] += 1
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_model.clear()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+_installed: Optional[Cassette] = None
+
+
+def active_cassette() -> Optional[Cassette]:
+    """Returns the installed cassette, or None when calls go straight to the provider."""
+    return _installed
+
+
+def install_cassette() -> Optional[Cassette]:
+    """Installs the cassette configured by `LLM_CASSETTE_MODE` as LangChain's global LLM cache."""
+    global _installed
+    if settings.LLM_CASSETTE_MODE == "off" or _installed is not None:
+        return _installed
+    _installed = Cassette(
+        settings.LLM_CASSETTE_PATH,
+        mode=settings.LLM_CASSETTE_MODE,
+        match=settings.LLM_CASSETTE_MATCH,
+        fuzzy_threshold=settings.LLM_CASSETTE_FUZZY_THRESHOLD,
+    )
+    set_llm_cache(_installed)
+    logger.info(f"LLM cassette installed: {settings.LLM_CASSETTE_MODE} ({settings.LLM_CASSETTE_MATCH}) at {settings.LLM_CASSETTE_PATH}")
+    return _installed
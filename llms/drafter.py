@@ -1,18 +1,5 @@
 from typing import Dict, Any, List
-from langchain_groq import ChatGroq
-import os
-from .llm_factory import get_groq_llm
-
-gpt5 = ChatGroq(
-        model="moonshotai/kimi-k2-instruct",
-        temperature=0.4,
-        groq_api_key=os.environ["GROQ_API_KEY"]
-    )
-gpt5m = ChatGroq(
-        model="moonshotai/kimi-k2-instruct",
-        temperature=0.4,
-        groq_api_key=os.environ["GROQ_API_KEY"]
-    )
+from .router import router, complexity
 
 SYSTEM = """You are **Vee's Voice**, the heart of the Bestie persona. Your goal is to create short, warm, and authentic messages that feel like they're from a real, caring friend.
 
@@ -56,7 +43,5 @@ def draft(text:str, sensing:Dict[str,Any], content_seed:str, recent:List[Dict[st
     Topic: {content_seed}
     Last turns:\n{ctx}
     Write the reply."""
-    high_emotion = (sensing.get("uncertainty", 0) > 0.45) or \
-                      any(e.get("score", 0) > 0.75 for e in sensing.get("emotions", []))
-    llm = gpt5 if high_emotion else gpt5m
+    llm = router.llm("bestie_drafter", complexity(text, sensing), temperature=0.4)
     return llm.invoke([( "system", SYSTEM), ("user", prompt)]).content
@@ -0,0 +1,46 @@
+from typing import Dict, Any, Callable, Optional
+from langchain_core.runnables import Runnable
+
+from models.perception import FrontEndResult
+from prompts.front_end_prompt import FRONT_END_PROMPT
+from .llm_factory import get_groq_llm
+from .cassette import active_cassette
+from utils.json_stream import parse_stream
+
+def get_front_end_chain() -> Runnable:
+    """Create the fused safety/sensing/mode chain against the fast model (raw output, parsed by the caller)."""
+    llm = get_groq_llm(model_name="llama-3.1-8b-instant", temperature=0, json_mode=True)
+    return FRONT_END_PROMPT | llm
+
+def front_end_triage(text: str, conversation_history: str, on_field: Optional[Callable[[str, Any], None]] = None) -> Optional[Dict[str, Any]]:
+    """Runs safety triage, sensing and mode decision in one structured call.
+
+    The output is parsed while it streams: `on_field(key, value)` is called as
+    each top-level field (`risk_level`, `sensing`, `mode`) completes. With a
+    cassette installed the call is not streamed, so it is recorded or replayed.
+
+    Returns:
+        A dict with `risk_level`, `sensing` (SENSING_SCHEMA shape) and `mode`,
+        or None if the call failed or its output did not validate.
+    """
+    input_data = f"""Conversation History:
+{conversation_history or '(none)'}
+
+Latest User Message:
+{text}"""
+    try:
+        chain = get_front_end_chain()
+        if active_cassette() is not None:
+            chunks = iter([chain.invoke({"input": input_data}).content])
+        else:
+            chunks = (chunk.content for chunk in chain.stream({"input": input_data}))
+        result = parse_stream(chunks, FrontEndResult, "front_end", on_field)
+    except Exception as e:
+        print(f"Error in front_end_triage: {e}")
+        return None
+
+    return {
+        "risk_level": result.risk_level,
+        "sensing": result.sensing.model_dump(exclude_none=True),
+        "mode": result.mode,
+    }
@@ -0,0 +1,271 @@
+"""Hedged LLM requests to cut tail latency.
+
+A hedged call starts the primary request and, if it has not returned by the
+model's observed p90 latency, fires one duplicate request (to the same model
+or an alternate one) and returns whichever finishes first. Hedges are capped
+by a maximum hedge rate and a per-minute token budget so that a slow provider
+cannot double our spend.
+
+Hedging is opt-in via the `LLM_HEDGING` setting; when it is off, `HedgedLLM`
+simply calls the primary model in the caller's thread. Calls are not started
+past the turn deadline (see `utils.deadline`), and hedged and async calls
+also stop waiting and raise `DeadlineExceeded` when it passes.
+
+Requests run on pool threads in a copy of the caller's context, so LangChain
+callbacks, tracing and graph streaming still see them.
+"""
+import asyncio
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages.utils import get_buffer_string
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from config.settings import settings
+from llms.latency import latency_tracker, model_key
+from utils.deadline import DeadlineExceeded, check, remaining
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Window over which the hedge rate and hedge token spend are measured
+RATE_WINDOW_S = 300.0
+TOKEN_WINDOW_S = 60.0
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+def _prompt_tokens(input: Any) -> int:
+    """Estimates the prompt tokens of a chat model input."""
+    if isinstance(input, PromptValue):
+        input = input.to_messages()
+    if isinstance(input, (list, tuple)):
+        try:
+            return count_tokens(get_buffer_string(list(input)))
+        except Exception:
+            return count_tokens(str(input))
+    return count_tokens(str(input))
+
+
+def _response_tokens(response: Any) -> int:
+    """Returns the completion tokens reported by the provider, or an estimate from the content."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("output_tokens"):
+        return usage["output_tokens"]
+    return count_tokens(str(getattr(response, "content", "")))
+
+
+class HedgeBudget:
+    """Caps how often and how expensively requests are hedged, and keeps the hedging metrics."""
+
+    def __init__(self):
+        self._calls: Deque[float] = deque()
+        self._hedges: Deque[float] = deque()
+        self._tokens: Deque[Tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, int] = {
+            "calls": 0,
+            "hedges_fired": 0,
+            "hedge_wins": 0,
+            "suppressed_rate": 0,
+            "suppressed_tokens": 0,
+            "hedge_tokens": 0,
+            "errors": 0,
+        }
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0] > RATE_WINDOW_S:
+            self._calls.popleft()
+        while self._hedges and now - self._hedges[0] > RATE_WINDOW_S:
+            self._hedges.popleft()
+        while self._tokens and now - self._tokens[0][0] > TOKEN_WINDOW_S:
+            self._tokens.popleft()
+
+    def record_call(self) -> None:
+        """Counts a hedgeable call towards the hedge-rate denominator."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._calls.append(now)
+            self._metrics["calls"] += 1
+
+    def try_acquire(self, estimated_tokens: int) -> bool:
+        """Reserves a hedge if both the rate and the token caps allow it."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            if len(self._hedges) + 1 > settings.HEDGE_MAX_RATE * max(len(self._calls), 1):
+                self._metrics["suppressed_rate"] += 1
+                return False
+            spent = sum(tokens for _, tokens in self._tokens)
+            if spent + estimated_tokens > settings.HEDGE_MAX_TOKENS_PER_MINUTE:
+                self._metrics["suppressed_tokens"] += 1
+                return False
+            self._hedges.append(now)
+            self._tokens.append((now, estimated_tokens))
+            self._metrics["hedges_fired"] += 1
+            self._metrics["hedge_tokens"] += estimated_tokens
+            return True
+
+    def add_tokens(self, tokens: int) -> None:
+        """Adds completion tokens spent by a hedge request once they are known."""
+        now = time.monotonic()
+        with self._lock:
+            self._tokens.append((now, tokens))
+            self._metrics["hedge_tokens"] += tokens
+
+    def count(self, metric: str) -> None:
+        with self._lock:
+            self._metrics[metric] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Returns cumulative hedging counters plus the current windowed hedge rate and token spend."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            return {
+                **self._metrics,
+                "hedge_rate": len(self._hedges) / len(self._calls) if self._calls else 0.0,
+                "hedge_tokens_last_minute": sum(tokens for _, tokens in self._tokens),
+            }
+
+
+hedge_budget = HedgeBudget()
+
+
+def hedge_metrics() -> Dict[str, Any]:
+    """Hedging counters and per-model latency quantiles, for the metrics endpoint."""
+    return {"hedging": hedge_budget.metrics(), "latency": latency_tracker.snapshot()}
+
+
+def _wait_timeout() -> Optional[float]:
+    """Seconds until the turn deadline, or None to wait indefinitely."""
+    left = remaining()
+    return None if math.isinf(left) else max(left, 0.0)
+
+
+def _submit(fn: Any, *args: Any, **kwargs: Any) -> Future:
+    """Runs `fn` on the hedge pool in a copy of the current context."""
+    return _executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _account_hedge(future: Future) -> None:
+    """Adds the completion tokens of a finished hedge request to the hedge budget."""
+    if not future.cancelled() and future.exception() is None:
+        hedge_budget.add_tokens(_response_tokens(future.result()))
+
+
+class HedgedLLM(Runnable):
+    """Wraps a chat model so that slow calls are hedged with a duplicate request.
+
+    Example:
+        llm = HedgedLLM(get_groq_llm("moonshotai/kimi-k2-instruct", temperature=0.7))
+        response = llm.invoke(messages)
+    """
+
+    def __init__(self, primary: BaseChatModel, alternate: Optional[BaseChatModel] = None):
+        """
+        Args:
+            primary: The model every call goes to first.
+            alternate: Model used for the hedge request. Defaults to the primary
+                model; pass another provider/model to hedge across providers.
+        """
+        self.primary = primary
+        self.alternate = alternate or primary
+        self.key = model_key(primary)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before hedging: the observed p90, or a default until enough samples exist."""
+        observed = latency_tracker.quantile(self.key, settings.HEDGE_QUANTILE, min_samples=settings.HEDGE_MIN_SAMPLES)
+        delay = observed if observed is not None else settings.HEDGE_DEFAULT_DELAY_S
+        return max(delay, settings.HEDGE_MIN_DELAY_S)
+
+    def _timed(self, llm: BaseChatModel, input: Any, config: Optional[RunnableConfig], **kwargs: Any) -> Any:
+        start = time.monotonic()
+        result = llm.invoke(input, config, **kwargs)
+        latency_tracker.record(model_key(llm), time.monotonic() - start)
+        return result
+
+    async def _atimed(self, llm: BaseChatModel, input: Any, config: Optional[RunnableConfig], **kwargs: Any) -> Any:
+        start = time.monotonic()
+        result = await llm.ainvoke(input, config, **kwargs)
+        latency_tracker.record(model_key(llm), time.monotonic() - start)
+        return result
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        left = check()
+        if not settings.LLM_HEDGING:
+            return self._timed(self.primary, input, config, **kwargs)
+
+        hedge_budget.record_call()
+        primary = _submit(self._timed, self.primary, input, config, **kwargs)
+        pending = {primary}
+        hedge: Optional[Future] = None
+        done, _ = wait(pending, timeout=min(self.hedge_delay(), left))
+        if not done and remaining() > 0 and hedge_budget.try_acquire(_prompt_tokens(input)):
+            logger.info(f"Hedging slow call to {self.key} with {model_key(self.alternate)}")
+            hedge = _submit(self._timed, self.alternate, input, config, **kwargs)
+            # A running thread cannot be interrupted: the losing request finishes in
+            # the background and only its completion tokens are accounted for.
+            hedge.add_done_callback(_account_hedge)
+            pending.add(hedge)
+
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=_wait_timeout(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded(f"Turn deadline passed while waiting for {self.key}")
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        hedge_budget.count("hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+                hedge_budget.count("errors")
+        raise error
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        left = check()
+        if not settings.LLM_HEDGING:
+            try:
+                return await asyncio.wait_for(self._atimed(self.primary, input, config, **kwargs), _wait_timeout())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Turn deadline passed while waiting for {self.key}") from None
+
+        hedge_budget.record_call()
+        pending = {asyncio.create_task(self._atimed(self.primary, input, config, **kwargs))}
+        hedge: Optional[asyncio.Task] = None
+        error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=min(self.hedge_delay(), left))
+            if not done and remaining() > 0 and hedge_budget.try_acquire(_prompt_tokens(input)):
+                logger.info(f"Hedging slow call to {self.key} with {model_key(self.alternate)}")
+                hedge = asyncio.create_task(self._atimed(self.alternate, input, config, **kwargs))
+                pending.add(hedge)
+
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=_wait_timeout(), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceeded(f"Turn deadline passed while waiting for {self.key}")
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            hedge_budget.count("hedge_wins")
+                            hedge_budget.add_tokens(_response_tokens(task.result()))
+                        return task.result()
+                    error = task.exception()
+                    hedge_budget.count("errors")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -1,6 +1,9 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser, JsonOutputParser
-from langchain_core.runnables import Runnable
+from langchain_core.runnables import Runnable, RunnableLambda
 from pydantic import BaseModel, Field
 
 from models.info_seeker import (
@@ -8,11 +11,18 @@ from models.info_seeker import (
     ExplanationResult, ComparisonResult
 )
 from .llm_factory import get_groq_llm
+from config.settings import settings
+from layers.perceive.knowledge_index import rank_passages, split_passages
 from prompts.info_seeker_prompts import (
     NORMALIZER_PROMPT, FACT_CHECKER_PROMPT, SUMMARIZER_PROMPT, 
     EXPLAINER_PROMPT, COMPARER_PROMPT, SUPERVISOR_PROMPT
 )
 
+logger = logging.getLogger(__name__)
+
+# Words per document excerpt considered when pairing excerpts with a claim batch
+EXCERPT_WORDS = 80
+
 def get_web_search_chain() -> Runnable:
     """Returns a chain that invokes the web search tool."""
     llm = get_groq_llm()
@@ -29,8 +39,8 @@ def get_normalizer_chain() -> Runnable:
     )
     return prompt_with_format | llm | parser
 
-def get_fact_checker_chain() -> Runnable:
-    """Creates a chain that checks facts and adds confidence scores."""
+def _get_batch_fact_checker_chain() -> Runnable:
+    """Creates the single-call chain that checks one batch of claims against the given documents."""
     llm = get_groq_llm()
     parser = PydanticOutputParser(pydantic_object=FactCheckResult)
     prompt_with_format = FACT_CHECKER_PROMPT.partial(
@@ -38,6 +48,91 @@ def get_fact_checker_chain() -> Runnable:
     )
     return prompt_with_format | llm | parser
 
+def _claim_list(claims: Union[str, Sequence[str]]) -> List[str]:
+    """Accepts a list of claims or a string with one claim per (optionally bulleted) line."""
+    if isinstance(claims, str):
+        claims = [line.strip().lstrip("-*").strip() for line in claims.splitlines()]
+    return [claim for claim in claims if claim]
+
+def _excerpts(documents: Union[str, Sequence[Union[Document, Dict[str, Any]]]]) -> List[str]:
+    """Splits documents (or already formatted source text) into short, source-tagged excerpts."""
+    if isinstance(documents, str):
+        return split_passages(documents, EXCERPT_WORDS)
+    excerpts = []
+    for document in documents:
+        document = document if isinstance(document, Document) else Document(**document)
+        for passage in split_passages(document.excerpt or "", EXCERPT_WORDS):
+            excerpts.append(f"[{document.url}] {document.title}: {passage}")
+    return excerpts
+
+def _fact_check_batches(claims: Union[str, Sequence[str]], documents: Union[str, Sequence[Union[Document, Dict[str, Any]]]],
+                        batch_size: Optional[int], excerpts: Optional[int]) -> Tuple[List[List[str]], List[Dict[str, str]]]:
+    """Splits claims into batches and pairs each with its most relevant excerpts, as fact-checker inputs."""
+    claims = _claim_list(claims)
+    batch_size = batch_size or settings.FACT_CHECK_BATCH_SIZE
+    excerpts = excerpts or settings.FACT_CHECK_EXCERPTS
+    pool = _excerpts(documents)
+    batches = [claims[i:i + batch_size] for i in range(0, len(claims), batch_size)]
+    inputs = []
+    for batch in batches:
+        relevant = [pool[i] for i in rank_passages(" ".join(batch), pool, excerpts)]
+        inputs.append({
+            "documents": "\n\n".join(relevant) or "(no relevant documents)",
+            "claims": "\n".join(f"- {claim}" for claim in batch),
+        })
+    return batches, inputs
+
+def _merge_fact_checks(results: List[Union[FactCheckResult, Exception]], batches: List[List[str]]) -> FactCheckResult:
+    """Merges per-batch results in claim order; claims of failed batches are unresolved."""
+    facts, unresolved, risk_notes = [], [], []
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            logger.error(f"Fact-check batch failed: {result}")
+            unresolved.extend(batch)
+            risk_notes.append(f"Could not check {len(batch)} claims: {result}")
+            continue
+        facts.extend(result.facts_verified)
+        unresolved.extend(c for c in result.unresolved if c not in unresolved)
+        risk_notes.extend(result.risk_notes or [])
+    return FactCheckResult(facts_verified=facts, unresolved=unresolved, risk_notes=risk_notes or None)
+
+def check_facts(claims: Union[str, Sequence[str]], documents: Union[str, Sequence[Union[Document, Dict[str, Any]]]],
+                batch_size: Optional[int] = None, concurrency: Optional[int] = None,
+                excerpts: Optional[int] = None) -> FactCheckResult:
+    """Fact-checks claims in small concurrent batches, each against only its most relevant excerpts.
+
+    Claims are split into batches of `batch_size`; each batch is paired with
+    the document excerpts ranked highest (BM25) for its claims and checked by
+    the fact-checker prompt, at most `concurrency` batches at a time. Latency
+    therefore stays close to one small call until the batches outnumber the
+    concurrency limit.
+    """
+    batches, inputs = _fact_check_batches(claims, documents, batch_size, excerpts)
+    config = {"max_concurrency": concurrency or settings.FACT_CHECK_CONCURRENCY}
+    results = _get_batch_fact_checker_chain().batch(inputs, config, return_exceptions=True) if inputs else []
+    return _merge_fact_checks(results, batches)
+
+async def acheck_facts(claims: Union[str, Sequence[str]], documents: Union[str, Sequence[Union[Document, Dict[str, Any]]]],
+                       batch_size: Optional[int] = None, concurrency: Optional[int] = None,
+                       excerpts: Optional[int] = None) -> FactCheckResult:
+    """Async version of `check_facts`."""
+    batches, inputs = _fact_check_batches(claims, documents, batch_size, excerpts)
+    config = {"max_concurrency": concurrency or settings.FACT_CHECK_CONCURRENCY}
+    results = await _get_batch_fact_checker_chain().abatch(inputs, config, return_exceptions=True) if inputs else []
+    return _merge_fact_checks(results, batches)
+
+def get_fact_checker_chain() -> Runnable:
+    """Creates a chain that checks facts and adds confidence scores.
+
+    Takes {"claims": ..., "documents": ...}, with claims as a list or one per
+    line and documents as `Document`s or source text, and checks the claims in
+    concurrent batches (see `check_facts`), returning one `FactCheckResult`.
+    """
+    async def acheck(inputs: Dict[str, Any]) -> FactCheckResult:
+        return await acheck_facts(inputs["claims"], inputs["documents"])
+
+    return RunnableLambda(lambda inputs: check_facts(inputs["claims"], inputs["documents"]), afunc=acheck)
+
 def get_summarizer_chain() -> Runnable:
     """Creates a chain that synthesizes verified facts into a summary."""
     llm = get_groq_llm()
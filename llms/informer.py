@@ -1,13 +1,8 @@
 from typing import Dict, Any
-from langchain_groq import ChatGroq
 import json
-import os
+from .llm_factory import get_groq_llm
 
-gpt5_mini = ChatGroq(
-        model="llama-3.3-70b-versatile",
-        temperature=0,
-        groq_api_key=os.environ["GROQ_API_KEY"]
-    )
+gpt5_mini = get_groq_llm(model_name="llama-3.3-70b-versatile", temperature=0)
 
 SYSTEM = """Plan an informational reply that optimizes:
 maximize(clarity + creativity + confidence) / minimize(cognitive_load + decision_fatigue).
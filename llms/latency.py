@@ -0,0 +1,60 @@
+"""Rolling latency statistics for LLM calls, keyed by model."""
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional
+
+
+def model_key(llm: Any) -> str:
+    """Returns a stable key for a chat model, e.g. "ChatGroq:llama-3.1-8b-instant"."""
+    llm = getattr(llm, "bound", llm)  # a model bound to a config, e.g. by the router
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or "unknown"
+    return f"{type(llm).__name__}:{model}"
+
+
+class LatencyTracker:
+    """Keeps the most recent successful call durations per model and reports quantiles."""
+
+    def __init__(self, window: int = 200):
+        """
+        Args:
+            window: Number of recent samples kept per model.
+        """
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        """Records the duration of a successful call."""
+        with self._lock:
+            self._samples[key].append(seconds)
+
+    def count(self, key: str) -> int:
+        """Returns the number of samples currently held for a model."""
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def quantile(self, key: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Returns the q-quantile of recent durations, or None with fewer than `min_samples` samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        index = min(int(q * len(samples)), len(samples) - 1)
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Returns sample count and p50/p90/p99 (seconds) for every tracked model."""
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            key: {
+                "count": self.count(key),
+                "p50": self.quantile(key, 0.5),
+                "p90": self.quantile(key, 0.9),
+                "p99": self.quantile(key, 0.99),
+            }
+            for key in keys
+        }
+
+
+latency_tracker = LatencyTracker()
@@ -1,10 +1,17 @@
 import os
 from langchain_groq import ChatGroq
+from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 
+from config.settings import settings
+from llms.cassette import install_cassette
+
 # Load environment variables
 load_dotenv()
 
+# Record or replay every LLM call when LLM_CASSETTE_MODE is set
+install_cassette()
+
 def get_groq_llm(model_name: str = "llama-3.3-70b-versatile", temperature: float = 0.0, json_mode: bool = False) -> ChatGroq:
     """Factory function to get a configured Groq LLM instance."""
     model_kwargs = {}
@@ -15,5 +22,19 @@ def get_groq_llm(model_name: str = "llama-3.3-70b-versatile", temperature: float
         model=model_name,
         temperature=temperature,
         groq_api_key=os.environ["GROQ_API_KEY"],
+        base_url=settings.GROQ_BASE_URL,
+        model_kwargs=model_kwargs
+    )
+
+def get_openai_llm(model_name: str = "gpt-4o", temperature: float = 0.0, json_mode: bool = False) -> ChatOpenAI:
+    """Factory function to get a configured OpenAI LLM instance."""
+    model_kwargs = {}
+    if json_mode:
+        model_kwargs["response_format"] = {"type": "json_object"}
+
+    return ChatOpenAI(
+        model=model_name,
+        temperature=temperature,
+        base_url=settings.OPENAI_BASE_URL,
         model_kwargs=model_kwargs
     )
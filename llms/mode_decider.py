@@ -2,9 +2,9 @@ from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import Runnable
 
 from prompts.mode_decider_prompt import MODE_DECIDER_PROMPT
-from .llm_factory import get_groq_llm
+from .router import router
 
-def get_mode_decider_chain() -> Runnable:
-    """Create the chain for the mode decider."""
-    llm = get_groq_llm(temperature=0)
+def get_mode_decider_chain(complexity_score: float = 0.0) -> Runnable:
+    """Create the chain for the mode decider, on the model routed for the turn's complexity."""
+    llm = router.llm("mode_decider", complexity_score, temperature=0)
     return MODE_DECIDER_PROMPT | llm | StrOutputParser()
@@ -1,43 +1,60 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import json
 from dotenv import load_dotenv
-from langchain.output_parsers import PydanticOutputParser
-from .llm_factory import get_groq_llm
+from .router import router
 
 # Load environment variables
 load_dotenv()
 
 # Import the correct, mode-specific prompts
-from graph.vee_ir import load_prompt
-from langchain_core.prompts import ChatPromptTemplate
-from models.planning import ConversationStrategy
-
-def get_planning_chain():
-    """Creates the planning chain for the Bestie persona."""
-    prompt_template = load_prompt('bestie/planner_prompt.md')
-    prompt = ChatPromptTemplate.from_template(prompt_template)
+from prompts.registry import registry
+from utils.token_budget import budget
+from models.bestie import BestiePlan, BestieReply
+from llms.hedging import HedgedLLM
+from utils.state_utils import draft_source
+from utils.deadline import DeadlineExceeded
+from utils.json_stream import parse_model
+
+PLANNER_PROMPT = 'bestie/planner_prompt.md'
+FUSED_PROMPT = 'bestie/fused_prompt.md'
+
+def get_planning_chain(complexity_score: float = 0.0):
+    """Creates the planning chain for the Bestie persona.
+
+    The chain takes the messages rendered from `prompts/bestie/planner_prompt.md`
+    by the prompt registry and returns a validated `BestiePlan`.
+    """
     print("---USING BESTIE PLANNER (prompts/bestie/planner_prompt.md)---")
 
-    model = get_groq_llm(model_name="moonshotai/kimi-k2-instruct")
-    parser = PydanticOutputParser(pydantic_object=ConversationStrategy)
+    model = router.llm("bestie_planner", complexity_score)
+
+    return HedgedLLM(model) | (lambda response: parse_model(response.content, BestiePlan, "bestie_planner"))
 
-    return prompt | model | parser
+def plan_next_move(sensing: Dict[str, Any], conversation_history: str, user_name: str, user_context: str, sensing_json: Optional[str] = None, complexity_score: float = 0.0, mood_trajectory: Optional[str] = None) -> Dict[str, Any]:
+    """Plans the next conversational move for the Bestie persona.
 
-def plan_next_move(sensing: Dict[str, Any], conversation_history: str, user_name: str, user_context: str) -> Dict[str, Any]:
-    """Plans the next conversational move for the Bestie persona."""
-    planning_chain = get_planning_chain()
+    `sensing_json` may carry the already-serialized sensing from the turn context;
+    `complexity_score` (see `llms.router.complexity`) guides model routing;
+    `mood_trajectory` is the JSON from the mood/engagement trackers.
+    `DeadlineExceeded` propagates so the caller can fall back.
+    """
+    planning_chain = get_planning_chain(complexity_score)
     
-    input_data = {
-        "sensing_data": json.dumps(sensing, indent=2),
-        "conversation_history": conversation_history or "(none)",
-        "user_name": user_name,
-        "user_context": user_context
-    }
+    prompt = registry.render(
+        PLANNER_PROMPT,
+        sensing_data=budget.text("bestie_planner", "sensing", sensing_json) if sensing_json else budget.json("bestie_planner", "sensing", sensing),
+        conversation_history=conversation_history or "(none)",
+        user_name=user_name,
+        user_context=user_context,
+        mood_trajectory=mood_trajectory or "{}",
+    )
 
     try:
-        result = planning_chain.invoke(input_data)
+        result = planning_chain.invoke(prompt)
         return result.model_dump()
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"Error in plan_next_move: {e}")
         # Fallback response
@@ -48,3 +65,54 @@ def plan_next_move(sensing: Dict[str, Any], conversation_history: str, user_name
                 {"type": "ask_open_question", "focus": "how they are doing"}
             ]
         }
+
+def plan_and_draft(sensing_json: str, conversation_history: str, user_name: str, user_context: str, mood_trajectory: str, current_time: str, current_date: str, current_day: str, complexity_score: float = 0.0) -> Optional[Dict[str, Any]]:
+    """Plans and writes the Bestie reply in one structured call (`prompts/bestie/fused_prompt.md`).
+
+    Returns:
+        A dict with the plan (`strategy_note`, `response_components`), the
+        `message` and its `source` (see `utils.state_utils.draft_source`), or None if the output did not validate. `DeadlineExceeded`
+        propagates so the caller can fall back.
+    """
+    print("---USING FUSED BESTIE PLANNER+DRAFTER (prompts/bestie/fused_prompt.md)---")
+    model = router.llm("bestie_fused", complexity_score, temperature=0.7, json_mode=True)
+    llm = HedgedLLM(model)
+
+    prompt = registry.render(
+        FUSED_PROMPT,
+        sensing_data=budget.text("bestie_fused", "sensing", sensing_json),
+        conversation_history=conversation_history or "(none)",
+        user_name=user_name,
+        user_context=user_context,
+        mood_trajectory=mood_trajectory or "{}",
+        current_time=current_time,
+        current_date=current_date,
+        current_day=current_day,
+    )
+
+    response = llm.invoke(prompt)
+    try:
+        return {**parse_model(response.content, BestieReply, "bestie_fused").model_dump(), "source": draft_source("bestie_fused", model, FUSED_PROMPT)}
+    except Exception as e:
+        print(f"Error in plan_and_draft: {e}")
+        return None
+
+def plan_from_sensing(sensing: Dict[str, Any]) -> Dict[str, Any]:
+    """Builds a plan without an LLM call, for turns that are short on time.
+
+    Validates the strongest sensed emotion (if any) and follows up on the
+    sensed intent or needs.
+    """
+    emotions = sensing.get("emotions") or []
+    emotion = emotions[0].get("label") if emotions and isinstance(emotions[0], dict) else None
+    intent = (sensing.get("intent") or {}).get("label")
+    needs = sensing.get("needs") or []
+
+    components = [{"type": "validate", "focus": f"the user feeling {emotion}" if emotion else "the user's feelings"}]
+    if needs:
+        components.append({"type": "reflect", "focus": f"what they need right now ({needs[0]})"})
+    components.append({"type": "ask_open_question", "focus": f"what they want from this chat ({intent})" if intent else "how they are doing"})
+    return {
+        "strategy_note": "Short on time: respond directly to what was sensed, keep it brief and warm.",
+        "response_components": components,
+    }
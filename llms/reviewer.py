@@ -1,5 +1,10 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from .llm_factory import get_groq_llm
+from .router import router
 
 BESTIE_REVIEWER_SYSTEM_PROMPT = """You are a compassionate reviewer ensuring a message written by an AI best friend is perfect. Your goal is to check the draft against the C.A.R.E. principles: Clarity, Accuracy, Relevance, and Empathy. Respond with a JSON object containing:
 - 'C': A score from 0.0 to 1.0 for Clarity.
@@ -16,6 +21,14 @@ ASSISTANT_REVIEWER_SYSTEM_PROMPT = """You are a meticulous editor reviewing a dr
 - 'suggestion': If any score is below 0.8, provide a revised, improved version of the draft. Otherwise, return null.
 """
 
+BATCH_INSTRUCTIONS = """
+You will review several drafts at once. Each one is numbered and shown with the user message it replies to. Respond with a JSON object {{"reviews": [...]}} holding one review object per draft, in the same order, each with an 'id' (the draft's number) and the scores above. Leave out 'suggestion'.
+"""
+
+# Score keys per review kind, as returned by the reviewer prompts
+REVIEW_SCORES = {"bestie": ("C", "A", "R", "E"), "assistant": ("clarity", "accuracy", "neutrality")}
+_SYSTEM_PROMPTS = {"bestie": BESTIE_REVIEWER_SYSTEM_PROMPT, "assistant": ASSISTANT_REVIEWER_SYSTEM_PROMPT}
+
 def get_review_prompt(system_prompt):
     return ChatPromptTemplate.from_messages([
         ("system", system_prompt),
@@ -25,11 +38,30 @@ def get_review_prompt(system_prompt):
 def review_bestie_draft(draft: str) -> dict:
     """Reviews a bestie draft for quality and returns a C.A.R.E. score."""
     prompt = get_review_prompt(BESTIE_REVIEWER_SYSTEM_PROMPT)
-    chain = prompt | get_groq_llm(json_mode=True)
+    chain = prompt | get_groq_llm(json_mode=True) | JsonOutputParser()
     return chain.invoke({"draft": draft})
 
 def review_assistant_draft(draft: str) -> dict:
     """Reviews an assistant draft for clarity, factuality, and neutrality."""
     prompt = get_review_prompt(ASSISTANT_REVIEWER_SYSTEM_PROMPT)
-    chain = prompt | get_groq_llm(json_mode=True)
+    chain = prompt | get_groq_llm(json_mode=True) | JsonOutputParser()
     return chain.invoke({"draft": draft})
+
+def review_drafts(kind: str, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Reviews a batch of (user message, draft) pairs of one kind ("bestie" or "assistant") in a single call.
+
+    Returns:
+        One dict of scores per item, in order; items the reviewer skipped get an empty dict.
+    """
+    prompt = get_review_prompt(_SYSTEM_PROMPTS[kind] + BATCH_INSTRUCTIONS)
+    chain = prompt | router.llm("shadow_review", json_mode=True) | JsonOutputParser()
+    drafts = "\n\n".join(
+        f"### Draft {i}\nUser message: {json.dumps(user_text, ensure_ascii=False)}\nDraft: {json.dumps(draft, ensure_ascii=False)}"
+        for i, (user_text, draft) in enumerate(items, 1)
+    )
+    result = chain.invoke({"draft": drafts})
+    by_id = {int(r["id"]): r for r in result.get("reviews", []) if isinstance(r, dict) and str(r.get("id", "")).isdigit()}
+    return [
+        {key: float(by_id[i][key]) for key in REVIEW_SCORES[kind] if isinstance(by_id.get(i, {}).get(key), (int, float))}
+        for i in range(1, len(items) + 1)
+    ]
@@ -0,0 +1,232 @@
+"""Latency-aware model routing per node.
+
+Each node declares the models it can run on (`NODE_MODELS`, in preference
+order). Every model handed out by the router reports its latency and errors through
+a per-call callback into exponentially weighted moving averages, and `ModelRouter.choose`
+picks the model with the lowest cost:
+
+    cost = latency / ROUTER_LATENCY_REF_S
+         + ROUTER_ERROR_WEIGHT * error_rate
+         + ROUTER_QUALITY_WEIGHT * complexity * (1 - quality)
+         + a small preference-order tie breaker
+
+so simple messages drift to fast models, complex ones stay on strong models,
+and traffic shifts away from a model whose latency or error rate degrades.
+With `MODEL_ROUTING` off, the first declared model is always used (the old
+hardcoded behaviour), but health is still tracked and reported.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+
+from config.settings import settings
+from .llm_factory import get_groq_llm, get_openai_llm
+
+logger = logging.getLogger(__name__)
+
+EWMA_ALPHA = 0.2
+
+
+class ModelSpec(NamedTuple):
+    """A model a node may run on.
+
+    Attributes:
+        provider: "groq" or "openai".
+        model: Provider model name.
+        quality: 0-1, how well the model handles complex turns.
+        prior_latency_s: Assumed latency until the model has been observed.
+    """
+    provider: str
+    model: str
+    quality: float
+    prior_latency_s: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{self.model}"
+
+
+KIMI_K2 = ModelSpec("groq", "moonshotai/kimi-k2-instruct", 1.0, 2.0)
+LLAMA_70B = ModelSpec("groq", "llama-3.3-70b-versatile", 0.8, 1.0)
+LLAMA_8B = ModelSpec("groq", "llama-3.1-8b-instant", 0.4, 0.4)
+GPT_4O = ModelSpec("openai", "gpt-4o", 1.0, 3.0)
+GPT_4O_MINI = ModelSpec("openai", "gpt-4o-mini", 0.6, 1.5)
+
+# node -> acceptable models, preferred first
+NODE_MODELS: Dict[str, List[ModelSpec]] = {
+    "safety": [LLAMA_70B, LLAMA_8B],
+    "mode_decider": [LLAMA_70B, LLAMA_8B],
+    "bestie_planner": [KIMI_K2, LLAMA_70B],
+    "bestie_drafter": [KIMI_K2, LLAMA_70B],
+    "bestie_fused": [KIMI_K2, LLAMA_70B],
+    "ir_classifier": [GPT_4O, GPT_4O_MINI],
+    "ir_goal_extractor": [GPT_4O, GPT_4O_MINI],
+    "ir_planner": [GPT_4O, GPT_4O_MINI],
+    "ir_generator": [GPT_4O, GPT_4O_MINI],
+    "ir_section": [GPT_4O, GPT_4O_MINI],
+    "shadow_review": [LLAMA_70B, LLAMA_8B],
+}
+
+
+def complexity(text: str, sensing: Optional[Dict[str, Any]] = None) -> float:
+    """Scores how demanding a turn is, 0 (trivial) to 1 (long, emotional or ambiguous)."""
+    text = text or ""
+    words = len(text.split())
+    score = min(words / 120, 1.0) * 0.4
+    score += min(text.count("?"), 3) / 3 * 0.15
+    if "```" in text or "\n" in text.strip():
+        score += 0.15
+    if sensing:
+        score += min(max(float(sensing.get("uncertainty", 0) or 0), 0.0), 1.0) * 0.15
+        if any(e.get("score", 0) > 0.75 for e in sensing.get("emotions", []) if isinstance(e, dict)):
+            score += 0.15
+    return min(score, 1.0)
+
+
+class ModelHealth:
+    """EWMA latency and error rate of one model."""
+
+    def __init__(self, prior_latency_s: float):
+        self.latency_s = prior_latency_s
+        self.error_rate = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.last_seen: Optional[float] = None
+
+    def record(self, latency_s: Optional[float], ok: bool) -> None:
+        self.calls += 1
+        self.errors += 0 if ok else 1
+        self.error_rate = (1 - EWMA_ALPHA) * self.error_rate + EWMA_ALPHA * (0.0 if ok else 1.0)
+        if ok and latency_s is not None:
+            self.latency_s = (1 - EWMA_ALPHA) * self.latency_s + EWMA_ALPHA * latency_s
+        self.last_seen = time.time()
+
+
+class _HealthCallback(BaseCallbackHandler):
+    """Reports the duration and outcome of every call a routed model makes."""
+
+    def __init__(self, router: "ModelRouter", key: str):
+        self.router = router
+        self.key = key
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started[run_id] = time.monotonic()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        self.router.record(self.key, time.monotonic() - started if started else None, ok=True)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+        if isinstance(error, asyncio.CancelledError):
+            return  # e.g. the losing side of a hedged request, not a model failure
+        self.router.record(self.key, None, ok=False)
+
+
+class ModelRouter:
+    """Chooses a model per node from live latency/error EWMAs and the turn's complexity."""
+
+    def __init__(self, node_models: Dict[str, List[ModelSpec]] = NODE_MODELS):
+        self.node_models = node_models
+        self._health: Dict[str, ModelHealth] = {}
+        self._routed: Dict[str, Dict[str, int]] = {}
+        # Built clients and their health callbacks, reused across calls
+        self._clients: Dict[Tuple[str, float, bool], BaseChatModel] = {}
+        self._callbacks: Dict[str, _HealthCallback] = {}
+        self._lock = threading.Lock()
+
+    def _health_for(self, spec: ModelSpec) -> ModelHealth:
+        with self._lock:
+            if spec.key not in self._health:
+                self._health[spec.key] = ModelHealth(spec.prior_latency_s)
+            return self._health[spec.key]
+
+    def record(self, key: str, latency_s: Optional[float], ok: bool) -> None:
+        """Records the outcome of a call to the model `key`."""
+        with self._lock:
+            health = self._health.get(key)
+            if health is not None:
+                health.record(latency_s, ok)
+
+    def cost(self, spec: ModelSpec, complexity_score: float, rank: int = 0) -> float:
+        """Lower is better; see the module docstring."""
+        health = self._health_for(spec)
+        return (
+            health.latency_s / settings.ROUTER_LATENCY_REF_S
+            + settings.ROUTER_ERROR_WEIGHT * health.error_rate
+            + settings.ROUTER_QUALITY_WEIGHT * complexity_score * (1 - spec.quality)
+            + 0.05 * rank
+        )
+
+    def choose(self, node: str, complexity_score: float = 0.0) -> ModelSpec:
+        """Picks the model for a node's next call."""
+        specs = self.node_models[node]
+        if not settings.MODEL_ROUTING or len(specs) == 1:
+            choice = specs[0]
+        elif random.random() < settings.ROUTER_EXPLORE_RATE:
+            # Keep probing the other models so a recovered one can win traffic back
+            choice = random.choice(specs)
+        else:
+            choice = min(specs, key=lambda spec: self.cost(spec, complexity_score, specs.index(spec)))
+            if choice is not specs[0]:
+                logger.info(f"Routing {node} to {choice.key} (complexity {complexity_score:.2f})")
+
+        with self._lock:
+            counts = self._routed.setdefault(node, {})
+            counts[choice.key] = counts.get(choice.key, 0) + 1
+        return choice
+
+    def _client(self, spec: ModelSpec, temperature: float, json_mode: bool) -> BaseChatModel:
+        """Returns the cached chat client for a model and its settings, building it on first use."""
+        key = (spec.key, float(temperature), bool(json_mode))
+        with self._lock:
+            client = self._clients.get(key)
+        if client is not None:
+            return client
+        if spec.provider == "openai":
+            client = get_openai_llm(model_name=spec.model, temperature=temperature, json_mode=json_mode)
+        else:
+            client = get_groq_llm(model_name=spec.model, temperature=temperature, json_mode=json_mode)
+        with self._lock:
+            return self._clients.setdefault(key, client)
+
+    def llm(self, node: str, complexity_score: float = 0.0, temperature: float = 0.0, json_mode: bool = False) -> Runnable:
+        """Returns a chat model for the node, wired to report its health back to the router.
+
+        The underlying client is shared between calls and never modified; the
+        health callback is bound to each call's config instead.
+        """
+        spec = self.choose(node, complexity_score)
+        self._health_for(spec)
+        client = self._client(spec, temperature, json_mode)
+        with self._lock:
+            callback = self._callbacks.setdefault(spec.key, _HealthCallback(self, spec.key))
+        return client.with_config(callbacks=[callback])
+
+    def report(self) -> Dict[str, Any]:
+        """Per-model health and per-node routing counts, for the metrics endpoint."""
+        with self._lock:
+            return {
+                "models": {
+                    key: {
+                        "latency_s": round(h.latency_s, 3),
+                        "error_rate": round(h.error_rate, 3),
+                        "calls": h.calls,
+                        "errors": h.errors,
+                    }
+                    for key, h in self._health.items()
+                },
+                "routed": {node: dict(counts) for node, counts in self._routed.items()},
+            }
+
+
+router = ModelRouter()
@@ -1,18 +1,17 @@
-from langchain_groq import ChatGroq
 from typing import Dict
-import json
 
 from .llm_factory import get_groq_llm
+from .router import router, complexity
+from utils.json_stream import parse_json
 
-# Replace OpenAI moderation with Groq
-groq_mod = get_groq_llm(temperature=0, json_mode=True)
-llama_guard = ChatGroq(model="llama-3.1-8b-instant", temperature=0, json_mode=True)
+llama_guard = get_groq_llm(model_name="llama-3.1-8b-instant", temperature=0, json_mode=True)
 
 def safety_triage(text:str)->Dict:
     try:
+        groq_mod = router.llm("safety", complexity(text), temperature=0, json_mode=True)
         mod = groq_mod.invoke([('system',"Classify risk 0-3 and reasons as JSON."),
                                  ("user", f"Message:\n{text}\nReturn JSON {{risk_level:0..3, reasons:[...]}}")]).content
-        data = json.loads(mod)
+        data = parse_json(mod, "safety")
     except Exception:
         data = {"risk_level":0, "reasons":["parse_fail"]}
 
@@ -35,7 +34,7 @@ Be conservative in your judgment. If you are unsure, err on the side of caution
             ("system", safety_policy),
             ("user", f"User text to analyze: {text}")
         ]).content
-        g = json.loads(guard)
+        g = parse_json(guard, "safety_guard")
     except Exception:
         g = {"flag": False, "reasons":["parse_fail"]}
 
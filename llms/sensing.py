@@ -1,6 +1,11 @@
 from typing import Dict, Any, List
-from langchain_groq import ChatGroq
-import json
+from .llm_factory import get_groq_llm
+
+from config.settings import settings
+from layers.perceive.emotion_detector import emotion_vector, top_emotions
+from layers.perceive.intent_recognizer import recognize_intent, infer_needs
+from models.perception import PerceptionResult
+from utils.json_stream import parse_model
 
 SENSING_SCHEMA = {
   "type":"object",
@@ -15,9 +20,52 @@ SENSING_SCHEMA = {
   "required":["emotions","intent","uncertainty"]
 }
 
-groq_fast = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
+groq_fast = get_groq_llm(model_name="llama-3.1-8b-instant", temperature=0)
+
+# Intents that are expected to carry no emotional cues
+NEUTRAL_INTENTS = {"seek_info", "request_task", "greeting", "gratitude"}
+
+def sense_locally(text:str)->Dict[str,Any]:
+    """CPU-only sensing in the SENSING_SCHEMA shape, from lexicon scores and surface features.
+
+    Cheap enough to run on every turn, either as the whole sensing stage or to
+    pre-fill sensing while the LLM call is pending.
+    """
+    scores, hits = emotion_vector(text)
+    emotions = top_emotions(scores)
+    top = emotions[0]["score"] if emotions else 0.0
+    runner_up = emotions[1]["score"] if len(emotions) > 1 else 0.0
+    intent = recognize_intent(text, emotional_weight=top)
+
+    # Unsure when nothing in the lexicon fired, when two emotions are neck and
+    # neck, or when the intent features disagree. A plain question or greeting
+    # with no emotional cues is confidently neutral rather than ambiguous.
+    if not hits and intent["label"] in NEUTRAL_INTENTS:
+        coverage, margin = 1.0, 1.0
+    else:
+        coverage = min(hits, 3) / 3
+        margin = top - runner_up
+    uncertainty = 1.0 - (0.35 * coverage + 0.25 * min(margin * 2, 1.0) + 0.4 * intent["confidence"])
+
+    return {"emotions": emotions or [{"label":"neutral","score":0.3}],
+            "intent": intent,
+            "uncertainty": round(min(max(uncertainty, 0.0), 1.0), 2),
+            "needs": infer_needs(intent["label"], emotions)}
 
 def sense(text:str, summary:str, recent:List[Dict[str,str]])->Dict[str,Any]:
+    """Detects emotions, intent, uncertainty and needs for the latest message.
+
+    `SENSING_MODE` selects the path: "llm" always calls the model, "local" never
+    does, and "hybrid" only escalates to the model when the local result is
+    more uncertain than `SENSING_ESCALATION_THRESHOLD`. The local result is
+    also the fallback when the model's output cannot be parsed.
+    """
+    local = sense_locally(text)
+    if settings.SENSING_MODE == "local":
+        return local
+    if settings.SENSING_MODE == "hybrid" and local["uncertainty"] <= settings.SENSING_ESCALATION_THRESHOLD:
+        return local
+
     ctx = "\n".join(f"{m['role']}: {m['content']}" for m in recent[-3:])
     prompt = f"""Return compact JSON only, matching this schema:
 {SENSING_SCHEMA}
@@ -32,8 +80,6 @@ Infer up to 3 emotions (0..1), a single top intent, uncertainty (0..1), and 1-3
     try:
         out = groq_fast.invoke([("system","You are a precise emotion/intent detector."),
                                 ("user", prompt)]).content
-        return json.loads(out)
+        return parse_model(out, PerceptionResult, "sensing").model_dump(exclude_none=True)
     except Exception:
-        return {"emotions":[{"label":"uncertain","score":0.5}],
-                "intent":{"label":"misc","confidence":0.5},
-                "uncertainty":0.6, "needs":[]}
+        return local
@@ -1,7 +1,7 @@
-from langchain_groq import ChatGroq
+from .llm_factory import get_groq_llm
 
 # cheap, very fast rolling summary; ~150-200 tokens
-groq_sum = ChatGroq(model="llama3-8b-8192", temperature=0)
+groq_sum = get_groq_llm(model_name="llama3-8b-8192", temperature=0)
 
 SYSTEM = """Summarize the conversation so far in 2–4 bullet points, focusing on:
 - user goals, preferences, constraints
@@ -5,11 +5,15 @@ class ResponseComponent(BaseModel):
     """Defines a single component of a conversational response."""
     type: Literal[
         "validate", 
+        "relate",
         "reflect", 
         "share_insight", 
         "normalize", 
+        "lighten",
+        "cheer",
         "ask_open_question", 
-        "ask_clarifying_question"
+        "ask_clarifying_question",
+        "ask_nosy_question"
     ] = Field(..., description="The specific conversational action to take.")
     focus: str = Field(..., description="A brief, specific instruction for the drafter on what to focus on for that component.")
 
@@ -17,3 +21,7 @@ class BestiePlan(BaseModel):
     """Defines the conversational plan for the Bestie persona's response."""
     strategy_note: str = Field(..., description="A concise, high-level summary of the conversational goal for this turn.")
     response_components: List[ResponseComponent] = Field(..., min_items=2, max_items=3, description="An array of 2-3 components that will make up the final message.")
+
+class BestieReply(BestiePlan):
+    """A bestie plan together with the message written from it, produced in one call."""
+    message: str = Field(..., description="The final message to the user, following the response components.")
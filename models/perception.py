@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 class EmotionAnalysisResult(BaseModel):
     """Model for emotion analysis results.
@@ -32,3 +32,10 @@ class PerceptionResult(BaseModel):
     needs: List[str] = []
     tone: Optional[str] = None
     notes: Optional[str] = None
+
+
+class FrontEndResult(BaseModel):
+    """Fused front-end output: safety risk, perception and the selected mode."""
+    risk_level: int = Field(ge=0, le=3)
+    sensing: PerceptionResult
+    mode: Literal["bestie", "assistant"]
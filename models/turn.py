@@ -0,0 +1,64 @@
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
+from typing import Dict, List
+
+from langchain_core.messages import BaseMessage
+from langchain_core.messages.utils import get_buffer_string
+
+from utils.token_budget import budget
+
+class TurnContext(BaseModel):
+    """Immutable, precomputed view of the current turn shared by every node.
+
+    Built once by `ingest_node` so nodes stop re-rendering the same history,
+    role dicts and JSON. Use `model_copy(update=...)` to derive an updated
+    context (e.g. once sensing is known) instead of mutating it.
+
+    The per-node history and user text are fitted to the node's token budget
+    the first time that node asks for them and cached, so only the nodes that
+    actually run on a turn are budgeted (and can record overflows).
+
+    Attributes:
+        user_text: The latest user message, untruncated.
+        messages: The recent messages the per-node histories are fitted from.
+        sensing_json: Compact JSON of the sensing result, once available.
+        token_counts: Token counts of the user text and sensing JSON.
+        started_at: ISO timestamp of when the turn started.
+        current_time: Local time for prompts, e.g. "09:30 PM".
+        current_date: Local date for prompts, e.g. "2025-01-31".
+        current_day: Weekday name for prompts.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    user_text: str = ""
+    messages: List[BaseMessage] = Field(default_factory=list, repr=False)
+    sensing_json: str = "{}"
+    token_counts: Dict[str, int] = Field(default_factory=dict)
+    started_at: str = ""
+    current_time: str = ""
+    current_date: str = ""
+    current_day: str = ""
+
+    # Per-node caches, shared with copies made by `model_copy`
+    _fitted: Dict[str, List[BaseMessage]] = PrivateAttr(default_factory=dict)
+    _histories: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _user_texts: Dict[str, str] = PrivateAttr(default_factory=dict)
+
+    def fitted_messages(self, node: str) -> List[BaseMessage]:
+        """Returns the recent messages fitted to `node`'s history budget."""
+        if node not in self._fitted:
+            self._fitted[node] = budget.fit_messages(node, self.messages)
+        return self._fitted[node]
+
+    def history_for(self, node: str) -> str:
+        """Returns the history rendered for `node`'s budget."""
+        if node not in self._histories:
+            self._histories[node] = get_buffer_string(self.fitted_messages(node))
+        return self._histories[node]
+
+    def text_for(self, node: str) -> str:
+        """Returns the user text fitted to `node`'s budget, or the full text if it has none."""
+        if "user_text" not in budget.budgets.get(node, {}):
+            return self.user_text
+        if node not in self._user_texts:
+            self._user_texts[node] = budget.text(node, "user_text", self.user_text)
+        return self._user_texts[node]
@@ -1,7 +1,9 @@
 from __future__ import annotations
-from typing import List, Literal, TypedDict, Dict, Any, NotRequired
+from typing import List, Literal, Dict, Any, NotRequired, Optional
+from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
 from langchain_core.messages import SystemMessage, HumanMessage
+from models.turn import TurnContext
 
 # ===============================
 # State Definition
@@ -35,11 +37,16 @@ class VeeIRState(TypedDict, total=False):
     user_query: str
     conversation_history: List[SystemMessage | HumanMessage]
     word_limit: NotRequired[int]
+    turn: NotRequired[TurnContext]
+    deadline: NotRequired[float]
 
     # Pipeline state
+    documents: NotRequired[List[Dict[str, Any]]]
     information_intent: VeeInformationIntent
     unified_goal: UnifiedGoal
     plan: Dict[str, Any]
+    sections: NotRequired[List[Optional[str]]]
     
     # Final output
     final_answer: str
+    draft_source: NotRequired[Dict[str, str]]
@@ -0,0 +1,154 @@
+"""Registry of the markdown prompt templates in `prompts/`.
+
+Templates are read and parsed once, then hot-reloaded when their file's mtime
+changes. Each template is split at a `<!-- dynamic -->` marker:
+
+- everything above the marker is static instructions, sent verbatim as the
+  system message so it forms a byte-identical prefix that providers can cache;
+- everything below is a `str.format` template holding the per-turn data
+  (history, plans, time, ...), sent as the human message.
+
+Rendered token counts are tracked per template and exposed via `token_report()`.
+Tokens are only counted once a template is rendered or reported, so importing
+the registry never loads the tokenizer.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from utils.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DYNAMIC_MARKER = "<!-- dynamic -->"
+
+
+class PromptTemplate(NamedTuple):
+    """A parsed prompt template."""
+    name: str
+    static: str
+    dynamic: str
+    version: str
+    mtime: float
+
+
+class PromptRegistry:
+    """Loads every `*.md` template under the prompts directory and renders them as chat messages."""
+
+    def __init__(self, root: str = PROMPTS_DIR, reload_interval: float = 2.0):
+        """
+        Args:
+            root: Directory that holds the markdown templates.
+            reload_interval: Minimum seconds between mtime checks for a template.
+        """
+        self.root = root
+        self.reload_interval = reload_interval
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        # (name, version) -> token count of the static part, counted on first use
+        self._static_tokens: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.load_all()
+
+    def load_all(self) -> None:
+        """Loads and parses every markdown template under the root directory."""
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(".md"):
+                    path = os.path.join(dirpath, filename)
+                    self._load(os.path.relpath(path, self.root).replace(os.sep, "/"))
+
+    def _load(self, name: str) -> PromptTemplate:
+        path = os.path.join(self.root, name)
+        mtime = os.path.getmtime(path)
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+
+        static, marker, dynamic = text.partition(DYNAMIC_MARKER)
+        if not marker:
+            static, dynamic = text, ""
+        static, dynamic = static.strip(), dynamic.strip()
+        template = PromptTemplate(
+            name=name,
+            static=static,
+            dynamic=dynamic,
+            version=hashlib.sha1(text.encode("utf-8")).hexdigest()[:10],
+            mtime=mtime,
+        )
+        with self._lock:
+            self._templates[name] = template
+            self._checked_at[name] = time.monotonic()
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        """Returns a template, re-reading it if its file changed since it was loaded."""
+        template = self._templates.get(name)
+        if template is None:
+            return self._load(name)
+
+        now = time.monotonic()
+        if now - self._checked_at.get(name, 0.0) >= self.reload_interval:
+            self._checked_at[name] = now
+            try:
+                if os.path.getmtime(os.path.join(self.root, name)) != template.mtime:
+                    logger.info(f"Reloading prompt template '{name}'")
+                    template = self._load(name)
+            except OSError:
+                pass  # Keep serving the last good copy if the file is briefly missing
+        return template
+
+    def version(self, name: str) -> str:
+        """Returns a short content hash identifying the current version of a template."""
+        return self.get(name).version
+
+    def render(self, name: str, /, **variables: Any) -> List[BaseMessage]:
+        """Renders a template as [static system message, dynamic human message]."""
+        template = self.get(name)
+        messages: List[BaseMessage] = [SystemMessage(content=template.static)]
+        if template.dynamic:
+            messages.append(HumanMessage(content=template.dynamic.format(**variables)))
+        self._record(template, messages)
+        return messages
+
+    def static_tokens(self, template: PromptTemplate) -> int:
+        """Returns the token count of a template's cacheable static part."""
+        key = (template.name, template.version)
+        if key not in self._static_tokens:
+            self._static_tokens[key] = count_tokens(template.static)
+        return self._static_tokens[key]
+
+    def _record(self, template: PromptTemplate, messages: List[BaseMessage]) -> None:
+        dynamic_tokens = sum(count_tokens(m.content) for m in messages[1:])
+        total = self.static_tokens(template) + dynamic_tokens
+        with self._lock:
+            stats = self._stats.setdefault(template.name, {"renders": 0, "last_tokens": 0, "max_tokens": 0, "total_tokens": 0})
+            stats["renders"] += 1
+            stats["last_tokens"] = total
+            stats["max_tokens"] = max(stats["max_tokens"], total)
+            stats["total_tokens"] += total
+
+    def token_report(self, name: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """Returns per-template token statistics.
+
+        Each entry has the cacheable `static_tokens`, plus `renders`,
+        `last_tokens`, `max_tokens` and `avg_tokens` for full rendered prompts.
+        """
+        names = [name] if name else sorted(self._templates)
+        report = {}
+        for template_name in names:
+            template = self.get(template_name)
+            stats = dict(self._stats.get(template_name, {"renders": 0, "last_tokens": 0, "max_tokens": 0, "total_tokens": 0}))
+            total_tokens = stats.pop("total_tokens")
+            stats["avg_tokens"] = total_tokens // stats["renders"] if stats["renders"] else 0
+            report[template_name] = {"static_tokens": self.static_tokens(template), **stats}
+        return report
+
+
+registry = PromptRegistry()
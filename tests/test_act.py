@@ -0,0 +1,112 @@
+import html
+import re
+
+from utils.formatter import TelegramStreamFormatter, format_for_telegram, to_telegram_messages
+
+_TAG_RE = re.compile(r"<(/?)(\w+)[^>]*>")
+
+
+def units(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+def balanced(message):
+    stack = []
+    for closing, tag in _TAG_RE.findall(message):
+        if closing:
+            if not stack or stack.pop() != tag:
+                return False
+        else:
+            stack.append(tag)
+    return not stack
+
+
+def visible(messages):
+    """The text of the messages without tags, whitespace-normalized."""
+    return " ".join(html.unescape(_TAG_RE.sub("", "\n".join(messages))).split())
+
+
+def test_converts_inline_markdown_and_escapes_html():
+    assert format_for_telegram("**Hi** *there* ~~old~~ `x<y` & [docs](https://example.org/a?b=1&c=2)") == (
+        '<b>Hi</b> <i>there</i> <s>old</s> <code>x&lt;y</code> &amp; '
+        '<a href="https://example.org/a?b=1&amp;c=2">docs</a>'
+    )
+
+
+def test_converts_headers_and_bullets():
+    assert format_for_telegram("## Steps\n- one\n* two") == "<b>Steps</b>\n• one\n• two"
+
+
+def test_unpaired_markers_stay_literal():
+    assert format_for_telegram("2 * 3 and **not closed") == "2 * 3 and **not closed"
+
+
+def test_inline_markup_is_closed_at_the_end_of_the_line():
+    assert format_for_telegram("*stray\nnext") == "*stray\nnext"
+    assert format_for_telegram("[a **b](https://x.org)** c") == '<a href="https://x.org">a **b</a>** c'
+
+
+def test_streamed_deltas_match_the_whole_text():
+    text = "# Title\nSome **bold** text with `code`.\n\n```\nprint('hi')\n```\n- a [link](https://example.org)\n" * 20
+    formatter = TelegramStreamFormatter(limit=300)
+    messages = []
+    for i in range(0, len(text), 7):
+        messages += formatter.feed(text[i:i + 7])
+    messages += formatter.close()
+    assert messages == to_telegram_messages(text, limit=300)
+
+
+def test_current_previews_a_balanced_message_without_consuming_input():
+    formatter = TelegramStreamFormatter()
+    assert formatter.feed("```\ncode line\nmore **bo") == []
+    assert formatter.current() == "<pre>\ncode line\nmore **bo</pre>"
+    assert formatter.feed("ld**\n```\n") == []
+    assert formatter.close() == ["<pre>\ncode line\nmore **bold**\n</pre>"]
+
+
+def test_splits_within_the_limit_at_line_boundaries():
+    lines = [f"Line {i} has a few words in it." for i in range(50)]
+    messages = to_telegram_messages("\n".join(lines), limit=200)
+    assert len(messages) > 1
+    assert all(units(m) <= 200 and balanced(m) for m in messages)
+    # Whole lines go to one message
+    assert all(m.startswith("Line ") and m.endswith(".") for m in messages)
+    assert visible(messages) == " ".join(" ".join(lines).split())
+
+
+def test_tags_open_at_a_split_are_reopened():
+    text = "**" + " ".join(f"word{i}" for i in range(60)) + "**"
+    messages = to_telegram_messages(text, limit=100)
+    assert len(messages) > 1
+    for message in messages:
+        assert units(message) <= 100
+        assert message.startswith("<b>") and message.endswith("</b>")
+    assert visible(messages) == " ".join(f"word{i}" for i in range(60))
+
+
+def test_limit_counts_utf16_code_units():
+    text = " ".join("😅" * 3 for _ in range(40))
+    messages = to_telegram_messages(text, limit=50)
+    # Each emoji is two UTF-16 code units, so counting characters would overflow
+    assert any(len(m) <= 50 < 2 * len(m) for m in messages)
+    assert all(units(m) <= 50 for m in messages)
+    assert visible(messages) == text
+
+
+def test_fenced_code_continues_across_a_split():
+    code = [f"x_{i} = compute({i}) * 2" for i in range(40)]
+    messages = to_telegram_messages("Here you go:\n```python\n" + "\n".join(code) + "\n```\nDone.", limit=300)
+    assert len(messages) > 2
+    assert all(units(m) <= 300 and balanced(m) for m in messages)
+    for message in messages[1:-1]:
+        assert message.startswith("<pre>") and message.endswith("</pre>")
+    # Code lines are never cut, and markdown inside the fence is left alone
+    assert [line for m in messages for line in _TAG_RE.sub("", m).split("\n") if line.startswith("x_")] == code
+
+
+def test_long_words_are_cut_to_fit():
+    url = "https://example.org/" + "a" * 2000
+    messages = to_telegram_messages(url, limit=600)
+    assert len(messages) > 1
+    assert all(units(m) <= 600 for m in messages)
+    assert "".join(messages) == url
@@ -0,0 +1,91 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START, MessagesState, StateGraph
+
+from graph.checkpointer import DurableCheckpointer, ephemeral_channels
+from graph.state import Ephemeral, VeeState, changes_only
+
+
+class State(MessagesState):
+    profile: Dict[str, Any]
+    scratch: Ephemeral[Optional[str]]
+
+
+class RecordingSaver(InMemorySaver):
+    """In-memory saver that remembers the channel of every pending write it stores."""
+
+    def __init__(self):
+        super().__init__()
+        self.written = []
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self.written += [channel for channel, _ in writes]
+        super().put_writes(config, writes, task_id, task_path)
+
+
+def test_changes_only_returns_changed_channels_and_added_messages():
+    history = [HumanMessage(content="hi", id="1"), AIMessage(content="hey", id="2")]
+
+    @changes_only
+    def node(state):
+        state["profile"]["name"] = "Sam"
+        state["messages"].append(AIMessage(content="how are you?", id="3"))
+        state["scratch"] = "x"
+        return state
+
+    state = {"messages": list(history), "profile": {"name": None}, "session": {"context": {}}}
+    assert node(state) == {"profile": {"name": "Sam"}, "scratch": "x",
+                           "messages": [AIMessage(content="how are you?", id="3")]}
+
+
+def test_changes_only_wraps_async_nodes():
+    @changes_only
+    async def node(state):
+        return {**state, "scratch": "y"}
+
+    assert asyncio.iscoroutinefunction(node)
+    assert asyncio.run(node({"messages": [HumanMessage(content="hi")], "scratch": None})) == {"scratch": "y"}
+
+
+def test_changes_only_returns_nothing_for_an_unchanged_state():
+    assert changes_only(lambda state: state)({"messages": [HumanMessage(content="hi")], "profile": {}}) == {}
+
+
+def test_ephemeral_channels():
+    assert ephemeral_channels(State) == {"scratch"}
+    durable = {"messages", "session", "user", "trackers", "reflection"}
+    assert set(VeeState.__annotations__) - ephemeral_channels(VeeState) == durable
+
+
+def test_durable_checkpointer_drops_ephemeral_writes():
+    def first(state):
+        return {"scratch": "computed", "profile": {"turns": len(state["messages"])}}
+
+    def second(state):
+        return {"messages": [AIMessage(content=f"saw {state['scratch']}")]}
+
+    workflow = StateGraph(State)
+    workflow.add_node("first", first)
+    workflow.add_node("second", second)
+    workflow.add_edge(START, "first")
+    workflow.add_edge("first", "second")
+    workflow.add_edge("second", END)
+    saver = RecordingSaver()
+    graph = workflow.compile(checkpointer=DurableCheckpointer(saver, ephemeral_channels(State)))
+    config = {"configurable": {"thread_id": "t"}}
+
+    output = graph.invoke({"messages": [HumanMessage(content="hi")]}, config)
+    assert output["scratch"] == "computed"
+    assert output["messages"][-1].content == "saw computed"
+    assert "scratch" not in saver.written
+    assert {"profile", "messages"} <= set(saver.written)
+
+    # The next turn starts from the durable channels only
+    values = graph.get_state(config).values
+    assert "scratch" not in values
+    assert values["profile"] == {"turns": 1}
+    graph.invoke({"messages": [HumanMessage(content="again")]}, config)
+    assert graph.get_state(config).values["profile"] == {"turns": 3}
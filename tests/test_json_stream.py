@@ -0,0 +1,78 @@
+from typing import List
+
+import pytest
+from pydantic import BaseModel
+
+from utils.json_stream import JSONParseError, StreamingJSONParser, parse_json, parse_model, parse_report, parse_stream
+
+
+class Triage(BaseModel):
+    risk_level: int
+    reasons: List[str]
+
+
+def test_parses_plain_json():
+    assert parse_json('{"a": 1, "b": [1, 2]}', "test_plain") == {"a": 1, "b": [1, 2]}
+    assert parse_report()["test_plain"]["ok"] == 1
+
+
+def test_skips_code_fences_and_surrounding_prose():
+    text = 'Sure! Here it is:\n```json\n{"risk_level": 1, "reasons": ["sad"]}\n```\nLet me know {if} that helps.'
+    assert parse_model(text, Triage, "test_fenced") == Triage(risk_level=1, reasons=["sad"])
+    assert parse_report()["test_fenced"]["repaired"] == 1
+
+
+def test_tolerates_trailing_commas():
+    assert parse_json('{"a": [1, 2,], "b": {"c": 3,},}', "test_commas") == {"a": [1, 2], "b": {"c": 3}}
+
+
+def test_braces_inside_strings_do_not_close_the_value():
+    assert parse_json('{"text": "a } and a \\" and a {", "n": 1} trailing }', "test_strings") == \
+        {"text": 'a } and a " and a {', "n": 1}
+
+
+def test_truncated_object_keeps_complete_fields():
+    assert parse_json('{"risk_level": 2, "reasons": ["a"], "note": "cut off mid', "test_truncated") == \
+        {"risk_level": 2, "reasons": ["a"]}
+    assert parse_report()["test_truncated"]["repaired"] == 1
+
+
+def test_top_level_arrays():
+    assert parse_json('Result: [{"a": 1}, {"a": 2}]', "test_array") == [{"a": 1}, {"a": 2}]
+
+
+def test_failures_raise_and_are_counted():
+    with pytest.raises(JSONParseError):
+        parse_json("no json here", "test_failed")
+    with pytest.raises(JSONParseError):
+        parse_model('{"risk_level": "high"}', Triage, "test_failed")
+    assert parse_report()["test_failed"] == {"ok": 0, "repaired": 0, "failed": 2, "failure_rate": 1.0}
+
+
+def test_fields_are_reported_in_order_as_they_complete():
+    seen = []
+    parser = StreamingJSONParser(on_field=lambda key, value: seen.append((key, value)))
+    text = '```json\n{"risk_level": 3, "reasons": ["x", {"y": "}"}], "nested": {"a": [1, 2]}, "last": null}'
+    first_comma = text.index(",")
+    for i, c in enumerate(text):
+        parser.feed(c)
+        # A field is reported by the character that ends it, before the rest streams in
+        if i == first_comma:
+            assert seen == [("risk_level", 3)]
+    assert seen == [("risk_level", 3), ("reasons", ["x", {"y": "}"}]), ("nested", {"a": [1, 2]}), ("last", None)]
+    assert parser.done
+
+
+def test_parse_stream_stops_reading_once_the_value_closes():
+    read = []
+
+    def chunks():
+        for chunk in ['{"risk_level": 0, ', '"reasons": []}', " and then some", " more prose"]:
+            read.append(chunk)
+            yield chunk
+
+    fields = []
+    result = parse_stream(chunks(), Triage, "test_stream", lambda key, value: fields.append(key))
+    assert result == Triage(risk_level=0, reasons=[])
+    assert fields == ["risk_level", "reasons"]
+    assert len(read) == 2
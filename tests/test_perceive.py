@@ -0,0 +1,231 @@
+import json
+import math
+
+import numpy as np
+import pytest
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_groq import ChatGroq
+
+from config.settings import settings
+from layers.perceive import knowledge_index, memory_access
+from layers.perceive.knowledge_index import B, K1, KnowledgeIndex, rank_passages, split_passages, tokenize
+from layers.perceive.memory_access import MemoryIndex, embed, user_profile
+from llms import cassette as cassette_module
+from llms.cassette import Cassette, CassetteMiss
+from llms.front_end import front_end_triage
+from models.info_seeker import Document
+
+DOCUMENTS = [
+    {"title": "Vaccines", "url": "https://example.org/vaccines",
+     "text": "Vaccines train the immune system to recognise a virus without causing the disease."},
+    {"title": "Photosynthesis", "url": "https://example.org/photosynthesis",
+     "text": "Plants turn light, water and carbon dioxide into sugar and oxygen through photosynthesis."},
+    {"title": "Sleep", "url": "https://example.org/sleep",
+     "text": "Adults need seven to nine hours of sleep. Light in the evening delays sleep."},
+]
+
+
+def bm25(query, documents):
+    """Reference BM25 over whole documents (title + text), one score per document."""
+    tokenized = [tokenize(f"{d['title']} {d['text']}") for d in documents]
+    n = len(tokenized)
+    avgdl = sum(len(t) for t in tokenized) / n
+    scores = []
+    for tokens in tokenized:
+        score = 0.0
+        for term in set(tokenize(query)):
+            tf = tokens.count(term)
+            df = sum(term in t for t in tokenized)
+            if tf:
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * len(tokens) / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_tokenize_drops_stopwords_and_stems_plurals():
+    assert tokenize("How do the Vaccines work? It's about the bodies") == ["vaccine", "work", "body"]
+
+
+def test_split_passages_keeps_paragraphs_and_cuts_long_ones():
+    text = "one two three\n\nfour five\n\n" + " ".join(f"w{i}" for i in range(12))
+    passages = split_passages(text, words=5)
+    assert passages[0] == "one two three four five"
+    assert all(len(p.split()) <= 5 for p in passages)
+    assert " ".join(passages).split() == text.split()
+
+
+def test_search_ranks_by_bm25(tmp_path):
+    index = KnowledgeIndex(str(tmp_path))
+    assert index.add(DOCUMENTS) == 3
+
+    hits = index.search("light and sleep", k=3)
+    expected = bm25("light and sleep", DOCUMENTS)
+    assert [p["url"] for _, p in hits] == ["https://example.org/sleep", "https://example.org/photosynthesis"]
+    for score, passage in hits:
+        assert score == pytest.approx(expected[passage["id"]], rel=1e-5)
+
+
+def test_search_agrees_with_rank_passages(tmp_path):
+    index = KnowledgeIndex(str(tmp_path))
+    index.add(DOCUMENTS)
+    passages = [f"{d['title']} {d['text']}" for d in DOCUMENTS]
+    assert [p["id"] for _, p in index.search("virus immune", k=2)] == rank_passages("virus immune", passages, 2)
+
+
+def test_search_without_matches_or_passages(tmp_path):
+    index = KnowledgeIndex(str(tmp_path))
+    assert index.search("anything") == []
+    index.add(DOCUMENTS)
+    assert index.search("quantum chromodynamics") == []
+    assert index.search("sleep", min_score=100.0) == []
+
+
+def test_readding_a_url_replaces_its_passages(tmp_path):
+    index = KnowledgeIndex(str(tmp_path))
+    index.add(DOCUMENTS)
+    index.add([{**DOCUMENTS[2], "text": "Naps after lunch are short."}])
+
+    assert len(index) == 3
+    assert index.search("hours evening") == []
+    assert [p["text"] for _, p in index.search("naps")] == ["Naps after lunch are short."]
+
+
+def test_index_reloads_and_merges_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(knowledge_index, "MAX_SEGMENTS", 2)
+    index = KnowledgeIndex(str(tmp_path))
+    for document in DOCUMENTS:
+        index.add([document])
+    assert len(index._segments) == 1
+    index.add([{**DOCUMENTS[0], "text": "Vaccines are tested in trials."}])
+
+    reloaded = KnowledgeIndex(str(tmp_path))
+    assert len(reloaded) == 3
+    assert [(round(s, 4), p["id"]) for s, p in reloaded.search("vaccine trial sleep")] == \
+        [(round(s, 4), p["id"]) for s, p in index.search("vaccine trial sleep")]
+    assert [p["text"] for _, p in reloaded.search("immune")] == []
+
+
+def test_retrieve_returns_documents_when_enabled(tmp_path, monkeypatch):
+    index = KnowledgeIndex(str(tmp_path))
+    index.add(DOCUMENTS)
+    monkeypatch.setattr(knowledge_index, "_index", index)
+    monkeypatch.setattr(settings, "KNOWLEDGE_MIN_SCORE", 0.0)
+
+    monkeypatch.setattr(settings, "KNOWLEDGE_INDEX", False)
+    assert knowledge_index.retrieve("photosynthesis") == []
+
+    monkeypatch.setattr(settings, "KNOWLEDGE_INDEX", True)
+    documents = knowledge_index.retrieve("photosynthesis")
+    assert documents == [Document(title="Photosynthesis", url="https://example.org/photosynthesis",
+                                  excerpt=DOCUMENTS[1]["text"])]
+
+
+def test_embed_is_normalized_and_ignores_case_and_stopwords():
+    vector = embed("I really love Hiking in the mountains")
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+    assert np.array_equal(vector, embed("love hiking mountains"))
+    assert float(vector @ embed("hiking in the mountains")) > float(vector @ embed("works as a nurse"))
+
+
+def test_memories_are_searched_per_user(tmp_path):
+    index = MemoryIndex(str(tmp_path), dim=64)
+    assert index.add("1", "Has a dog called Biscuit")
+    assert index.add("1", "Works night shifts as a nurse")
+    assert index.add("2", "Has a cat called Biscuit")
+
+    hits = index.search("1", "how is your dog doing", k=1)
+    assert [m["text"] for _, m in hits] == ["Has a dog called Biscuit"]
+    assert {m["chat_id"] for _, m in index.search("2", "biscuit")} == {"2"}
+    assert index.search("3", "dog") == []
+
+
+def test_repeated_memories_refresh_instead_of_adding(tmp_path):
+    index = MemoryIndex(str(tmp_path), dim=64)
+    index.add("1", "Has a dog called Biscuit")
+    assert not index.add("1", "has a dog called biscuit!")
+    assert index.add("1", "Has a dog named Biscuit")
+    assert not index.add("1", "Has a dog named Biscuit too", dedup_threshold=0.5)
+    assert len(index) == 2
+    assert [m["seen"] for _, m in index.search("1", "dog called")] == [2, 2]
+
+
+def test_memories_survive_a_reload_and_vector_file_growth(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_access, "INITIAL_CAPACITY", 2)
+    index = MemoryIndex(str(tmp_path), dim=64)
+    facts = ["Likes jazz", "Studies chemistry", "Lives in Leeds", "Runs every morning", "Has two sisters"]
+    for fact in facts:
+        index.add("1", fact)
+    index.add("1", "likes jazz")
+    index.flush()
+
+    reloaded = MemoryIndex(str(tmp_path), dim=64)
+    assert len(reloaded) == len(facts)
+    assert reloaded.search("1", "chemistry exam")[0][1]["text"] == "Studies chemistry"
+    assert reloaded.search("1", "jazz")[0][1]["seen"] == 2
+
+    # Vectors are re-embedded from the log when the vector file is lost
+    (tmp_path / "vectors.f32").unlink()
+    rebuilt = MemoryIndex(str(tmp_path), dim=64)
+    assert rebuilt.search("1", "Leeds")[0][1]["text"] == "Lives in Leeds"
+
+
+def test_user_profile_recalls_memories_when_enabled(tmp_path, monkeypatch):
+    index = MemoryIndex(str(tmp_path), dim=64)
+    index.add("1", "Has an exam on Friday")
+    monkeypatch.setattr(memory_access, "_index", index)
+    state = {"user": {"name": "Sam", "chat_id": "1"}}
+
+    monkeypatch.setattr(settings, "LONG_TERM_MEMORY", False)
+    assert user_profile(state, "exam stress") == ("Sam", memory_access.NO_MEMORIES)
+
+    monkeypatch.setattr(settings, "LONG_TERM_MEMORY", True)
+    monkeypatch.setattr(settings, "MEMORY_MIN_SCORE", 0.1)
+    assert user_profile(state, "exam stress") == ("Sam", "- Has an exam on Friday")
+    assert user_profile({"user": {"chat_id": "2"}}, "exam") == (memory_access.DEFAULT_USER_NAME, memory_access.NO_MEMORIES)
+
+
+def test_front_end_triage_is_recorded_and_replayed(tmp_path, monkeypatch):
+    triage = {"risk_level": 0, "mode": "bestie",
+              "sensing": {"emotions": [{"label": "tired", "score": 0.7}], "intent": {"label": "vent", "confidence": 0.9},
+                          "uncertainty": 0.2}}
+
+    def generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=json.dumps(triage)))])
+
+    def network(self, *args, **kwargs):
+        raise AssertionError("replay reached the network")
+
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    path = str(tmp_path / "cassette.jsonl.gz")
+    previous = get_llm_cache()
+    try:
+        for mode in ("record", "replay"):
+            cassette = Cassette(path, mode=mode)
+            set_llm_cache(cassette)
+            monkeypatch.setattr(cassette_module, "_installed", cassette)
+            monkeypatch.setattr(ChatGroq, "_generate", generate if mode == "record" else network)
+            monkeypatch.setattr(ChatGroq, "_stream", network)
+            fields = []
+            result = front_end_triage("so tired today", "", on_field=lambda key, value: fields.append(key))
+            assert result["mode"] == "bestie" and result["sensing"]["intent"]["label"] == "vent"
+            assert fields == ["risk_level", "mode", "sensing"]
+        assert cassette.stats["hits"] == 1
+    finally:
+        set_llm_cache(previous)
+
+
+def test_replay_misses_are_not_swallowed_by_fallbacks(tmp_path, monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    cassette = Cassette(str(tmp_path / "empty.jsonl.gz"), mode="replay")
+    previous = get_llm_cache()
+    set_llm_cache(cassette)
+    monkeypatch.setattr(cassette_module, "_installed", cassette)
+    try:
+        with pytest.raises(CassetteMiss):
+            front_end_triage("so tired today", "")
+    finally:
+        set_llm_cache(previous)
+    assert cassette.stats["misses"] == 1
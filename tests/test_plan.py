@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.runnables import RunnableLambda
+
+from llms import info_seeker
+from llms import router as router_module
+from llms.latency import model_key
+from llms.router import LLAMA_70B, ModelRouter
+from models.info_seeker import FactCheckResult, VerifiedFact
+
+DOCUMENTS = [{"title": "Moon", "url": "https://example.org/moon", "excerpt": "The Moon orbits the Earth every 27 days."},
+             {"title": "Mars", "url": "https://example.org/mars", "excerpt": "Mars has two small moons."}]
+
+
+class FakeFactChecker:
+    """Stands in for the single-batch fact-checker chain: fixed latency, fails batches mentioning "boom"."""
+
+    def __init__(self, latency_s=0.0):
+        self.latency_s = latency_s
+        self.inputs = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def _result(self, inputs):
+        claims = [line[2:] for line in inputs["claims"].splitlines()]
+        if any("boom" in claim for claim in claims):
+            raise RuntimeError("model down")
+        return FactCheckResult(facts_verified=[VerifiedFact(claim=c, verdict="Supported", sources=[], confidence="Low")
+                                               for c in claims if c != "unclear"],
+                               unresolved=[c for c in claims if c == "unclear"])
+
+    def _enter(self, inputs):
+        with self._lock:
+            self.inputs.append(inputs)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    def check(self, inputs):
+        self._enter(inputs)
+        try:
+            time.sleep(self.latency_s)
+            return self._result(inputs)
+        finally:
+            self._exit()
+
+    async def acheck(self, inputs):
+        self._enter(inputs)
+        try:
+            await asyncio.sleep(self.latency_s)
+            return self._result(inputs)
+        finally:
+            self._exit()
+
+    def chain(self):
+        return RunnableLambda(self.check, afunc=self.acheck)
+
+
+@pytest.fixture
+def fact_checker(monkeypatch):
+    checker = FakeFactChecker()
+    monkeypatch.setattr(info_seeker, "_get_batch_fact_checker_chain", checker.chain)
+    return checker
+
+
+def test_router_reuses_clients_and_reports_health_per_call(monkeypatch):
+    built = []
+
+    def fake_groq_llm(model_name, temperature, json_mode):
+        built.append((model_name, temperature, json_mode))
+        return FakeListChatModel(responses=["ok"] * 10)
+
+    monkeypatch.setattr(router_module, "get_groq_llm", fake_groq_llm)
+    router = ModelRouter({"node": [LLAMA_70B]})
+
+    first = router.llm("node", temperature=0.4)
+    second = router.llm("node", temperature=0.4)
+    assert first.bound is second.bound
+    router.llm("node", temperature=0.4, json_mode=True)
+    assert built == [(LLAMA_70B.model, 0.4, False), (LLAMA_70B.model, 0.4, True)]
+
+    assert first.invoke("hi").content == "ok"
+    second.invoke("hi")
+    assert router.report()["models"][LLAMA_70B.key]["calls"] == 2
+    assert first.bound.callbacks is None
+    assert model_key(first) == model_key(first.bound) == "FakeListChatModel:unknown"
+
+
+def test_fact_checks_are_batched_in_claim_order(fact_checker):
+    claims = [f"moon claim {i}" for i in range(7)] + ["unclear"]
+    result = info_seeker.check_facts(claims, DOCUMENTS, batch_size=3, concurrency=2, excerpts=1)
+
+    assert [fact.claim for fact in result.facts_verified] == claims[:-1]
+    assert result.unresolved == ["unclear"] and result.risk_notes is None
+    assert sorted(len(i["claims"].splitlines()) for i in fact_checker.inputs) == [2, 3, 3]
+    assert all(i["documents"].count("[https://example.org/") == 1 for i in fact_checker.inputs)
+
+
+def test_a_failed_batch_leaves_its_claims_unresolved(fact_checker):
+    chain = info_seeker.get_fact_checker_chain()
+    result = chain.invoke({"claims": "- a\n- b boom\n- c\n- d", "documents": "The Moon orbits the Earth."})
+    assert [fact.claim for fact in result.facts_verified] == ["d"]
+    assert result.unresolved == ["a", "b boom", "c"]
+    assert result.risk_notes == ["Could not check 3 claims: model down"]
+    assert asyncio.run(chain.ainvoke({"claims": ["a", "b boom", "c", "d"], "documents": DOCUMENTS})) == result
+
+
+@pytest.mark.parametrize("claims", [3, 12, 30])
+def test_fact_check_concurrency_is_bounded(fact_checker, claims):
+    fact_checker.latency_s = 0.2
+    names = [f"claim {i}" for i in range(claims)]
+
+    started = time.monotonic()
+    result = asyncio.run(info_seeker.acheck_facts(names, DOCUMENTS, batch_size=3, concurrency=10))
+    assert len(result.facts_verified) == claims
+    assert fact_checker.peak == min(-(-claims // 3), 10)
+    assert time.monotonic() - started < 1.0
+
+    fact_checker.latency_s, fact_checker.peak = 0.02, 0
+    info_seeker.check_facts(names, DOCUMENTS, batch_size=3, concurrency=2)
+    assert fact_checker.peak <= 2
@@ -0,0 +1,278 @@
+import asyncio
+import gc
+import json
+import random
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.language_models import FakeListChatModel
+
+from config.settings import settings
+from layers.reflect import strategy_adjuster
+from layers.reflect.memory_updater import extract_name
+from layers.reflect.pipeline import ReflectionContext, ReflectionPipeline, ReflectionResult
+from layers.reflect.shadow_review import ShadowReviewer
+from llms import reviewer as reviewer_module
+from layers.reflect.strategy_adjuster import StrategyPolicy, adjust_strategy, plan_for_shape, plan_shape, state_key
+from models.bestie import BestiePlan
+
+SAD = {"emotions": [{"label": "sad", "score": 0.8}, {"label": "tired", "score": 0.3}],
+       "intent": {"label": "vent"}, "uncertainty": 0.2, "needs": ["comfort"]}
+
+
+def plan(*types):
+    return {"strategy_note": "be there", "response_components": [{"type": t, "focus": "..."} for t in types]}
+
+
+@pytest.fixture
+def thresholds(monkeypatch):
+    monkeypatch.setattr(settings, "POLICY_MIN_VISITS", 4)
+    monkeypatch.setattr(settings, "POLICY_MIN_ARM_VISITS", 2)
+    monkeypatch.setattr(settings, "POLICY_MIN_REWARD", 0.5)
+    monkeypatch.setattr(settings, "POLICY_EXPLORE_RATE", 0.0)
+
+
+class FakeGraph:
+    """Keeps one state per thread, like a checkpointed graph."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def aget_state(self, config):
+        return SimpleNamespace(values=dict(self.values.get(config["configurable"]["thread_id"], {})))
+
+    async def aupdate_state(self, config, values, as_node=None):
+        self.values.setdefault(config["configurable"]["thread_id"], {}).update(values)
+
+
+def sent(text="hey", mode="bestie", version="v1"):
+    """State of a turn whose reply was sent."""
+    return {"draft": f"re: {text}", "last_user_text": text, "mode": mode,
+            "draft_source": {"node": "bestie_drafter", "model": "ChatGroq:kimi", "prompt": "p.md", "prompt_version": version}}
+
+
+class FakeReviewer:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, kind, items):
+        self.batches.append((kind, items))
+        if self.fail:
+            raise RuntimeError("reviewer down")
+        return [{"C": 0.5, "E": 1.0}, {}, {"C": 1.0, "E": 1.0}][:len(items)]
+
+
+def test_state_key_discretizes_sensing():
+    assert state_key(SAD) == "sad|vent|low"
+    assert state_key({"intent": {"label": "ask"}, "uncertainty": 0.9}) == "none|ask|high"
+    assert state_key({}) is None and state_key(None) is None
+
+
+def test_plan_shapes_round_trip_to_valid_plans():
+    assert plan_shape(plan("validate", "ask_open_question")) == "validate+ask_open_question"
+    assert plan_shape({"response_components": []}) is None
+    built = plan_for_shape("validate+share_insight", SAD)
+    assert plan_shape(built) == "validate+share_insight"
+    assert "sad" in built["response_components"][0]["focus"]
+    assert "comfort" in built["response_components"][1]["focus"]
+    BestiePlan(**built)
+
+
+def test_update_credits_shapes_per_state():
+    policy = StrategyPolicy()
+    assert policy.update(SAD, plan("validate", "relate"), 0.9)
+    assert policy.update(SAD, plan("validate", "relate"), 1.7)
+    assert not policy.update({}, plan("validate", "relate"), 0.9)
+    assert not policy.update(SAD, {"strategy_note": "no components"}, 0.9)
+    assert policy._table == {"sad|vent|low": {"validate+relate": {"n": 2, "reward": 1.9}}}
+    assert policy.report() == {"states": 1, "arms": 1, "updates": 2}
+
+
+def test_update_drops_the_least_played_arm_when_full(monkeypatch):
+    monkeypatch.setattr(strategy_adjuster, "MAX_ARMS_PER_STATE", 2)
+    policy = StrategyPolicy()
+    policy.update(SAD, plan("validate", "relate"), 0.5)
+    policy.update(SAD, plan("validate", "relate"), 0.5)
+    policy.update(SAD, plan("cheer", "lighten"), 0.5)
+    policy.update(SAD, plan("reflect", "normalize"), 0.5)
+    assert set(policy._table["sad|vent|low"]) == {"validate+relate", "reflect+normalize"}
+
+
+def test_choose_defers_to_the_llm_until_confident(thresholds):
+    policy = StrategyPolicy()
+    assert policy.choose(SAD) == (None, "novel")
+    for _ in range(4):
+        policy.update(SAD, plan("validate", "relate"), 0.2)
+    assert policy.choose(SAD) == (None, "low_confidence")
+    for _ in range(4):
+        policy.update(SAD, plan("validate", "ask_open_question"), 0.9)
+    chosen, reason = policy.choose(SAD)
+    assert reason == "policy"
+    assert plan_shape(chosen) in {"validate+relate", "validate+ask_open_question"}
+    assert policy.choose({}) == (None, "novel")
+
+
+def test_choose_prefers_the_better_shape(thresholds):
+    random.seed(0)
+    policy = StrategyPolicy()
+    for _ in range(30):
+        policy.update(SAD, plan("validate", "relate"), 0.1)
+        policy.update(SAD, plan("validate", "ask_open_question"), 0.9)
+    shapes = [plan_shape(policy.choose(SAD)[0]) for _ in range(50)]
+    assert shapes.count("validate+ask_open_question") >= 45
+
+
+def test_choose_explores(thresholds, monkeypatch):
+    monkeypatch.setattr(settings, "POLICY_EXPLORE_RATE", 1.0)
+    policy = StrategyPolicy()
+    for _ in range(4):
+        policy.update(SAD, plan("validate", "relate"), 0.9)
+    assert policy.choose(SAD) == (None, "explore")
+
+
+def test_policy_is_saved_and_reloaded(tmp_path):
+    path = tmp_path / "policy.json"
+    policy = StrategyPolicy(str(path))
+    policy.update(SAD, plan("validate", "relate"), 0.8)
+    policy.save()
+    assert json.loads(path.read_text())["states"]["sad|vent|low"]["validate+relate"] == {"n": 1, "reward": 0.8}
+    assert StrategyPolicy(str(path))._table == policy._table
+
+
+def test_adjust_strategy_updates_component_means_and_the_policy(monkeypatch):
+    policy = StrategyPolicy()
+    monkeypatch.setattr(strategy_adjuster, "_policy", policy)
+    monkeypatch.setattr(settings, "STRATEGY_POLICY", True)
+    state = {"reflection": {"strategy": {"components": {"validate": {"n": 1, "mean": 0.4}}, "evaluations": 1}}}
+    impact = {"evaluated": {"plan": plan("validate", "relate"), "score": 0.8, "sensing": SAD}}
+
+    result = adjust_strategy(ReflectionContext("1", state, {"impact": impact}))
+    assert result.summary == {"components": {"validate": {"n": 2, "mean": 0.6}, "relate": {"n": 1, "mean": 0.8}},
+                              "evaluations": 2}
+    assert policy._table["sad|vent|low"]["validate+relate"]["n"] == 1
+
+
+def test_extract_name_from_introductions():
+    assert extract_name("hey, my name is sam") == "Sam"
+    assert extract_name("My name is Sam, what's yours?") == "Sam"
+    assert extract_name("Hi! Call me Alex.") == "Alex"
+
+
+def test_extract_name_ignores_other_uses_of_call_me():
+    assert extract_name("Can you call me tomorrow?") is None
+    assert extract_name("call me later ok") is None
+    assert extract_name("Could you call me Alex?") is None
+    assert extract_name("I had a long day") is None
+
+
+def test_reflections_of_one_thread_build_on_each_other():
+    async def count_turns(ctx):
+        seen = ctx.reflection.get("turns", {}).get("n", 0)
+        await asyncio.sleep(0.01)
+        return ReflectionResult({"n": seen + 1})
+
+    async def run():
+        graph = FakeGraph()
+        graph.values["1"] = {"reflection": {"other": {"kept": True}}}
+        pipeline = ReflectionPipeline(graph, [("turns", count_turns)], concurrency=2)
+        stale = {"reflection": {}}
+        for _ in range(3):
+            pipeline.submit("1", stale)
+        pipeline.submit("2", stale)
+        await pipeline.drain()
+        return graph, pipeline
+
+    graph, pipeline = asyncio.run(run())
+    assert graph.values["1"]["reflection"] == {"other": {"kept": True}, "turns": {"n": 3}}
+    assert graph.values["2"]["reflection"] == {"turns": {"n": 1}}
+    gc.collect()
+    assert len(pipeline._locks) == len(pipeline._reflecting) == 0
+
+
+def test_shadow_review_samples_at_its_rate():
+    async def run(rate):
+        shadow = ShadowReviewer(rate, reviewer=FakeReviewer())
+        queued = [shadow.submit("1", sent()) for _ in range(5)]
+        await shadow.drain()
+        return queued, shadow.counts["sampled"]
+
+    assert asyncio.run(run(0.0)) == ([False] * 5, 0)
+    assert asyncio.run(run(1.0)) == ([True] * 5, 5)
+
+
+def test_shadow_review_drops_replies_when_the_queue_is_full():
+    async def run():
+        shadow = ShadowReviewer(1.0, queue_size=2, reviewer=FakeReviewer())
+        queued = [shadow.submit("1", sent()) for _ in range(3)]
+        await shadow.drain()
+        return queued, shadow.counts
+
+    queued, counts = asyncio.run(run())
+    assert queued == [True, True, False]
+    assert counts["sampled"] == 2 and counts["dropped"] == 1
+
+
+def test_shadow_review_flushes_a_partial_batch_after_max_wait():
+    reviewer = FakeReviewer()
+
+    async def run():
+        shadow = ShadowReviewer(1.0, batch_size=8, max_wait_s=0.05, reviewer=reviewer)
+        shadow.submit("1", sent("a"))
+        shadow.submit("2", sent("b"))
+        await asyncio.sleep(0.3)
+        flushed = list(reviewer.batches)
+        await shadow.drain()
+        return flushed, shadow.report()
+
+    flushed, report = asyncio.run(run())
+    assert flushed == [("bestie", [("a", "re: a"), ("b", "re: b")])]
+    assert report["batches"] == 1 and report["reviewed"] == 1 and report["failed"] == 1
+
+
+def test_shadow_review_drain_reviews_what_is_queued_per_kind(tmp_path):
+    reviewer = FakeReviewer()
+    path = tmp_path / "reviews.jsonl"
+
+    async def run():
+        shadow = ShadowReviewer(1.0, max_wait_s=30.0, path=str(path), reviewer=reviewer)
+        shadow.submit("1", sent("a"))
+        shadow.submit("1", sent("b"))
+        shadow.submit("1", sent("c"))
+        shadow.submit("2", sent("d", mode="assistant"))
+        await asyncio.wait_for(shadow.drain(), 5)
+        return shadow.report()
+
+    report = asyncio.run(run())
+    assert [(kind, len(items)) for kind, items in reviewer.batches] == [("bestie", 3), ("assistant", 1)]
+    assert report["reviewed"] == 3 and report["failed"] == 1 and report["queued"] == 0
+    assert report["scores"]["bestie_drafter|ChatGroq:kimi|v1"] == {"n": 3, "C": 0.667, "E": 1.0, "overall": 0.833}
+    assert [json.loads(line)["chat_id"] for line in path.read_text().splitlines()] == ["1", "1", "2"]
+
+
+def test_shadow_review_counts_a_failed_batch():
+    async def run():
+        shadow = ShadowReviewer(1.0, reviewer=FakeReviewer(fail=True))
+        shadow.submit("1", sent())
+        shadow.submit("1", sent())
+        await shadow.drain()
+        return shadow.counts
+
+    counts = asyncio.run(run())
+    assert counts["failed"] == 2 and counts["reviewed"] == counts["batches"] == 0
+
+
+def test_review_drafts_maps_reviews_to_drafts_by_id(monkeypatch):
+    response = {"reviews": [{"id": 3, "C": 0.9, "A": "high", "R": 1, "E": 0.8},
+                            {"id": "one", "C": 0.1}, {"id": "1", "C": 0.5, "A": 0.5, "R": 0.5, "E": 0.5}, "bad"]}
+    routed = []
+
+    def llm(node, json_mode=False, **kwargs):
+        routed.append((node, json_mode))
+        return FakeListChatModel(responses=[json.dumps(response)])
+
+    monkeypatch.setattr(reviewer_module.router, "llm", llm)
+    items = [("hi", "hey!"), ("bye", "see ya"), ("ugh", "that sucks")]
+    assert reviewer_module.review_drafts("bestie", items) == [
+        {"C": 0.5, "A": 0.5, "R": 0.5, "E": 0.5}, {}, {"C": 0.9, "R": 1.0, "E": 0.8}]
+    assert routed == [("shadow_review", True)]
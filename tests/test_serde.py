@@ -0,0 +1,57 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from config.settings import settings
+from graph import serde
+from graph.serde import CODECS, DEFAULT_CODEC, CompressedSerializer, get_serializer
+
+CHECKPOINT = {
+    "messages": [HumanMessage(content="how was your day " * 40, id="h1"), AIMessage(content="pretty good " * 40, id="a1")],
+    "session": {"start_time": "2026-01-01T10:00:00", "context": {}},
+    "trackers": {"mood": {"valence": 0.25, "n": 3}},
+}
+
+
+@pytest.mark.parametrize("codec", ["none", *CODECS])
+def test_round_trip(codec):
+    compressed = CompressedSerializer(codec=codec, min_bytes=64)
+    type_, data = compressed.dumps_typed(CHECKPOINT)
+    plain_type, plain = JsonPlusSerializer().dumps_typed(CHECKPOINT)
+    if codec == "none":
+        assert (type_, data) == (plain_type, plain)
+    else:
+        assert type_ == f"{plain_type}+{codec}"
+        assert len(data) < len(plain)
+    assert compressed.loads_typed((type_, data)) == CHECKPOINT
+
+
+def test_small_payloads_are_stored_uncompressed():
+    compressed = CompressedSerializer(codec="zlib", min_bytes=1024)
+    assert compressed.dumps_typed({"turns": 1}) == JsonPlusSerializer().dumps_typed({"turns": 1})
+
+
+@pytest.mark.parametrize("codec", ["none", *CODECS])
+def test_untagged_and_other_codec_blobs_still_load(codec):
+    reader = CompressedSerializer(codec=codec)
+    assert reader.loads_typed(JsonPlusSerializer().dumps_typed(CHECKPOINT)) == CHECKPOINT
+    assert reader.loads_typed(CompressedSerializer(codec="zlib", min_bytes=0).dumps_typed(CHECKPOINT)) == CHECKPOINT
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        CompressedSerializer(codec="lz4")
+
+
+def test_default_codec_matches_the_settings_default():
+    expected = settings.model_fields["CHECKPOINT_COMPRESSION"].default
+    if expected not in CODECS:
+        pytest.skip("zstandard is not installed")
+    assert DEFAULT_CODEC == expected
+    assert CompressedSerializer().codec == expected
+
+
+def test_get_serializer_falls_back_to_zlib_without_zstandard(monkeypatch):
+    monkeypatch.setattr(settings, "CHECKPOINT_COMPRESSION", "zstd")
+    monkeypatch.setattr(serde, "zstandard", None)
+    assert get_serializer().codec == "zlib"
@@ -0,0 +1,134 @@
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from models import turn as turn_module
+from models.turn import TurnContext
+from prompts import registry as registry_module
+from prompts.registry import PromptRegistry
+from utils import tokens
+from utils.token_budget import DEFAULT_SECTION_BUDGET, TokenBudget, compact_json
+from utils.tokens import count_tokens
+
+BUDGETS = {"node": {"history": 60, "user_text": 10, "plan": 8}}
+
+
+def words(n, word="word"):
+    return " ".join([word] * n)
+
+
+def test_limits_fall_back_to_the_default():
+    budget = TokenBudget(BUDGETS)
+    assert budget.limit("node", "history") == 60
+    assert budget.limit("node", "documents") == DEFAULT_SECTION_BUDGET
+    assert budget.limit("other", "history") == DEFAULT_SECTION_BUDGET
+
+
+def test_text_and_json_are_truncated_to_the_budget():
+    budget = TokenBudget(BUDGETS)
+    assert budget.text("node", "user_text", "short") == "short"
+    long = words(100)
+    assert count_tokens(budget.text("node", "user_text", long)) <= 10 < count_tokens(long)
+    assert budget.json("node", "plan", {"a": 1}) == compact_json({"a": 1}) == '{"a":1}'
+    assert count_tokens(budget.json("node", "plan", {"steps": [words(20)]})) <= 8
+    assert budget.overflow_report() == {"node.plan": 1, "node.user_text": 1}
+
+
+def test_fit_messages_keeps_recent_messages_within_budget():
+    budget = TokenBudget(BUDGETS)
+    messages = [HumanMessage(content="hi"), AIMessage(content="hey, what's up?"), HumanMessage(content="not much")]
+    assert budget.fit_messages("node", messages) == messages
+    assert budget.fit_messages("node", messages, max_messages=2) == messages[-2:]
+    assert budget.overflow_report() == {}
+
+
+def test_fit_messages_drops_the_oldest_and_notes_it():
+    budget = TokenBudget(BUDGETS)
+    messages = [HumanMessage(content=f"{i} {words(19)}") for i in range(4)]
+    fitted = budget.fit_messages("node", messages)
+
+    kept = [m for m in fitted if not isinstance(m, SystemMessage)]
+    assert kept == messages[-len(kept):]
+    assert sum(count_tokens(m.content) for m in kept) <= 60
+    assert fitted[0] == SystemMessage(content=f"({len(messages) - len(kept)} earlier messages omitted)")
+    assert budget.overflow_report() == {"node.history": 1}
+
+
+def test_fit_messages_truncates_messages_over_half_the_budget():
+    budget = TokenBudget(BUDGETS)
+    essay = HumanMessage(content=words(200), id="essay")
+    fitted = budget.fit_messages("node", [HumanMessage(content="hi"), essay])
+
+    assert fitted[0].content == "hi"
+    assert fitted[1].id == "essay"
+    assert count_tokens(fitted[1].content) <= 30
+    assert essay.content == words(200)
+    assert budget.overflow_report() == {"node.message": 1}
+
+
+def test_fit_messages_summarizes_dropped_history():
+    summarized = []
+    budget = TokenBudget(BUDGETS, summarizer=lambda text: summarized.append(text) or "They talked about work.")
+    messages = [HumanMessage(content=f"{i} {words(19)}") for i in range(4)]
+    fitted = budget.fit_messages("node", messages)
+    assert fitted[0] == SystemMessage(content="They talked about work.")
+    assert summarized and summarized[0].startswith("Human: 0 word")
+
+    def failing(text):
+        raise RuntimeError("summarizer down")
+
+    fitted = TokenBudget(BUDGETS, summarizer=failing).fit_messages("node", messages)
+    assert fitted[0].content.endswith("earlier messages omitted)")
+
+
+def test_turn_context_budgets_only_the_nodes_that_read_it(monkeypatch):
+    budget = TokenBudget({"reader": {"history": 20, "user_text": 5}, "idle": {"history": 20, "user_text": 5}})
+    monkeypatch.setattr(turn_module, "budget", budget)
+    turn = TurnContext(user_text=words(50), messages=[HumanMessage(content=words(30, f"m{i}")) for i in range(3)])
+
+    assert count_tokens(turn.text_for("reader")) <= 5
+    assert turn.text_for("unbudgeted") == turn.user_text
+    history = turn.history_for("reader")
+    assert history.startswith("System: (")
+
+    report = budget.overflow_report()
+    assert report["reader.history"] == report["reader.user_text"] == 1
+    assert all(key.startswith("reader.") for key in report)
+
+    # Copies share the per-node caches, so a node is fitted once per turn
+    copy = turn.model_copy(update={"sensing_json": '{"intent":"vent"}'})
+    assert copy.history_for("reader") is history
+    assert copy.text_for("reader") == turn.text_for("reader")
+    assert budget.overflow_report() == report
+
+
+def test_token_counts_fall_back_when_the_encoding_cannot_load(monkeypatch):
+    tiktoken = pytest.importorskip("tiktoken")
+
+    def hanging(name):
+        time.sleep(10)
+
+    monkeypatch.setattr(tiktoken, "get_encoding", hanging)
+    monkeypatch.setattr(tokens, "ENCODING_LOAD_TIMEOUT_S", 0.1)
+    tokens._get_encoding.cache_clear()
+    try:
+        started = time.monotonic()
+        assert tokens.count_tokens("a" * 10) == 3
+        assert time.monotonic() - started < 2
+        assert tokens.truncate_tokens("x" * 400, 20).count("x") <= 20 * tokens.CHARS_PER_TOKEN
+    finally:
+        tokens._get_encoding.cache_clear()
+
+
+def test_prompt_registry_counts_tokens_only_when_used(tmp_path, monkeypatch):
+    counted = []
+    monkeypatch.setattr(registry_module, "count_tokens", lambda text: counted.append(text) or len(text.split()))
+    (tmp_path / "greet.md").write_text("Be kind.\n<!-- dynamic -->\nHi {name}")
+    prompts = PromptRegistry(str(tmp_path))
+    assert counted == []
+
+    prompts.render("greet.md", name="Sam")
+    assert prompts.token_report()["greet.md"] == {"static_tokens": 2, "renders": 1, "last_tokens": 4,
+                                                  "max_tokens": 4, "avg_tokens": 4}
+    assert counted.count("Be kind.") == 1
@@ -1,6 +1,5 @@
 """FastAPI application for Telegram webhook handler for Vee AI companion."""
 import logging
-import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
@@ -8,8 +7,17 @@ from telegram import Update
 from ui.telegram.client import TelegramClient
 from ui.telegram.handler import TelegramHandler
 from ui.telegram.config import TelegramSettings
+from llms.hedging import hedge_metrics
+from llms.router import router
+from utils.deadline import degradation_report
+from utils.experiments import experiment_report
+from utils.json_stream import parse_report
+from layers.reflect.strategy_adjuster import get_policy
+from prompts.registry import registry
+from utils.token_budget import budget
 import aiosqlite
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from graph.serde import get_serializer
 from pathlib import Path
 
 # Set up logging
@@ -27,17 +35,18 @@ settings = TelegramSettings()
 async def lifespan(app: FastAPI):
     """Handle startup and shutdown events, including checkpointer lifecycle."""
     # Use an absolute path to ensure the database file is found
-    db_path = Path(__file__).parent.parent.parent / "data" / "vee_short_memory.db"
+    db_path = Path(settings.CHECKPOINT_DB_PATH or Path(__file__).parent.parent.parent / "data" / "vee_short_memory.db")
     db_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Connect to the database directly
     conn = await aiosqlite.connect(db_path.resolve())
     try:
-        checkpointer = AsyncSqliteSaver(conn=conn)
+        # Checkpoint blobs are compressed (CHECKPOINT_COMPRESSION); existing uncompressed ones still load
+        checkpointer = AsyncSqliteSaver(conn=conn, serde=get_serializer())
         logger.info("Database connection opened.")
 
         # Initialize clients and handlers
-        telegram_client = TelegramClient(settings.TELEGRAM_BOT_TOKEN)
+        telegram_client = TelegramClient(settings.TELEGRAM_BOT_TOKEN, settings.TELEGRAM_API_BASE_URL)
         telegram_handler = TelegramHandler(telegram_client, checkpointer)
 
         # Store handler in app state to make it accessible in routes
@@ -56,7 +65,10 @@ async def lifespan(app: FastAPI):
         yield
 
     finally:
-        # Shutdown: clean up webhook and database connection
+        # Shutdown: finish queued reflections, clean up webhook and database connection
+        await telegram_handler.reflection.drain()
+        await telegram_handler.shadow_review.drain()
+        get_policy().save()
         await telegram_client.delete_webhook()
         logger.info("Webhook deleted successfully")
         await conn.close()
@@ -102,6 +114,22 @@ async def telegram_webhook(request: Request):
         logger.error(f"Error processing webhook: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+async def metrics():
+    """LLM hedging counters, per-model latency quantiles, routing health, deadline degradations, reflection, the strategy policy, A/B experiments, shadow reviews, structured-output parse outcomes per node, rendered prompt tokens per template and token budget overflows."""
+    return {
+        **hedge_metrics(),
+        "routing": router.report(),
+        "deadlines": degradation_report(),
+        "reflection": app.state.telegram_handler.reflection.report(),
+        "strategy_policy": get_policy().report(),
+        "experiments": experiment_report(),
+        "shadow_review": app.state.telegram_handler.shadow_review.report(),
+        "parse": parse_report(),
+        "prompts": registry.token_report(),
+        "token_budget": budget.overflow_report(),
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -1,11 +1,19 @@
 """Configuration for Telegram integration."""
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
 
 class TelegramSettings(BaseSettings):
-    """Settings for Telegram bot integration."""
+    """Settings for Telegram bot integration.
+
+    Attributes:
+        TELEGRAM_API_BASE_URL: Override the Telegram Bot API base URL, e.g. a fake API for load tests.
+        CHECKPOINT_DB_PATH: SQLite checkpoint DB; defaults to data/vee_short_memory.db.
+    """
     TELEGRAM_BOT_TOKEN: str
     WEBHOOK_URL: str
+    TELEGRAM_API_BASE_URL: Optional[str] = None
+    CHECKPOINT_DB_PATH: Optional[str] = None
     
     model_config = ConfigDict(env_file='.env', extra='allow')
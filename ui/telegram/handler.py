@@ -1,12 +1,19 @@
 import asyncio
 import logging
 import json
+import time
 from datetime import datetime
 from telegram import Update
 from telegram.ext import ContextTypes
 from langchain_core.messages import AIMessage, HumanMessage
 from graph.build_graph import build_graph
 from ui.telegram.client import TelegramClient
+from config.settings import settings
+from utils import deadline
+from layers.reflect.pipeline import ReflectionPipeline, default_jobs
+from layers.reflect.shadow_review import shadow_reviewer
+from utils.experiments import experiment_stats
+from utils.formatter import to_telegram_messages
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +31,38 @@ class TelegramHandler:
     def __init__(self, telegram_client: TelegramClient, checkpointer):
         self.telegram_client = telegram_client
         self.graph = build_graph(checkpointer)
+        self.reflection = ReflectionPipeline(
+            self.graph,
+            default_jobs(),
+            concurrency=settings.REFLECT_CONCURRENCY,
+            retries=settings.REFLECT_MAX_RETRIES,
+            queue_size=settings.REFLECT_QUEUE_SIZE,
+        )
+        self.shadow_review = shadow_reviewer()
+
+    async def _send_markdown(self, chat_id, text: str) -> None:
+        """Sends a markdown reply as Telegram HTML, split into as many messages as Telegram's limit needs."""
+        for message in to_telegram_messages(text):
+            await self.telegram_client.send_message(chat_id, message, parse_mode="HTML")
+
+    async def _run_graph(self, input_data: dict, chat_id, streamed: list) -> dict:
+        """Runs the graph and returns its final state, including the ephemeral channels the checkpoint leaves out.
+
+        With IR_STREAM_SECTIONS, sends answer sections as they are written and adds them to `streamed`.
+        """
+        final_state = {}
+        async for namespace, mode, chunk in self.graph.astream(
+            input_data,
+            config={"configurable": {"thread_id": str(chat_id)}},
+            stream_mode=["custom", "values"],
+            subgraphs=True,
+        ):
+            if mode == "values" and not namespace:
+                final_state = chunk
+            elif mode == "custom" and settings.IR_STREAM_SECTIONS and "ir_section" in chunk:
+                await self._send_markdown(chat_id, chunk["ir_section"]["text"])
+                streamed.append(chunk["ir_section"]["text"])
+        return final_state
 
     async def handle_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if update.message is None:
@@ -31,15 +70,46 @@ class TelegramHandler:
 
         user_message = update.message.text
         chat_id = update.message.chat_id
+        user_name = update.message.from_user.first_name if update.message.from_user else None
 
         if user_message == "/start":
             welcome_message = "Hey! 👋 I'm Vee, your bestie. I'm here to support you emotionally and give you any information you want about anything in this world, all in the easiest way possible. 😊"
             await self.telegram_client.send_message(chat_id, welcome_message)
             return
 
-        # Start typing indicator
+        # Start the turn's reply deadline and the typing indicator
+        started = time.monotonic()
+        turn_deadline = deadline.start_turn()
         typing_task = asyncio.create_task(keep_typing(self.telegram_client, chat_id))
 
+        # Turns of a chat run one at a time, and reflection writes wait for them
+        streamed = []
+        async with self.reflection.thread_lock(chat_id):
+            output_state = await self._run_turn(user_message, user_name, chat_id, turn_deadline, typing_task, streamed)
+        if output_state is None:
+            return
+
+        # Streamed answers have already been sent section by section
+        final_draft = output_state.get("draft") if not streamed else None
+        if final_draft:
+            if isinstance(final_draft, list):
+                for chunk in final_draft:
+                    await self._send_markdown(chat_id, chunk)
+            elif isinstance(final_draft, str):
+                await self._send_markdown(chat_id, final_draft)
+
+        # Reply latency per bestie pipeline, for the BESTIE_PIPELINE A/B comparison
+        if output_state.get("mode") == "bestie" and output_state.get("bestie_variant"):
+            experiment_stats.record_latency("bestie_pipeline", output_state["bestie_variant"], time.monotonic() - started)
+
+        # Learn from the turn after the reply is out
+        if settings.REFLECTION:
+            self.reflection.submit(chat_id, output_state)
+        # Sampled quality review, also after the reply is out
+        self.shadow_review.submit(chat_id, output_state)
+
+    async def _run_turn(self, user_message: str, user_name, chat_id, turn_deadline: float, typing_task: asyncio.Task, streamed: list):
+        """Runs the graph for one user message; returns its final state, or None if a fallback was sent."""
         try:
             logger.info(f"[State Debug] Retrieving state for chat {chat_id}...")
             current_state = await self.graph.aget_state(config={"configurable": {"thread_id": str(chat_id)}})
@@ -50,11 +120,11 @@ class TelegramHandler:
             else:
                 logger.info(f"[State Debug] No existing state found, initializing new state")
             
-            # Get the current state's values, or an empty dict if no state exists
-            input_data = current_state.values if current_state and hasattr(current_state, 'values') else {}
+            # The checkpoint already holds the durable channels, so an existing chat only sends the new message
+            input_data = {}
 
             # If it's a new conversation, initialize the required structure
-            if not input_data:
+            if not (current_state and current_state.values):
                 logger.info(f"[State Debug] Initializing new state for chat {chat_id}")
                 input_data = {
                     "messages": [],
@@ -67,27 +137,29 @@ class TelegramHandler:
                         "context": {}
                     },
                     "user": {
-                        "name": None,
+                        "name": user_name,
                         "phone_number": None,
                         "chat_id": str(chat_id)
                     }
                 }
-            else:
-                logger.info(f"[State Debug] Loaded existing state for chat {chat_id}: {input_data}")
 
-            # Append the new user message to the history
-            messages = input_data.get("messages", [])
-            messages.append(HumanMessage(content=user_message))
-            input_data["messages"] = messages
+            # Append the new user message to the history (the messages channel appends)
+            input_data["messages"] = [HumanMessage(content=user_message)]
             logger.info(f"[State Debug] Final input state before streaming for chat {chat_id}: {json.dumps(input_data, indent=2, default=str)}")
 
-            # Stream through LangGraph
-            async for chunk in self.graph.astream(
-                input_data,
-                config={"configurable": {"thread_id": str(chat_id)}},
-                stream_mode="messages",
-            ):
-                pass
+            # Stream through LangGraph, bounded by the turn deadline
+            input_data["deadline"] = turn_deadline
+            try:
+                final_state = await asyncio.wait_for(
+                    self._run_graph(input_data, chat_id, streamed),
+                    timeout=deadline.remaining() + settings.TURN_DEADLINE_GRACE_S,
+                )
+            except asyncio.TimeoutError:
+                deadline.record_degradation("turn_timeout")
+                logger.warning(f"Turn for chat {chat_id} missed its deadline, sending fallback reply")
+                if not streamed:
+                    await self.telegram_client.send_message(chat_id, deadline.FALLBACK_REPLY)
+                return None
 
         finally:
             typing_task.cancel()
@@ -96,13 +168,4 @@ class TelegramHandler:
             except asyncio.CancelledError:
                 pass
 
-        # Get final response from persisted state
-        output_state = await self.graph.aget_state(config={"configurable": {"thread_id": str(chat_id)}})
-        final_draft = output_state.values.get("draft")
-
-        if final_draft:
-            if isinstance(final_draft, list):
-                for chunk in final_draft:
-                    await self.telegram_client.send_message(chat_id, chunk, parse_mode="HTML")
-            elif isinstance(final_draft, str):
-                await self.telegram_client.send_message(chat_id, final_draft, parse_mode="HTML")
+        return final_state
@@ -0,0 +1,111 @@
+"""Per-turn deadlines and degradation accounting.
+
+The Telegram handler starts every turn with a deadline (`TURN_DEADLINE_S` from
+now). It is carried both in the graph state (`state["deadline"]`) and in a
+context variable, so nodes and LLM wrappers can check the remaining budget
+and degrade instead of stalling: skip the bestie planner, drop from deep to
+quick IR, or reply with `FALLBACK_REPLY`.
+"""
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_REPLY = "Sorry, I'm a bit slow right now 😅 Give me a sec and send that again?"
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("turn_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the turn's deadline has passed before or during a call."""
+
+
+def start_turn(seconds: Optional[float] = None) -> Optional[float]:
+    """Sets the deadline for the current turn and returns it as a UNIX timestamp, or None when TURN_DEADLINE_S is unset."""
+    seconds = settings.TURN_DEADLINE_S if seconds is None else seconds
+    deadline = time.time() + seconds if seconds is not None else None
+    _deadline.set(deadline)
+    _stats.record_turn()
+    return deadline
+
+
+@contextmanager
+def scope(state: Mapping[str, Any]) -> Iterator[None]:
+    """Makes the state's deadline visible to LLM wrappers called inside the block."""
+    token = _deadline.set(get_deadline(state))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def get_deadline(state: Optional[Mapping[str, Any]] = None) -> Optional[float]:
+    """Returns the turn deadline from the state, or from the current context."""
+    if state is not None and state.get("deadline"):
+        return state["deadline"]
+    return _deadline.get()
+
+
+def remaining(state: Optional[Mapping[str, Any]] = None) -> float:
+    """Seconds left before the turn's deadline; infinite when no deadline is set."""
+    deadline = get_deadline(state)
+    if deadline is None:
+        return math.inf
+    return deadline - time.time()
+
+
+def check(state: Optional[Mapping[str, Any]] = None) -> float:
+    """Returns the seconds left, raising `DeadlineExceeded` if there are none."""
+    left = remaining(state)
+    if left <= 0:
+        raise DeadlineExceeded(f"Turn deadline passed {-left:.2f}s ago")
+    return left
+
+
+class DegradationStats:
+    """Counts turns and the ways they were degraded to meet the deadline."""
+
+    def __init__(self):
+        self._turns = 0
+        self._degradations: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record_turn(self) -> None:
+        with self._lock:
+            self._turns += 1
+
+    def record(self, kind: str) -> None:
+        with self._lock:
+            self._degradations[kind] += 1
+        logger.warning(f"Degrading turn to meet deadline: {kind}")
+
+    def report(self) -> Dict[str, Any]:
+        """Returns the turn count, degradation counts by kind and the overall degraded fraction."""
+        with self._lock:
+            degraded = sum(self._degradations.values())
+            return {
+                "turns": self._turns,
+                "degradations": dict(self._degradations),
+                "degraded_rate": degraded / self._turns if self._turns else 0.0,
+            }
+
+
+_stats = DegradationStats()
+
+
+def record_degradation(kind: str) -> None:
+    """Records that a turn was degraded, e.g. "skip_planner", "quick_ir" or "fallback"."""
+    _stats.record(kind)
+
+
+def degradation_report() -> Dict[str, Any]:
+    """Turn and degradation counts, for the metrics endpoint."""
+    return _stats.report()
@@ -0,0 +1,58 @@
+"""Deterministic A/B assignment and per-variant metrics for pipeline experiments.
+
+Chats are split between variants by a stable hash of the chat id, so a user
+stays in one arm across turns and restarts. Each variant keeps its recent turn
+latencies (for p50/p90/p99) and the running mean of the reflection impact
+scores of its replies, as a quality signal.
+"""
+import threading
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from llms.latency import LatencyTracker
+
+
+def in_treatment(experiment: str, unit_id: Optional[str], share: float) -> bool:
+    """Whether a unit (e.g. a chat id) falls in the treatment arm, `share` being its fraction (0..1)."""
+    if unit_id is None:
+        return False
+    bucket = zlib.crc32(f"{experiment}:{unit_id}".encode("utf-8")) % 10_000
+    return bucket < share * 10_000
+
+
+class ExperimentStats:
+    """Turn latency quantiles and mean quality score per (experiment, variant)."""
+
+    def __init__(self, window: int = 1000):
+        self._latency = LatencyTracker(window)
+        self._scores: Dict[Tuple[str, str], Dict[str, float]] = defaultdict(lambda: {"n": 0, "mean": 0.0})
+        self._lock = threading.Lock()
+
+    def record_latency(self, experiment: str, variant: str, seconds: float) -> None:
+        self._latency.record(f"{experiment}:{variant}", seconds)
+
+    def record_score(self, experiment: str, variant: str, score: float) -> None:
+        with self._lock:
+            stats = self._scores[(experiment, variant)]
+            stats["n"] += 1
+            stats["mean"] += (score - stats["mean"]) / stats["n"]
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Returns {experiment: {variant: {"latency": {...}, "quality": {...}}}}."""
+        report: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        for key, latency in self._latency.snapshot().items():
+            experiment, variant = key.split(":", 1)
+            report[experiment].setdefault(variant, {})["latency"] = latency
+        with self._lock:
+            for (experiment, variant), stats in self._scores.items():
+                report[experiment].setdefault(variant, {})["quality"] = {"n": stats["n"], "mean_score": round(stats["mean"], 3)}
+        return dict(report)
+
+
+experiment_stats = ExperimentStats()
+
+
+def experiment_report() -> Dict[str, Dict[str, Any]]:
+    """Per-variant latency and quality of every experiment, for the metrics endpoint."""
+    return experiment_stats.report()
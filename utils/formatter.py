@@ -1,11 +1,260 @@
+"""Markdown to Telegram HTML.
+
+`TelegramStreamFormatter` converts the markdown our prompts ask for (bold,
+italics, strikethrough, inline code, links, `#` headers, bullet lists and
+fenced code blocks) into the HTML subset the Bot API accepts, incrementally:
+deltas are buffered until a line is complete, each complete line is converted
+once, and text is HTML-escaped, so the cost per delta is proportional to the
+delta. Inline markup is closed at the end of each line, so a stray `*` can't
+swallow the rest of the answer.
+
+Output is split into messages within Telegram's length limit, preferably at
+line boundaries. A message never ends inside a tag or an entity: tags still
+open at a split are closed and reopened at the start of the next message, so
+every message is valid, balanced HTML on its own.
+"""
+import html
 import re
+import sys
+from typing import List, Tuple
 
-def format_for_telegram(text: str) -> str:
-    """Converts simple markdown to Telegram-compatible HTML."""
-    # Convert **bold** to <b>bold</b>
-    text = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', text)
+TELEGRAM_MESSAGE_LIMIT = 4096
+# Long words (URLs, code) are cut into pieces of at most this many characters
+_MAX_WORD = 500
+
+_FENCE_RE = re.compile(r"^\s*```")
+_HEADER_RE = re.compile(r"^\s{0,3}#{1,6}\s+(.*?)[\s#]*$")
+_BULLET_RE = re.compile(r"^(\s*)[*+-]\s+(.*)$")
+_LINK_RE = re.compile(r"\[([^\]\n]+)\]\(\s*((?:https?|tg|mailto):[^)\s]+)\s*\)")
+_WORD_RE = re.compile(r"\s+|\S+")
+
+# ("text", escaped html) | ("open", tag, opening html) | ("close", tag) | ("toggle", tag, marker)
+Token = Tuple[str, ...]
+
+
+def _units(text: str) -> int:
+    """Length as Telegram counts it (UTF-16 code units)."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _text(text: str) -> List[Token]:
+    """Escaped text tokens, one per word or run of whitespace."""
+    tokens = []
+    for word in _WORD_RE.findall(text):
+        for i in range(0, len(word), _MAX_WORD):
+            tokens.append(("text", html.escape(word[i:i + _MAX_WORD], quote=False)))
+    return tokens
+
+
+def _inline(line: str, links: bool = True) -> List[Token]:
+    """Tokens for one line of inline markdown."""
+    tokens: List[Token] = []
+    plain_from = i = 0
+    n = len(line)
+
+    def plain(upto: int) -> None:
+        if upto > plain_from:
+            tokens.extend(_text(line[plain_from:upto]))
+
+    while i < n:
+        c = line[i]
+        if c == "`":
+            end = line.find("`", i + 1)
+            if end > i + 1:
+                plain(i)
+                tokens.append(("open", "code", "<code>"))
+                tokens.extend(_text(line[i + 1:end]))
+                tokens.append(("close", "code"))
+                i = plain_from = end + 1
+                continue
+        elif c == "[" and links:
+            match = _LINK_RE.match(line, i)
+            if match:
+                plain(i)
+                tokens.append(("open", "a", f'<a href="{html.escape(match.group(2), quote=True)}">'))
+                tokens.extend(_inline(match.group(1), links=False))
+                tokens.append(("close", "a"))
+                i = plain_from = match.end()
+                continue
+        elif line.startswith("**", i) or line.startswith("~~", i):
+            plain(i)
+            tokens.append(("toggle", "b" if c == "*" else "s", line[i:i + 2]))
+            i = plain_from = i + 2
+            continue
+        elif c == "*":
+            # Emphasis only when touching a word on one side; "2 * 3" stays literal
+            before = line[i - 1] if i else " "
+            after = line[i + 1] if i + 1 < n else " "
+            if not (before.isspace() and after.isspace()):
+                plain(i)
+                tokens.append(("toggle", "i", c))
+                i = plain_from = i + 1
+                continue
+        i += 1
+    plain(n)
+    # Like CommonMark, a marker without a partner on the line stays literal text
+    for tag in ("b", "i", "s"):
+        toggles = [j for j, token in enumerate(tokens) if token[0] == "toggle" and token[1] == tag]
+        if len(toggles) % 2:
+            tokens[toggles[-1]] = ("text", tokens[toggles[-1]][2])
+    return tokens
+
+
+class TelegramStreamFormatter:
+    """Converts streamed markdown into Telegram HTML messages.
+
+    Args:
+        limit: Maximum message length, in UTF-16 code units.
+
+    Example:
+        formatter = TelegramStreamFormatter()
+        for delta in deltas:
+            for message in formatter.feed(delta):
+                send(message)       # finished, final messages
+            edit(formatter.current())  # balanced preview of the message in progress
+        for message in formatter.close():
+            send(message)
+    """
+
+    def __init__(self, limit: int = TELEGRAM_MESSAGE_LIMIT):
+        self.limit = limit
+        self._line = ""
+        self._finished: List[str] = []
+        self._parts: List[str] = []
+        self._size = 0
+        self._visible = False
+        self._stack: List[Tuple[str, str]] = []  # (tag, opening html), outermost first
+        self._in_pre = False
 
-    # Convert [links](url) to <a href="url">links</a>
-    text = re.sub(r'\[(.*?)\]\((.*?)\)', r'<a href="\2">\1</a>', text)
+    def feed(self, delta: str) -> List[str]:
+        """Adds a chunk of markdown; returns the messages it completed."""
+        self._line += delta
+        if "\n" in delta:
+            *lines, self._line = self._line.split("\n")
+            for line in lines:
+                self._write_line(line, newline=True)
+        return self._take_finished()
 
-    return text
+    def current(self) -> str:
+        """Balanced HTML of the message in progress, including the unfinished line."""
+        saved = (self._finished, list(self._parts), self._size, self._visible, list(self._stack), self._in_pre)
+        self._finished = []
+        try:
+            self._write_line(self._line, newline=False)
+            return self._render()
+        finally:
+            self._finished, self._parts, self._size, self._visible, self._stack, self._in_pre = saved
+
+    def close(self) -> List[str]:
+        """Flushes the rest of the input; returns the remaining messages."""
+        if self._line:
+            self._write_line(self._line, newline=False)
+            self._line = ""
+        if self._visible:
+            self._flush()
+        return self._take_finished()
+
+    def _take_finished(self) -> List[str]:
+        finished, self._finished = self._finished, []
+        return finished
+
+    def _line_tokens(self, line: str) -> List[Token]:
+        if _FENCE_RE.match(line):
+            self._in_pre = not self._in_pre
+            return [("open", "pre", "<pre>")] if self._in_pre else [("close", "pre")]
+        if self._in_pre:
+            return _text(line)
+        header = _HEADER_RE.match(line)
+        if header:
+            return [("open", "b", "<b>"), *_inline(header.group(1).replace("**", "")), ("close", "b")]
+        bullet = _BULLET_RE.match(line)
+        if bullet:
+            return [("text", f"{bullet.group(1)}• "), *_inline(bullet.group(2))]
+        return _inline(line)
+
+    def _write_line(self, line: str, newline: bool) -> None:
+        tokens = self._line_tokens(line.rstrip("\r"))
+        # Start a new message rather than split a line of up to half a message
+        size = sum(_units(t[2] if t[0] == "open" else t[1]) for t in tokens if t[0] in ("text", "open"))
+        if self._visible and size <= self.limit // 2 and self._size + size + self._closing_size() > self.limit:
+            self._flush()
+        for token in tokens:
+            self._apply(token)
+        # Links and code spans are always closed on their line; this only guards the invariant
+        for tag, _ in reversed(self._stack):
+            if tag != "pre":
+                self._close(tag)
+        if newline:
+            self._apply(("text", "\n"))
+
+    def _apply(self, token: Token) -> None:
+        kind = token[0]
+        if kind == "text":
+            text = token[1]
+            if self._over(_units(text)):
+                if text.isspace():
+                    return
+                self._flush()
+            self._append(text)
+            self._visible = self._visible or not text.isspace()
+        elif kind == "close" or (kind == "toggle" and any(tag == token[1] for tag, _ in self._stack)):
+            self._close(token[1])
+            # Tags reopened inside the closed one may leave too little room for their closing tags
+            if self._over(0):
+                self._flush()
+        else:
+            tag, opening = token[1], token[2] if kind == "open" else f"<{token[1]}>"
+            # Room for the tag, its closing tag and some text, or it goes to the next message
+            if self._over(_units(opening) + len(tag) + 4):
+                self._flush()
+            self._open(tag, opening)
+
+    def _over(self, extra: int) -> bool:
+        """Whether `extra` more units would push a message with visible text past the limit."""
+        return self._visible and self._size + extra + self._closing_size() > self.limit
+
+    def _append(self, text: str) -> None:
+        self._parts.append(text)
+        self._size += _units(text)
+
+    def _open(self, tag: str, opening: str) -> None:
+        self._append(opening)
+        self._stack.append((tag, opening))
+
+    def _close(self, tag: str) -> None:
+        """Closes `tag`, closing and reopening any tags opened inside it to keep the nesting valid."""
+        index = next((i for i in range(len(self._stack) - 1, -1, -1) if self._stack[i][0] == tag), None)
+        if index is None:
+            return
+        inner = self._stack[index + 1:]
+        for inner_tag, _ in reversed(inner):
+            self._append(f"</{inner_tag}>")
+        self._append(f"</{tag}>")
+        del self._stack[index:]
+        for inner_tag, opening in inner:
+            self._open(inner_tag, opening)
+
+    def _closing_size(self) -> int:
+        return sum(len(tag) + 3 for tag, _ in self._stack)
+
+    def _render(self) -> str:
+        return "".join(self._parts).strip() + "".join(f"</{tag}>" for tag, _ in reversed(self._stack))
+
+    def _flush(self) -> None:
+        """Ends the current message and starts the next one with the same tags open."""
+        self._finished.append(self._render())
+        self._parts, self._size, self._visible = [], 0, False
+        stack, self._stack = self._stack, []
+        for tag, opening in stack:
+            self._open(tag, opening)
+
+
+def to_telegram_messages(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """Converts a complete markdown text into Telegram HTML messages within `limit`."""
+    formatter = TelegramStreamFormatter(limit)
+    return formatter.feed(text) + formatter.close()
+
+
+def format_for_telegram(text: str) -> str:
+    """Converts markdown to Telegram-compatible HTML as one string, without splitting."""
+    return "".join(to_telegram_messages(text, sys.maxsize))
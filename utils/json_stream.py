@@ -0,0 +1,194 @@
+"""Tolerant, incremental JSON parsing for structured LLM outputs.
+
+`StreamingJSONParser` scans output as it streams in, each character once. It
+skips leading prose and code fences up to the first `{` or `[`, tracks
+strings and nesting, and ignores anything after the value closes. Each
+top-level field of an object is decoded as soon as it is complete, so a
+caller can act on e.g. `risk_level` while the rest is still being generated.
+
+`parse_json` and `parse_model` parse a complete output with the same
+tolerance (plus trailing commas, and salvaging the complete fields of a
+truncated object), validate it with pydantic and count the outcome per node
+as "ok", "repaired" or "failed" for the metrics endpoint.
+"""
+import json
+import re
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Type, TypeVar
+
+from pydantic import TypeAdapter, ValidationError
+
+T = TypeVar("T")
+_TRAILING_COMMA_RE = re.compile(r",(\s*[}\]])")
+
+
+class JSONParseError(ValueError):
+    """Raised when an output holds no usable JSON value, or it does not validate."""
+
+
+class StreamingJSONParser:
+    """Incremental scanner for one JSON value embedded in LLM output.
+
+    Args:
+        on_field: Called with (key, value) for each top-level field of an object as soon as it is complete.
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None):
+        self.on_field = on_field
+        self.fields: Dict[str, Any] = {}
+        self._buffer = ""
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start = 0
+
+    @property
+    def done(self) -> bool:
+        """Whether the top-level value has closed."""
+        return self._end is not None
+
+    def feed(self, delta: str) -> Dict[str, Any]:
+        """Scans a chunk of output; returns the top-level fields it completed."""
+        offset = len(self._buffer)
+        self._buffer += delta
+        completed: Dict[str, Any] = {}
+        if self.done:
+            return completed
+        for i, c in enumerate(delta, offset):
+            if self._start is None:
+                if c in "{[":
+                    self._start, self._depth, self._member_start = i, 1, i + 1
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif c == "\\":
+                    self._escaped = True
+                elif c == '"':
+                    self._in_string = False
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._member(i, completed)
+                    self._end = i + 1
+                    break
+            elif c == "," and self._depth == 1:
+                self._member(i, completed)
+                self._member_start = i + 1
+        return completed
+
+    def _member(self, end: int, completed: Dict[str, Any]) -> None:
+        """Decodes the top-level `"key": value` member that ends at `end`."""
+        if self._buffer[self._start] != "{":
+            return
+        member = self._buffer[self._member_start:end].strip()
+        if not member:
+            return
+        try:
+            field = json.loads("{" + member + "}")
+        except ValueError:
+            return
+        for key, value in field.items():
+            self.fields[key] = completed[key] = value
+            if self.on_field is not None:
+                self.on_field(key, value)
+
+    def value(self) -> Tuple[Any, bool]:
+        """Returns (value, repaired): the parsed value and whether tolerance beyond plain `json.loads` was needed."""
+        if self._start is None:
+            raise JSONParseError("No JSON value in output")
+        if self.done:
+            candidate = self._buffer[self._start:self._end]
+            repaired = bool(self._buffer[:self._start].strip() or self._buffer[self._end:].strip())
+            try:
+                return json.loads(candidate), repaired
+            except ValueError:
+                try:
+                    return json.loads(_TRAILING_COMMA_RE.sub(r"\1", candidate)), True
+                except ValueError:
+                    pass
+        if self.fields:
+            # Truncated or damaged object: keep the fields that did parse
+            return dict(self.fields), True
+        raise JSONParseError(f"Could not parse JSON output: {self._buffer[:200]!r}")
+
+
+class ParseStats:
+    """Parse outcomes ("ok", "repaired", "failed") per node."""
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {"ok": 0, "repaired": 0, "failed": 0})
+        self._lock = threading.Lock()
+
+    def record(self, node: str, outcome: str) -> None:
+        with self._lock:
+            self._counts[node][outcome] += 1
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Counts and failure rate per node."""
+        with self._lock:
+            return {
+                node: {**counts, "failure_rate": round(counts["failed"] / max(sum(counts.values()), 1), 3)}
+                for node, counts in self._counts.items()
+            }
+
+
+parse_stats = ParseStats()
+
+
+def parse_report() -> Dict[str, Dict[str, Any]]:
+    """Parse outcomes per node, for the metrics endpoint."""
+    return parse_stats.report()
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Type[T]) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def _validated(parser: StreamingJSONParser, model: Optional[Type[T]], node: str) -> Any:
+    try:
+        value, repaired = parser.value()
+        if model is not None:
+            value = _adapter(model).validate_python(value)
+    except (JSONParseError, ValidationError) as e:
+        parse_stats.record(node, "failed")
+        raise JSONParseError(f"{node}: {e}") from e
+    parse_stats.record(node, "repaired" if repaired else "ok")
+    return value
+
+
+def parse_json(text: str, node: str) -> Any:
+    """Parses the JSON value in an LLM output, tolerating fences and surrounding text."""
+    parser = StreamingJSONParser()
+    parser.feed(text)
+    return _validated(parser, None, node)
+
+
+def parse_model(text: str, model: Type[T], node: str) -> T:
+    """Parses an LLM output and validates it as `model` (a pydantic model or TypedDict)."""
+    parser = StreamingJSONParser()
+    parser.feed(text)
+    return _validated(parser, model, node)
+
+
+def parse_stream(chunks: Iterable[str], model: Optional[Type[T]], node: str,
+                 on_field: Optional[Callable[[str, Any], None]] = None) -> T:
+    """Parses a streamed output chunk by chunk, calling `on_field` as top-level fields complete.
+
+    Stops reading once the value closes, so trailing prose is never waited for.
+    """
+    parser = StreamingJSONParser(on_field)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    return _validated(parser, model, node)
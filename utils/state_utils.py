@@ -0,0 +1,91 @@
+"""Helpers for building and reading per-turn state."""
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from layers.perceive.engagement_tracker import EngagementTracker
+from layers.perceive.mood_tracker import MoodTracker
+from llms.latency import model_key
+from models.turn import TurnContext
+from prompts.registry import registry
+from utils.token_budget import compact_json
+from utils.tokens import count_tokens
+
+# Most recent messages any node's history is fitted from
+HISTORY_MESSAGES = 5
+
+
+def to_role_dicts(messages: Sequence[BaseMessage]) -> List[Dict[str, str]]:
+    """Formats human/AI messages as role/content dicts for LLM prompts."""
+    formatted = []
+    for m in messages:
+        if isinstance(m, HumanMessage):
+            formatted.append({"role": "user", "content": m.content})
+        elif isinstance(m, AIMessage):
+            formatted.append({"role": "assistant", "content": m.content})
+    return formatted
+
+
+def build_turn_context(messages: Sequence[BaseMessage], user_text: str, now: Optional[datetime] = None) -> TurnContext:
+    """Builds the turn context; per-node histories and user texts are budgeted when a node first reads them."""
+    now = now or datetime.now()
+    return TurnContext(
+        user_text=user_text,
+        messages=list(messages[-HISTORY_MESSAGES:]),
+        token_counts={"user_text": count_tokens(user_text)},
+        started_at=now.isoformat(),
+        current_time=now.strftime("%I:%M %p"),
+        current_date=now.strftime("%Y-%m-%d"),
+        current_day=now.strftime("%A"),
+    )
+
+
+def with_sensing(turn: TurnContext, sensing: Dict[str, Any]) -> TurnContext:
+    """Returns a copy of the turn context carrying the compact sensing JSON."""
+    sensing_json = compact_json(sensing)
+    token_counts = {**turn.token_counts, "sensing": count_tokens(sensing_json)}
+    return turn.model_copy(update={"sensing_json": sensing_json, "token_counts": token_counts})
+
+
+def get_turn(state: Dict[str, Any]) -> TurnContext:
+    """Returns the state's turn context, building it on the fly if ingest did not run."""
+    turn = state.get("turn")
+    if isinstance(turn, TurnContext):
+        return turn
+    if isinstance(turn, dict):
+        return TurnContext(**turn)
+    return build_turn_context(state.get("messages", []), state.get("last_user_text") or "")
+
+
+def update_trackers(trackers: Optional[Dict[str, Any]], text: str, now: Optional[float] = None) -> Dict[str, Any]:
+    """Folds a user message into the mood and engagement trackers kept in state."""
+    trackers = trackers or {}
+    now = now or time.time()
+    return {
+        **trackers,
+        "mood": MoodTracker.from_state(trackers.get("mood")).update(text, now).to_state(),
+        "engagement": EngagementTracker.from_state(trackers.get("engagement")).user_message(text, now).to_state(),
+    }
+
+
+def record_reply(trackers: Optional[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, Any]:
+    """Marks the time of our reply in the engagement tracker kept in state."""
+    trackers = trackers or {}
+    engagement = EngagementTracker.from_state(trackers.get("engagement")).assistant_reply(now)
+    return {**trackers, "engagement": engagement.to_state()}
+
+
+def mood_trajectory(trackers: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The user's mood trajectory and engagement, for the planner."""
+    trackers = trackers or {}
+    return {
+        "mood": MoodTracker.from_state(trackers.get("mood")).trajectory(),
+        "engagement": EngagementTracker.from_state(trackers.get("engagement")).summary(),
+    }
+
+
+def draft_source(node: str, llm: Any, prompt: str) -> Dict[str, str]:
+    """What produced a reply (node, model, prompt template and version), for the shadow reviews."""
+    return {"node": node, "model": model_key(llm), "prompt": prompt, "prompt_version": registry.version(prompt)}
@@ -0,0 +1,134 @@
+"""Per-node token budgets for the dynamic sections of every prompt the graph renders.
+
+Static instructions come from the prompt registry and have a fixed size; what
+varies per turn is the history, the user's message and the JSON handed from
+node to node. Each of those sections is fitted to a per-node budget so that a
+single pasted essay cannot inflate every downstream call.
+"""
+import json
+import logging
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.messages.utils import get_buffer_string
+
+from utils.tokens import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# node -> section -> max tokens
+NODE_BUDGETS: Dict[str, Dict[str, int]] = {
+    "safety": {"user_text": 600},
+    "front_end": {"history": 600, "user_text": 400},
+    "sensing": {"history": 400, "user_text": 400},
+    "mode_decider": {"history": 600, "user_text": 400, "sensing": 200},
+    "bestie_planner": {"history": 800, "sensing": 300},
+    "bestie_drafter": {"history": 800, "plan": 400},
+    "bestie_fused": {"history": 800, "sensing": 300},
+    "ir_classifier": {"history": 600, "user_text": 600},
+    "ir_goal_extractor": {"history": 1000, "user_text": 800},
+    "ir_planner": {"history": 1000, "user_text": 800, "sub_tasks": 400},
+    "ir_generator": {"history": 1000, "plan": 800, "documents": 900},
+    "ir_section": {"history": 600, "plan": 400, "documents": 600},
+}
+DEFAULT_SECTION_BUDGET = 800
+
+
+def compact_json(data: Any) -> str:
+    """Serializes data without indentation or padding."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class TokenBudget:
+    """Fits prompt sections to per-node token budgets and records overflow events."""
+
+    def __init__(self, budgets: Dict[str, Dict[str, int]] = NODE_BUDGETS,
+                 summarizer: Optional[Callable[[str], str]] = None):
+        """
+        Args:
+            budgets: Token limit per node and prompt section.
+            summarizer: Optional callable that condenses history which no longer
+                fits (e.g. `llms.summarizer.summarize`). Without it, dropped
+                messages are replaced by a short omission note.
+        """
+        self.budgets = budgets
+        self.summarizer = summarizer
+        self._overflows: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def limit(self, node: str, section: str) -> int:
+        """Returns the token budget for a node's prompt section."""
+        return self.budgets.get(node, {}).get(section, DEFAULT_SECTION_BUDGET)
+
+    def _overflow(self, node: str, section: str, tokens: int, limit: int) -> None:
+        with self._lock:
+            self._overflows[(node, section)] += 1
+        logger.warning(f"Token budget overflow in {node}.{section}: {tokens} > {limit} tokens")
+
+    def text(self, node: str, section: str, text: str) -> str:
+        """Truncates free text to the section's budget."""
+        limit = self.limit(node, section)
+        tokens = count_tokens(text or "")
+        if tokens <= limit:
+            return text
+        self._overflow(node, section, tokens, limit)
+        return truncate_tokens(text, limit)
+
+    def json(self, node: str, section: str, data: Any) -> str:
+        """Serializes data as compact JSON, truncated to the section's budget if still too large."""
+        return self.text(node, section, compact_json(data))
+
+    def fit_messages(self, node: str, messages: Sequence[BaseMessage], max_messages: int = 5) -> List[BaseMessage]:
+        """Keeps the most recent messages that fit the node's history budget.
+
+        A single message may use at most half of the budget and is truncated
+        beyond that. Older messages that no longer fit are dropped and noted
+        (or summarized, when a summarizer is configured).
+        """
+        limit = self.limit(node, "history")
+        per_message = max(limit // 2, 1)
+        recent = list(messages[-max_messages:])
+
+        fitted: List[BaseMessage] = []
+        used = 0
+        for message in reversed(recent):
+            content = message.content if isinstance(message.content, str) else str(message.content)
+            tokens = count_tokens(content)
+            if tokens > per_message:
+                self._overflow(node, "message", tokens, per_message)
+                content = truncate_tokens(content, per_message)
+                message = message.model_copy(update={"content": content})
+                tokens = count_tokens(content)
+            if used + tokens > limit:
+                break
+            fitted.append(message)
+            used += tokens
+        fitted.reverse()
+
+        dropped = recent[: len(recent) - len(fitted)]
+        if dropped:
+            self._overflow(node, "history", used + sum(count_tokens(str(m.content)) for m in dropped), limit)
+            if self.summarizer is not None:
+                try:
+                    note = self.summarizer(get_buffer_string(dropped))
+                except Exception as e:
+                    logger.error(f"History summarizer failed: {e}")
+                    note = f"({len(dropped)} earlier messages omitted)"
+            else:
+                note = f"({len(dropped)} earlier messages omitted)"
+            fitted.insert(0, SystemMessage(content=note))
+        return fitted
+
+    def history(self, node: str, messages: Sequence[BaseMessage], max_messages: int = 5) -> str:
+        """Renders the fitted recent history as a transcript string."""
+        return get_buffer_string(self.fit_messages(node, messages, max_messages))
+
+    def overflow_report(self) -> Dict[str, int]:
+        """Returns overflow counts keyed by `node.section`."""
+        with self._lock:
+            return {f"{node}.{section}": count for (node, section), count in sorted(self._overflows.items())}
+
+
+budget = TokenBudget()
@@ -0,0 +1,67 @@
+"""Token counting with a local tokenizer.
+
+The tiktoken encoding is loaded on the first count. tiktoken downloads it on
+first use, so the load is bounded by `ENCODING_LOAD_TIMEOUT_S`. Without
+tiktoken, or on an offline host without a cached encoding, counts fall back to
+an estimate of `CHARS_PER_TOKEN` characters per token.
+"""
+import logging
+import threading
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Roughly four characters per token for English text.
+CHARS_PER_TOKEN = 4
+ENCODING_LOAD_TIMEOUT_S = 5.0
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Optional[object]:
+    """Loads the tiktoken encoding once, or returns None to use the character heuristic."""
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("tiktoken not available, estimating token counts from characters")
+        return None
+
+    loaded = {}
+
+    def load() -> None:
+        try:
+            loaded["encoding"] = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            loaded["error"] = e
+
+    # A daemon thread, so a download hanging on an offline host can't stall the caller or exit
+    loader = threading.Thread(target=load, name="tiktoken-load", daemon=True)
+    loader.start()
+    loader.join(ENCODING_LOAD_TIMEOUT_S)
+    if "encoding" in loaded:
+        return loaded["encoding"]
+    reason = type(loaded["error"]).__name__ if "error" in loaded else f"timed out after {ENCODING_LOAD_TIMEOUT_S:.0f}s"
+    logger.warning(f"Could not load tiktoken encoding ({reason}), estimating token counts from characters")
+    return None
+
+def count_tokens(text: str) -> int:
+    """Counts the tokens in `text` with the local tokenizer."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, marker: str = " …[truncated]… ") -> str:
+    """Shortens `text` to about `max_tokens`, keeping the opening two thirds and the closing third."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    keep = max(max_tokens - count_tokens(marker), 1)
+    head = keep * 2 // 3
+    tail = keep - head
+    encoding = _get_encoding()
+    if encoding is None:
+        head_chars, tail_chars = head * CHARS_PER_TOKEN, tail * CHARS_PER_TOKEN
+        return text[:head_chars] + marker + (text[-tail_chars:] if tail_chars else "")
+    ids = encoding.encode(text, disallowed_special=())
+    return encoding.decode(ids[:head]) + marker + (encoding.decode(ids[-tail:]) if tail else "")